@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+
+# largest |r| before the Fisher transform, so that perfectly ranked days stay finite
+_MAX_R = 1 - 1e-12
+
+# columns of the per-day statistics kept by RankCorrelations
+STAT_COLUMNS = ['num_papers', 'spearman', 'kendall_s', 'kendall_norm']
+
+
+def rank_rows(values):
+    # average ranks (1-based, ties share their mean rank) of every row of a 2-D array. NaN entries are padding and
+    # stay NaN
+    num_cols = values.shape[1]
+    order = np.argsort(values, axis=1, kind='stable')
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    position = np.broadcast_to(np.arange(num_cols), values.shape)
+
+    # ties are runs of equal values in the sorted rows: the first and last position of the run of every entry
+    new_run = np.ones(values.shape, dtype=bool)
+    new_run[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    first = np.maximum.accumulate(np.where(new_run, position, 0), axis=1)
+    end_run = np.ones(values.shape, dtype=bool)
+    end_run[:, :-1] = new_run[:, 1:]
+    last = np.minimum.accumulate(np.where(end_run, position, num_cols - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2. + 1, axis=1)
+    ranks[np.isnan(values)] = np.nan
+    return ranks
+
+
+def day_statistics(x, y, chunk_size=256):
+    """
+    Spearman and Kendall statistics of many days at once.
+
+    Inputs:
+        - x: numpy.ndarray, (num_days, max_papers) Arxiv listing orders, NaN-padded after each day's papers
+        - y: numpy.ndarray, same shape, Scirate ranks of the same papers
+        - chunk_size: int, days per block of the pairwise Kendall computation, which needs max_papers ** 2 values
+          per day
+
+    Outputs:
+        - stats: dict, arrays of length num_days:
+            - num_papers: number of papers with both values
+            - spearman: Spearman's rho (NaN for fewer than two papers or constant ranks)
+            - kendall_s: Kendall's S, concordant minus discordant pairs
+            - kendall_norm: tau-b normalizer sqrt((n0 - n1) * (n0 - n2)), so that tau-b = kendall_s / kendall_norm
+    """
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(valid, x, np.nan)
+    y = np.where(valid, y, np.nan)
+    num_papers = valid.sum(axis=1)
+
+    # Spearman's rho is Pearson's r of the ranks
+    rx = np.nan_to_num(rank_rows(x) - ((num_papers + 1) / 2.)[:, None])
+    ry = np.nan_to_num(rank_rows(y) - ((num_papers + 1) / 2.)[:, None])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spearman = (rx * ry).sum(axis=1) / np.sqrt((rx * rx).sum(axis=1) * (ry * ry).sum(axis=1))
+
+    kendall_s = np.zeros(len(x))
+    kendall_norm = np.zeros(len(x))
+    for start in range(0, len(x), chunk_size):
+        block = slice(start, start + chunk_size)
+        # pairwise signs of every day in the block. Pairs with padding have a NaN sign and are left out
+        dx = np.sign(x[block, :, None] - x[block, None, :])
+        dy = np.sign(y[block, :, None] - y[block, None, :])
+        pairs = valid[block, :, None] & valid[block, None, :]
+        # every unordered pair is counted twice
+        kendall_s[block] = np.nansum(dx * dy, axis=(1, 2)) / 2.
+        untied_x = ((dx != 0) & pairs).sum(axis=(1, 2)) / 2.
+        untied_y = ((dy != 0) & pairs).sum(axis=(1, 2)) / 2.
+        kendall_norm[block] = np.sqrt(untied_x * untied_y)
+    return {'num_papers': num_papers, 'spearman': spearman, 'kendall_s': kendall_s, 'kendall_norm': kendall_norm}
+
+
+def pad_days(dates, x, y):
+    # (sorted unique dates, x, y) with one NaN-padded row per date, from flat per-paper arrays
+    days, inverse, counts = np.unique(dates, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    column = np.arange(len(order)) - starts[inverse[order]]
+    shape = (len(days), counts.max() if len(counts) > 0 else 0)
+    padded_x = np.full(shape, np.nan)
+    padded_y = np.full(shape, np.nan)
+    padded_x[inverse[order], column] = np.asarray(x, dtype=float)[order]
+    padded_y[inverse[order], column] = np.asarray(y, dtype=float)[order]
+    return days, padded_x, padded_y
+
+
+def _ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator > 0)
+
+
+def combine(weight, weighted_z, kendall_s, kendall_norm):
+    # correlations of groups of days from the sums of their per-day terms (see RankCorrelations). Kendall's tau-b is
+    # stratified by day: pairs are only compared within a day, where listing orders mean something. Spearman's rho
+    # is the mean of the daily values in Fisher's z space, weighted by n - 3
+    return {'spearman': np.tanh(_ratio(weighted_z, weight)),
+            'kendall': _ratio(kendall_s, kendall_norm)}
+
+
+class RankCorrelations:
+    """
+    Correlations between Arxiv listing order and Scirate rank, per day, week, archive and rolling window.
+
+    Only the per-day statistics are kept: the number of matched papers, Spearman's rho, and Kendall's S and tau-b
+    normalizer. Adding days only computes the statistics of the new days, all at once with NumPy, and every
+    aggregate is derived from the per-day values, so appending a night's scrape to a saved state does not touch the
+    earlier days. Days are identified by archive and date; adding a day again replaces it.
+
+    Weeks, archives and windows combine days without mixing their listing orders: Kendall's tau-b only counts pairs
+    of papers of the same day, and Spearman's rho is the n - 3 weighted mean of the daily values in Fisher's z space.
+
+    """
+    def __init__(self):
+        self.archives = np.array([], dtype=object)
+        self.dates = np.array([], dtype='datetime64[D]')
+        self.stats = dict((name, np.array([], dtype=np.int64 if name == 'num_papers' else float))
+                          for name in STAT_COLUMNS)
+
+    def add(self, dates, orders, ranks, archive):
+        """
+        Add or replace the days of a set of papers.
+
+        Inputs:
+            - dates: array-like, listing date of every paper, as datetime64 or anything pandas.to_datetime reads
+            - orders: array-like, Arxiv listing order of every paper
+            - ranks: array-like, Scirate rank of every paper. Papers with a negative (missing) rank are skipped
+            - archive: string, archive of the papers
+
+        Outputs:
+            - num_days: int, number of days added or replaced
+        """
+        ranks = np.asarray(ranks, dtype=float)
+        matched = ranks >= 0
+        dates = pd.to_datetime(np.asarray(dates)[matched]).values.astype('datetime64[D]')
+        days, x, y = pad_days(dates, np.asarray(orders)[matched], ranks[matched])
+        if len(days) == 0:
+            return 0
+        stats = day_statistics(x, y)
+
+        # the new days replace the same days of the same archive
+        keep = ~((self.archives == archive) & np.isin(self.dates, days))
+        archives = np.concatenate([self.archives[keep], np.full(len(days), archive, dtype=object)])
+        dates = np.concatenate([self.dates[keep], days])
+        position = np.lexsort((dates, archives.astype(str)))
+        self.archives = archives[position]
+        self.dates = dates[position]
+        for name in STAT_COLUMNS:
+            self.stats[name] = np.concatenate([self.stats[name][keep], stats[name]])[position]
+        return len(days)
+
+    def add_frame(self, df, archive):
+        # add the days of a feature DataFrame (see analysis.features)
+        return self.add(df['date'].values, df['arxiv_order'].values, df['scirate_rank'].values, archive)
+
+    def daily(self):
+        # one row per archive and day
+        df = self._frame()
+        df['kendall'] = _ratio(df['kendall_s'], df['kendall_norm'])
+        return df[['archive', 'date', 'num_papers', 'spearman', 'kendall']]
+
+    def weekly(self):
+        # one row per archive and week, weeks starting on Monday
+        df = self._frame()
+        df['week'] = df['date'] - pd.to_timedelta(df['date'].dt.weekday, unit='D')
+        return self._grouped(df, ['archive', 'week'])
+
+    def by_archive(self):
+        # one row per archive, over all its days
+        return self._grouped(self._frame(), ['archive'])
+
+    def rolling(self, days=28):
+        """
+        Correlations over the trailing `days` calendar days of every listed day, per archive.
+
+        Inputs:
+            - days: int, window length in calendar days, ending with (and including) each day
+
+        Outputs:
+            - df: pandas.DataFrame, one row per archive and day, with the number of days and papers in its window
+        """
+        sums = self._sums(self._frame())
+        names = list(sums)
+        rows = []
+        for archive in np.unique(self.archives.astype(str)):
+            mask = self.archives.astype(str) == archive
+            dates = self.dates[mask]
+            # window sums are differences of cumulative sums, found by binary search on the sorted dates
+            first = np.searchsorted(dates, dates - np.timedelta64(days - 1, 'D'), side='left')
+            last = np.arange(1, len(dates) + 1)
+            window = {}
+            for name in names:
+                cumulative = np.concatenate([[0.], np.cumsum(np.asarray(sums[name])[mask])])
+                window[name] = cumulative[last] - cumulative[first]
+            correlations = combine(window['weight'], window['weighted_z'], window['kendall_s'],
+                                   window['kendall_norm'])
+            rows.append(pd.DataFrame({'archive': archive,
+                                      'date': dates,
+                                      'num_days': last - first,
+                                      'num_papers': window['num_papers'].astype(np.int64),
+                                      'spearman': correlations['spearman'],
+                                      'kendall': correlations['kendall']}))
+        if len(rows) == 0:
+            return pd.DataFrame(columns=['archive', 'date', 'num_days', 'num_papers', 'spearman', 'kendall'])
+        return pd.concat(rows, ignore_index=True)
+
+    def save(self, path):
+        np.savez(path, archives=self.archives.astype(str), dates=self.dates, **self.stats)
+
+    @classmethod
+    def load(cls, path):
+        correlations = cls()
+        with np.load(path) as data:
+            correlations.archives = data['archives'].astype(object)
+            correlations.dates = data['dates']
+            for name in STAT_COLUMNS:
+                correlations.stats[name] = data[name]
+        return correlations
+
+    # helper methods
+    def _frame(self):
+        return pd.DataFrame(dict(self.stats, archive=self.archives.astype(str),
+                                 date=self.dates.astype('datetime64[ns]')))
+
+    def _sums(self, df):
+        # per-day terms whose sums over a group give the group's correlations through `combine`. Days with fewer
+        # than four papers or constant ranks have no Fisher weight
+        rho = np.clip(df['spearman'].values, -_MAX_R, _MAX_R)
+        weight = np.where(np.isnan(rho) | (df['num_papers'].values <= 3), 0., df['num_papers'].values - 3.)
+        return {'num_papers': df['num_papers'].values,
+                'weight': weight,
+                'weighted_z': np.where(weight > 0, weight * np.arctanh(np.nan_to_num(rho)), 0.),
+                'kendall_s': df['kendall_s'].values,
+                'kendall_norm': df['kendall_norm'].values}
+
+    def _grouped(self, df, keys):
+        sums = pd.DataFrame(self._sums(df))
+        for key in keys:
+            sums[key] = df[key].values
+        sums['num_days'] = 1
+        groups = sums.groupby(keys, sort=True).sum().reset_index()
+        correlations = combine(groups['weight'], groups['weighted_z'], groups['kendall_s'], groups['kendall_norm'])
+        groups['spearman'] = correlations['spearman']
+        groups['kendall'] = correlations['kendall']
+        return groups[keys + ['num_days', 'num_papers', 'spearman', 'kendall']]
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from scrapers.common import WEEKDAYS, SIZE_UNITS
+from .matching import index_by_id
+
+# largest number of digits of a size, so that its value in bytes fits in an int64
+_MAX_SIZE_DIGITS = 9
+
+# dtype of every numeric feature. Missing values are -1, as in the EDA notebook
+FEATURE_DTYPES = {
+    'num_authors': np.int32,
+    'title_length': np.int32,
+    'arxiv_order': np.int32,
+    'submit_seconds': np.int32,
+    'paper_size': np.int64,
+    'num_versions': np.int32,
+    'scirate_rank': np.int32,
+    'scite_score': np.int32
+}
+
+
+def _char_matrix(values):
+    # (n, width) array of the bytes of strings, zero-padded to the longest one, and the length of every string
+    values = np.array(values, dtype='S')
+    if values.itemsize == 0:
+        values = values.astype('S1')
+    chars = values.view(np.uint8).reshape(len(values), values.itemsize).astype(np.int64)
+    return chars, (chars != 0).sum(axis=1)
+
+
+def parse_times(times):
+    # "HH:MM:SS" strings -> seconds of the day, -1 for anything else (e.g. "none")
+    chars, length = _char_matrix(times)
+    chars = np.pad(chars, ((0, 0), (0, max(0, 8 - chars.shape[1]))))[:, :8]
+    valid = (length == 8) & (chars[:, 2] == ord(':')) & (chars[:, 5] == ord(':'))
+    digits = chars - ord('0')
+    seconds = ((digits[:, 0] * 10 + digits[:, 1]) * 3600 + (digits[:, 3] * 10 + digits[:, 4]) * 60 +
+               digits[:, 6] * 10 + digits[:, 7])
+    return np.where(valid, seconds, -1).astype(np.int32)
+
+
+def parse_sizes(sizes):
+    # "123kb" strings -> bytes, as in scrapers.records, -1 for anything else: the digits before the unit are
+    # weighted by their power of ten
+    chars, length = _char_matrix(sizes)
+    rows = np.arange(len(chars))
+    position = np.arange(chars.shape[1])
+    is_number = position < (length - 2)[:, None]
+    is_digit = (chars >= ord('0')) & (chars <= ord('9'))
+    unit = chars[rows, np.maximum(length - 2, 0)]
+    valid = ((length >= 3) & (length - 2 <= _MAX_SIZE_DIGITS) & (chars[rows, np.maximum(length - 1, 0)] == ord('b')) &
+             (is_digit | ~is_number).all(axis=1) & np.isin(unit, [ord(u) for u in SIZE_UNITS]))
+
+    power = np.clip(length[:, None] - 3 - position, 0, _MAX_SIZE_DIGITS)
+    number = np.where(is_number & valid[:, None], (chars - ord('0')) * 10 ** power, 0).sum(axis=1)
+    multiplier = np.zeros(256, dtype=np.int64)
+    for i, u in enumerate(SIZE_UNITS):
+        multiplier[ord(u)] = 1024 ** (i + 1)
+    return np.where(valid, number * multiplier[unit], -1)
+
+
+def features_frame(columns):
+    """
+    Typed feature DataFrame of papers given as columns.
+
+    Inputs:
+        - columns: dict, equal-length lists or arrays with keys date, order, title, authors, submit_time,
+          submit_weekday, size and num_versions, like ColumnStore.load returns. scirate_rank and scite_count
+          are optional. Missing values (None, masked) become -1
+
+    Outputs:
+        - df: pandas.DataFrame, indexed by "<date>_<order>" like the notebook, with the notebook's feature columns
+          (submit_time becomes submit_seconds, seconds of the day), a datetime "date" column and an ordered
+          categorical "submit_weekday"
+    """
+    num_rows = len(columns['order'])
+    order = np.asarray(columns['order'], dtype=np.int64)
+    dates = pd.Series(columns['date'], dtype=object)
+    missing = np.full(num_rows, -1)
+
+    df = pd.DataFrame({
+        'date': pd.to_datetime(dates, format='day_%Y_%m_%d'),
+        'title': pd.Series(columns['title'], dtype=object),
+        'authors': pd.Series(list(columns['authors']), dtype=object),
+        'num_authors': [len(authors) if authors is not None else -1 for authors in columns['authors']],
+        'title_length': pd.Series(columns['title'], dtype=object).str.len(),
+        'arxiv_order': order,
+        'submit_seconds': parse_times(columns['submit_time']),
+        'submit_weekday': pd.Categorical(columns['submit_weekday'], categories=WEEKDAYS, ordered=True),
+        'paper_size': parse_sizes(columns['size']),
+        'num_versions': np.ma.filled(columns['num_versions'], -1),
+        'scirate_rank': np.ma.filled(columns.get('scirate_rank', missing), -1),
+        'scite_score': np.ma.filled(columns.get('scite_count', missing), -1)
+    })
+    df.index = dates.str.cat(pd.Series(order).astype(str).str.zfill(4), sep='_')
+    return df.astype(FEATURE_DTYPES)
+
+
+def iter_features(arxiv_data, scirate_data=None, chunk_size=100000):
+    """
+    Feature DataFrames of Arxiv days, built chunk by chunk so that the scraped records never have to fit in memory.
+
+    Inputs:
+        - arxiv_data: iterable, Arxiv days ({'date', 'papers'}), e.g. a list or ColumnStore.records(...)
+        - scirate_data: iterable, optional. Scirate days, joined to Arxiv papers by arXiv identifier
+        - chunk_size: int, approximate number of papers per chunk. Days are never split across chunks
+
+    Outputs:
+        - yields one pandas.DataFrame (see `features_frame`) per chunk
+    """
+    scirate = index_by_id(scirate_data) if scirate_data is not None else {}
+    names = ['order', 'title', 'authors', 'submit_time', 'submit_weekday', 'size', 'num_versions']
+    chunk = None
+    for res in arxiv_data:
+        if chunk is None:
+            chunk = dict((name, []) for name in names + ['date', 'scirate_rank', 'scite_count'])
+        papers = res['papers']
+        for name in names:
+            chunk[name].extend([paper[name] for paper in papers])
+        chunk['date'].extend([res['date']] * len(papers))
+        matches = [scirate.get(paper.get('arxiv_id'), (None, None))[1] for paper in papers]
+        chunk['scirate_rank'].extend([match['rank'] if match is not None else -1 for match in matches])
+        chunk['scite_count'].extend([match['scite_count'] if match is not None else -1 for match in matches])
+        if len(chunk['order']) >= chunk_size:
+            yield features_frame(chunk)
+            chunk = None
+    if chunk is not None and len(chunk['order']) > 0:
+        yield features_frame(chunk)
+
+
+def build_features(arxiv_data, scirate_data=None, chunk_size=100000):
+    # all the chunks of `iter_features` as one DataFrame
+    frames = list(iter_features(arxiv_data, scirate_data, chunk_size))
+    if len(frames) == 0:
+        return features_frame(dict((name, []) for name in ['date', 'order', 'title', 'authors', 'submit_time',
+                                                             'submit_weekday', 'size', 'num_versions']))
+    return pd.concat(frames)
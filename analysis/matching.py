@@ -0,0 +1,153 @@
+import numpy as np
+from scrapers.common import MinHasher, author_overlap, day_number, normalize_title, shingles
+
+
+class PaperMatcher:
+    """
+    Joins Scirate papers to Arxiv papers in near-linear time.
+
+    Papers that carry an arXiv identifier (see `merge_by_id`) are joined on it directly. Otherwise the Scirate title
+    is first looked up in a hash index of normalized Arxiv titles. Titles that miss go through a
+    MinHash LSH index of character trigrams: only Arxiv papers sharing an LSH band, listed within `window` days and
+    sharing authors are compared, instead of every Arxiv title. Each match reports its method and a confidence: 1 for
+    identifier and exact title matches, and the trigram Jaccard similarity of the titles for fuzzy ones.
+
+    Inputs:
+        - arxiv_data: list, Arxiv days as returned by ArxivScraper or saved as json ({'date', 'papers'})
+        - window: int, maximum distance in days between the Arxiv and Scirate listing dates of a fuzzy match
+        - threshold: float, minimum title similarity of a fuzzy match
+        - min_author_overlap: float, minimum shared fraction of authors of a fuzzy match
+        - num_perm: int, MinHash signature length
+        - bands: int, number of LSH bands. num_perm must be divisible by bands
+
+    """
+    def __init__(self, arxiv_data, window=3, threshold=0.5, min_author_overlap=0.5, num_perm=64, bands=16):
+        self.window = window
+        self.threshold = threshold
+        self.min_author_overlap = min_author_overlap
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+
+        # flat list of Arxiv papers with their listing day
+        self.papers = []
+        self.days = []
+        self.dates = []
+        for res in arxiv_data:
+            for paper in res['papers']:
+                self.papers.append(paper)
+                self.dates.append(res['date'])
+                self.days.append(day_number(res['date']))
+        self.days = np.array(self.days, dtype=np.int64)
+
+        self.ids = {}
+        self.exact = {}
+        self.shingles = []
+        self.buckets = {}
+        for i, paper in enumerate(self.papers):
+            if paper.get('arxiv_id'):
+                self.ids[paper['arxiv_id']] = i
+            title = normalize_title(paper['title'])
+            self.exact.setdefault(title, []).append(i)
+            sh = shingles(title)
+            self.shingles.append(sh)
+            for key in self._band_keys(self.hasher.signature(sh)):
+                self.buckets.setdefault(key, []).append(i)
+
+    def match_paper(self, paper, date):
+        # (index into self.papers, confidence, method) of a Scirate paper, or (None, 0, None) when nothing matches
+        if paper.get('arxiv_id') in self.ids:
+            return self.ids[paper['arxiv_id']], 1., 'id'
+
+        day = day_number(date)
+        title = normalize_title(paper['title'])
+
+        # exact title - the closest listing day wins if a title was posted more than once
+        candidates = self.exact.get(title)
+        if candidates is not None:
+            best = min(candidates, key=lambda i: abs(self.days[i] - day))
+            return best, 1., 'exact'
+
+        # fuzzy title within the date window, with shared authors
+        sh = shingles(title)
+        candidates = set()
+        for key in self._band_keys(self.hasher.signature(sh)):
+            candidates.update(self.buckets.get(key, ()))
+
+        best, best_score = None, 0.
+        for i in candidates:
+            if abs(self.days[i] - day) > self.window:
+                continue
+            score = len(sh & self.shingles[i]) / float(len(sh | self.shingles[i]))
+            if score < self.threshold or score <= best_score:
+                continue
+            if author_overlap(paper['authors'], self.papers[i]['authors']) < self.min_author_overlap:
+                continue
+            best, best_score = i, score
+        if best is None:
+            return None, 0., None
+        return best, best_score, 'fuzzy'
+
+    def match(self, scirate_data):
+        """
+        Match every paper of Scirate days ({'date', 'papers'}) to an Arxiv paper.
+
+        Outputs:
+            - matches: list, one dict per Scirate paper with keys: scirate_date, rank, scite_count, arxiv_date,
+              order (Arxiv listing order), confidence and method ("id", "exact", "fuzzy" or None when unmatched)
+        """
+        matches = []
+        for res in scirate_data:
+            for paper in res['papers']:
+                i, confidence, method = self.match_paper(paper, res['date'])
+                matches.append({
+                    'scirate_date': res['date'],
+                    'rank': paper['rank'],
+                    'scite_count': paper['scite_count'],
+                    'arxiv_date': self.dates[i] if i is not None else None,
+                    'order': self.papers[i]['order'] if i is not None else None,
+                    'confidence': confidence,
+                    'method': method
+                })
+        return matches
+
+    def _band_keys(self, signature):
+        return [(b, signature[b * self.rows:(b + 1) * self.rows].tobytes()) for b in range(self.bands)]
+
+
+def index_by_id(days):
+    # {arxiv_id: (date, paper)} of the papers of {'date', 'papers'} days that carry an identifier
+    index = {}
+    for res in days:
+        for paper in res['papers']:
+            if paper.get('arxiv_id'):
+                index[paper['arxiv_id']] = (res['date'], paper)
+    return index
+
+
+def merge_by_id(arxiv_data, scirate_data):
+    """
+    Hash join of Arxiv and Scirate days on the arXiv identifier both scrapers record as "arxiv_id".
+
+    Every Arxiv paper is kept (left join), like the notebook's DataFrame: papers that are not on Scirate get -1 as
+    Scirate rank and scite count.
+
+    Inputs:
+        - arxiv_data: list, Arxiv days ({'date', 'papers'})
+        - scirate_data: list, Scirate days ({'date', 'papers'})
+
+    Outputs:
+        - rows: list, one dict per Arxiv paper with its fields, its listing date and the keys scirate_date,
+          scirate_rank and scite_count
+    """
+    scirate = index_by_id(scirate_data)
+    rows = []
+    for res in arxiv_data:
+        for paper in res['papers']:
+            row = dict(paper, date=res['date'])
+            date, match = scirate.get(paper.get('arxiv_id'), (None, None))
+            row['scirate_date'] = date
+            row['scirate_rank'] = match['rank'] if match is not None else -1
+            row['scite_count'] = match['scite_count'] if match is not None else -1
+            rows.append(row)
+    return rows
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+from .correlation import day_statistics, pad_days
+
+
+# model inputs derived from a feature DataFrame (see analysis.features)
+FEATURE_NAMES = ['log_order', 'log_size', 'num_versions', 'submit_sin', 'submit_cos', 'log_authors', 'title_length']
+
+_DAY_SECONDS = 86400.
+
+
+def model_features(df):
+    """
+    Numeric model inputs of papers, one row each.
+
+    Listing order, size and author count are log-scaled, and the submit time of day becomes a point on the unit circle,
+    so that 23:59 and 00:00 are close. Missing values (-1) become 0.
+
+    Inputs:
+        - df: pandas.DataFrame, with the columns arxiv_order, paper_size, num_versions, submit_seconds, num_authors
+          and title_length
+
+    Outputs:
+        - x: numpy.ndarray, (num_papers, len(FEATURE_NAMES)) float64
+    """
+    def column(name):
+        values = df[name].to_numpy(dtype=float)
+        return np.where(values < 0, 0., values)
+
+    seconds = column('submit_seconds')
+    angle = 2 * np.pi * seconds / _DAY_SECONDS
+    return np.column_stack([np.log1p(column('arxiv_order')),
+                            np.log1p(column('paper_size')),
+                            column('num_versions'),
+                            np.sin(angle),
+                            np.cos(angle),
+                            np.log1p(column('num_authors')),
+                            column('title_length')])
+
+
+def day_groups(dates):
+    # (order, starts, counts): an ordering of the papers by day, and the first position and number of papers of
+    # every day in it
+    codes, counts = np.unique(np.asarray(dates), return_inverse=True, return_counts=True)[1:]
+    order = np.argsort(codes, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return order, starts, counts
+
+
+class RankingModel:
+    """
+    Linear model of how well a paper does on Scirate, from the features ArxivScraper extracts, trained with NumPy on
+    batches of papers.
+
+    With the "pairwise" loss (RankNet), every batch is random pairs of papers listed on the same day, and the model
+    learns which of the two has more scites: only the order within a day matters, as for the Scirate rank. With the
+    "regression" loss, it fits log(1 + scites) by least squares. Both use Adam with L2 regularization, on
+    standardized inputs. Scoring a day's listing is one matrix product; higher scores mean more scites.
+
+    Inputs:
+        - loss: string, "pairwise" or "regression"
+        - learning_rate: float, Adam step size
+        - l2: float, L2 penalty on the weights
+        - batch_size: int, pairs (or papers) per gradient step
+        - seed: int, random seed of the batches
+
+    """
+    def __init__(self, loss='pairwise', learning_rate=0.05, l2=1e-4, batch_size=4096, seed=0):
+        if loss not in ['pairwise', 'regression']:
+            raise ValueError('Unknown loss: %s' % loss)
+        self.loss = loss
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.batch_size = batch_size
+        self.rng = np.random.RandomState(seed)
+        self.mean = np.zeros(len(FEATURE_NAMES))
+        self.scale = np.ones(len(FEATURE_NAMES))
+        self.weights = np.zeros(len(FEATURE_NAMES))
+        self.bias = 0.
+
+    def fit(self, df, epochs=20):
+        """
+        Train on the papers of a feature DataFrame that have Scirate data (scite_score >= 0).
+
+        Inputs:
+            - df: pandas.DataFrame, see analysis.features, with the date and scite_score columns
+            - epochs: int, passes over the papers. An epoch is as many batches as it takes to draw every paper once
+
+        Outputs:
+            - losses: list, mean training loss of every epoch
+        """
+        df = df[df['scite_score'] >= 0]
+        x = model_features(df)
+        self.mean = x.mean(axis=0)
+        self.scale = np.where(x.std(axis=0) > 0, x.std(axis=0), 1.)
+        x = (x - self.mean) / self.scale
+        target = np.log1p(df['scite_score'].to_numpy(dtype=float))
+        order, starts, counts = day_groups(df['date'].to_numpy())
+        day_of = np.empty(len(df), dtype=np.int64)
+        day_of[order] = np.repeat(np.arange(len(counts)), counts)
+
+        params = np.zeros(len(FEATURE_NAMES) + 1)
+        moments = [np.zeros_like(params), np.zeros_like(params)]
+        steps_per_epoch = max(1, len(df) // self.batch_size)
+        losses = []
+        step = 0
+        for _ in range(epochs):
+            total = 0.
+            for _ in range(steps_per_epoch):
+                if self.loss == 'pairwise':
+                    loss, grad = self._pairwise_batch(params, x, target, order, starts, counts, day_of)
+                else:
+                    loss, grad = self._regression_batch(params, x, target)
+                grad[:-1] += self.l2 * params[:-1]
+                # Adam
+                step += 1
+                moments[0] = 0.9 * moments[0] + 0.1 * grad
+                moments[1] = 0.999 * moments[1] + 0.001 * grad ** 2
+                corrected = moments[0] / (1 - 0.9 ** step)
+                params -= self.learning_rate * corrected / (np.sqrt(moments[1] / (1 - 0.999 ** step)) + 1e-8)
+                total += loss
+            losses.append(total / steps_per_epoch)
+        self.weights, self.bias = params[:-1], params[-1]
+        return losses
+
+    def score(self, df):
+        # scores of every paper of a feature DataFrame, e.g. a day's listing. Higher means more scites expected
+        return ((model_features(df) - self.mean) / self.scale) @ self.weights + self.bias
+
+    def rank(self, df):
+        # predicted Scirate rank (0 = most scites) of every paper within its day
+        scores = pd.Series(self.score(df), index=df.index)
+        return scores.groupby(df['date'].to_numpy()).rank(ascending=False, method='first').to_numpy(dtype=int) - 1
+
+    def evaluate(self, df):
+        """
+        Per-day rank correlations of the model's scores with Scirate, next to the Arxiv listing order's.
+
+        Outputs:
+            - metrics: dict with keys spearman (mean daily Spearman correlation of predicted and actual Scirate
+              rank), kendall (mean daily tau-b), and order_spearman and order_kendall (the same for the listing order
+              alone)
+        """
+        df = df[df['scirate_rank'] >= 0]
+        metrics = {}
+        for name, values in [('', -self.score(df)), ('order_', df['arxiv_order'].to_numpy(dtype=float))]:
+            _, x, y = pad_days(df['date'].to_numpy(), values, df['scirate_rank'].to_numpy())
+            stats = day_statistics(x, y)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                kendall = stats['kendall_s'] / stats['kendall_norm']
+            metrics[name + 'spearman'] = float(np.nanmean(stats['spearman']))
+            metrics[name + 'kendall'] = float(np.nanmean(kendall))
+        return metrics
+
+    def coefficients(self):
+        # weights of the standardized inputs, by feature name
+        return dict(zip(FEATURE_NAMES, self.weights.tolist()))
+
+    def save(self, path):
+        np.savez(path, loss=self.loss, mean=self.mean, scale=self.scale, weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            model = cls(str(data['loss']))
+            model.mean = data['mean']
+            model.scale = data['scale']
+            model.weights = data['weights']
+            model.bias = float(data['bias'])
+        return model
+
+    # helper methods
+    def _pairwise_batch(self, params, x, target, order, starts, counts, day_of):
+        # RankNet loss log(1 + exp(-(s_i - s_j))) of random same-day pairs (i, j) where i has more scites. Pairs
+        # with equal scites are left out
+        i = self.rng.randint(0, len(x), size=self.batch_size)
+        day = day_of[i]
+        j = order[starts[day] + (self.rng.random_sample(self.batch_size) * counts[day]).astype(np.int64)]
+        sign = np.sign(target[i] - target[j])
+        keep = sign != 0
+        i, j, sign = i[keep], j[keep], sign[keep]
+        if len(i) == 0:
+            return 0., np.zeros_like(params)
+        diff = (x[i] - x[j]) * sign[:, None]
+        margin = diff @ params[:-1]
+        loss = np.logaddexp(0., -margin).mean()
+        # d loss / d margin = -sigmoid(-margin). The bias cancels in a difference
+        weight = -0.5 * (1 - np.tanh(margin / 2.))
+        grad = np.append(diff.T @ weight / len(i), 0.)
+        return loss, grad
+
+    def _regression_batch(self, params, x, target):
+        i = self.rng.randint(0, len(x), size=self.batch_size)
+        residual = x[i] @ params[:-1] + params[-1] - target[i]
+        grad = np.append(x[i].T @ residual, residual.sum()) / len(i)
+        return 0.5 * float((residual ** 2).mean()), grad
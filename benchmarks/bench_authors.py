@@ -0,0 +1,65 @@
+"""
+Author lookups and aggregations on years of synthetic records: a full scan of the records (what any per-author
+question needs without an index) versus scrapers.authors.AuthorIndex, plus the cost of adding one day to the index.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_authors --days 1095 --papers 60
+"""
+import time
+import argparse
+import numpy as np
+from scrapers.authors import AuthorIndex, author_key
+from .synthetic import arxiv_days, scirate_days
+
+
+def timed(func, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - t0) / repeat
+
+
+def scan_summary(arxiv, ranks, name):
+    # mean Scirate rank of an author's papers by scanning every record
+    key = author_key(name)
+    values = [ranks[paper['arxiv_id']] for res in arxiv for paper in res['papers']
+              if any(author_key(author) == key for author in paper['authors'])]
+    return len(values), float(np.mean(values))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--papers', type=int, default=60, help='papers per day')
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    arxiv = arxiv_days(args.days, args.papers)
+    scirate, _ = scirate_days(arxiv)
+    ranks = dict((paper['arxiv_id'], paper['rank']) for res in scirate for paper in res['papers'])
+    print('%d papers' % sum(len(res['papers']) for res in arxiv))
+
+    index = AuthorIndex()
+    _, elapsed = timed(lambda: (index.add_days(arxiv[:-1], 'arxiv'), index.add_days(scirate[:-1], 'scirate')))
+    print('build index            %9.2f s   %d authors, %d co-author pairs' % (
+        elapsed, index.num_authors, len(index.pairs.merged()[0])))
+    _, elapsed = timed(lambda: (index.add_day(arxiv[-1], 'arxiv'), index.add_day(scirate[-1], 'scirate')))
+    print('add one day            %9.2f ms' % (elapsed * 1e3))
+
+    name = arxiv[0]['papers'][0]['authors'][0]
+    (num_papers, mean_rank), elapsed = timed(lambda: scan_summary(arxiv, ranks, name))
+    print('scan: one author       %9.2f ms   %d papers, mean rank %.2f' % (elapsed * 1e3, num_papers, mean_rank))
+    summary, elapsed = timed(lambda: index.author_summary(name), args.lookups)
+    print('index: author summary  %9.3f ms   %d papers, mean rank %.2f' % (
+        elapsed * 1e3, summary['num_papers'], summary['mean_rank']))
+    _, elapsed = timed(lambda: index.papers_of(name), args.lookups)
+    print('index: papers of       %9.3f ms' % (elapsed * 1e3))
+    _, elapsed = timed(lambda: index.coauthors_of(name), args.lookups)
+    print('index: co-authors of   %9.3f ms' % (elapsed * 1e3))
+    table, elapsed = timed(index.author_table, 10)
+    print('index: all authors     %9.2f ms   same mean rank: %s' % (
+        elapsed * 1e3, np.isclose(table['mean_rank'][index.ids[author_key(name)]], mean_rank)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Response cache check: a repeated ArxivScraper run is replayed from disk, and stale entries are revalidated with 304s.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_cache --compress
+"""
+import time
+import shutil
+import argparse
+import tempfile
+from scrapers.arxivscraper import ArxivScraper
+from .mockserver import MockArxiv, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def scrape(server, cache_dir, ttl, compress):
+    end = server.arxiv.days[-1][0]
+    params = {'start': START,
+              'end': {'year': end.year, 'month': end.month, 'day': end.day},
+              'archive': 'quant-ph',
+              'abstract': True,
+              'parallel': False,
+              'save_by_day': False,
+              'save_dir': '',
+              'fetch_mode': 'threads',
+              'rate_limit': None,
+              'url_header': server.url,
+              'cache_dir': cache_dir,
+              'cache_ttl': ttl,
+              'cache_compress': compress}
+    before = server.num_requests
+    t0 = time.perf_counter()
+    results = ArxivScraper(params).start_scraping()
+    return results, server.num_requests - before, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--papers', type=int, default=30, help='papers per day')
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--compress', action='store_true')
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        with MockServer(arxiv, latency=args.latency) as server:
+            reference, num_requests, elapsed = scrape(server, cache_dir, None, args.compress)
+            print('cold cache:  %4d requests  %6.2f s' % (num_requests, elapsed))
+
+            results, num_requests, elapsed = scrape(server, cache_dir, None, args.compress)
+            print('warm cache:  %4d requests  %6.2f s  same output: %s' % (num_requests, elapsed, results == reference))
+
+            results, num_requests, elapsed = scrape(server, cache_dir, 0, args.compress)
+            print('stale cache: %4d requests  %6.2f s  304 responses: %d  same output: %s' % (
+                num_requests, elapsed, server.num_not_modified, results == reference))
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-day rank correlations of a year of synthetic records: a pandas loop over the days (the notebook's
+`corr(method='spearman')` applied day by day) versus analysis.correlation's vectorized RankCorrelations, and the
+nightly case of adding one day to a saved state.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_correlation --days 365 --papers 100
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from analysis.features import build_features
+from analysis.correlation import RankCorrelations
+from .synthetic import arxiv_days, scirate_days
+
+
+def timed(func, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--papers', type=int, default=100, help='papers per day')
+    parser.add_argument('--window', type=int, default=28, help='rolling window in days')
+    args = parser.parse_args()
+
+    arxiv = arxiv_days(args.days, args.papers)
+    scirate, _ = scirate_days(arxiv)
+    df = build_features(arxiv, scirate)
+    print('%d papers, %d days' % (len(df), args.days))
+
+    def pandas_daily():
+        return df.groupby('date')[['arxiv_order', 'scirate_rank']].corr(method='spearman').xs(
+            'arxiv_order', level=1)['scirate_rank']
+    reference, elapsed = timed(pandas_daily)
+    print('pandas per-day spearman        %8.1f ms' % (elapsed * 1e3))
+
+    def build():
+        correlations = RankCorrelations()
+        correlations.add_frame(df, 'quant-ph')
+        return correlations
+    correlations, elapsed = timed(build)
+    daily = correlations.daily()
+    print('vectorized spearman + kendall  %8.1f ms  same spearman: %s' % (
+        elapsed * 1e3, np.allclose(daily['spearman'].values, reference.values)))
+
+    for name, func in [('weekly', correlations.weekly), ('by archive', correlations.by_archive),
+                       ('rolling %d days' % args.window, lambda: correlations.rolling(args.window))]:
+        _, elapsed = timed(func, repeat=10)
+        print('%-30s %8.1f ms' % (name, elapsed * 1e3))
+
+    # nightly: load the state of all the days but the last, add the last day and save
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, 'correlations.npz')
+        last = df['date'] == df['date'].max()
+        previous = RankCorrelations()
+        previous.add_frame(df[~last], 'quant-ph')
+        previous.save(path)
+        new_day = df[last]
+
+        def nightly():
+            state = RankCorrelations.load(path)
+            state.add_frame(new_day, 'quant-ph')
+            return state
+        state, elapsed = timed(nightly, repeat=10)
+        print('nightly load + add one day     %8.1f ms  same as full build: %s' % (
+            elapsed * 1e3, state.daily().equals(daily)))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Deduplication of synthetic Arxiv listings with scrapers.dedup.DedupIndex: the time to check a day as the index grows
+(it should stay flat), the statuses found for injected replacements, repeats, cross-lists and near-duplicates, and
+the cost of saving and loading the index between incremental runs. Comments on earlier papers, as similar but by
+other authors, must stay new. Exits with status 1 when a count differs from the injected one.
+
+Signatures dominate the time per paper at that scale, so the cost of adding a day's band keys is also measured on
+its own over years of days: the sorted runs of the index against inserting into one sorted array.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_dedup --days 730 --papers 60
+"""
+import os
+import sys
+import copy
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from scrapers.common import SortedRuns
+from scrapers.dedup import DedupIndex, STATUSES
+from .synthetic import arxiv_days
+
+
+def inject(days, rate, seed=0):
+    # list earlier papers again on later days, as replacements, repeats, cross-lists and near-duplicates, and add
+    # comments on them. Returns the expected number of papers per status
+    rng = random.Random(seed)
+    expected = dict((status, 0) for status in STATUSES)
+    num_papers = len(days[0]['papers'])
+    versions = {}
+    for d in range(1, len(days)):
+        for _ in range(int(rate * num_papers)):
+            # only papers of the original listings are copied
+            earlier = copy.deepcopy(rng.choice(days[rng.randint(0, d - 1)]['papers'][:num_papers]))
+            status = rng.choice(['replaced', 'repeat', 'cross_list', 'near_duplicate', 'comment'])
+            if status == 'replaced':
+                earlier['num_versions'] = versions[earlier['arxiv_id']] = versions.get(
+                    earlier['arxiv_id'], earlier['num_versions']) + 1
+            elif status == 'cross_list':
+                earlier['cross_list'] = True
+            elif status == 'near_duplicate':
+                earlier['arxiv_id'] = 'dup/%07d' % rng.randint(0, 10 ** 7)
+                earlier['title'] += ' (extended version)'
+            elif status == 'comment':
+                earlier['arxiv_id'] = 'com/%07d' % rng.randint(0, 10 ** 7)
+                earlier['title'] = 'Comment on "%s"' % earlier['title']
+                earlier['authors'] = ['Commenter %d' % rng.randint(0, 10 ** 6)]
+                status = 'new'
+            days[d]['papers'].append(earlier)
+            expected[status] += 1
+    expected['new'] = sum(len(res['papers']) for res in days) - sum(expected[status] for status in STATUSES[1:])
+    return expected
+
+
+def band_key_growth(days, keys_per_day, seed=0):
+    # ms per day to add random band keys, for the sorted runs and for np.insert into one array, at a few index sizes
+    rng = np.random.RandomState(seed)
+    runs = SortedRuns(np.uint64, np.int32)
+    keys, rows = np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int32)
+    timings = {'runs': 0., 'insert': 0.}
+    for d in range(days):
+        new_keys = rng.randint(0, 2 ** 62, size=keys_per_day, dtype=np.int64).astype(np.uint64)
+        new_rows = np.arange(d * keys_per_day, (d + 1) * keys_per_day, dtype=np.int32)
+        t0 = time.perf_counter()
+        runs.add(new_keys, new_rows)
+        timings['runs'] += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        order = np.argsort(new_keys, kind='stable')
+        position = np.searchsorted(keys, new_keys[order])
+        keys, rows = np.insert(keys, position, new_keys[order]), np.insert(rows, position, new_rows[order])
+        timings['insert'] += time.perf_counter() - t0
+        if (d + 1) % (days // 5 or 1) == 0:
+            print('    %9d keys  runs %7.3f ms per day  one array %7.3f ms per day  (%d runs)' % (
+                len(keys), timings['runs'] * 1e3 / (days // 5 or 1), timings['insert'] * 1e3 / (days // 5 or 1),
+                len(runs.runs)))
+            timings = {'runs': 0., 'insert': 0.}
+    merged = runs.merged()
+    return np.array_equal(merged[0], keys) and np.array_equal(np.sort(merged[1]), np.sort(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--papers', type=int, default=60, help='papers per day')
+    parser.add_argument('--rate', type=float, default=0.1, help='papers listed again per new paper')
+    parser.add_argument('--growth-days', type=int, default=3650, help='days of band keys added on their own')
+    args = parser.parse_args()
+
+    days = arxiv_days(args.days, args.papers)
+    expected = inject(days, args.rate)
+    print('%d listed papers' % sum(len(res['papers']) for res in days))
+
+    index = DedupIndex()
+    found = dict((status, 0) for status in STATUSES)
+    t0 = time.perf_counter()
+    for d, res in enumerate(days):
+        # cross-listed papers come from the listing of another archive
+        cross = [paper for paper in res['papers'] if paper.get('cross_list')]
+        papers = [paper for paper in res['papers'] if not paper.get('cross_list')]
+        for archive, part in [('quant-ph', papers), ('cond-mat', cross)]:
+            t1 = time.perf_counter()
+            checks = index.check_day(dict(res, papers=part), archive)
+            elapsed = time.perf_counter() - t1
+            for check in checks:
+                found[check['status']] += 1
+            if archive == 'quant-ph' and (d + 1) % (len(days) // 5 or 1) == 0:
+                print('    %7d papers indexed  %7.3f ms per paper' % (
+                    index.num_papers, elapsed * 1e3 / max(1, len(part))))
+    print('total %.2f s' % (time.perf_counter() - t0))
+    for status in STATUSES:
+        print('    %-15s expected %7d  found %7d' % (status, expected[status], found[status]))
+    failed = found != expected
+
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, 'dedup.npz')
+        t0 = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        DedupIndex.load(path)
+        print('save %.3f s  load %.3f s  %.1f MiB' % (saved, time.perf_counter() - t0,
+                                                    os.path.getsize(path) / 2. ** 20))
+    finally:
+        shutil.rmtree(root)
+
+    print('adding a day of band keys (%d papers x %d bands)' % (args.papers, index.bands))
+    same = band_key_growth(args.growth_days, args.papers * index.bands)
+    print('    same keys: %s' % same)
+    failed = failed or not same
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
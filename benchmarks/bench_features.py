@@ -0,0 +1,109 @@
+"""
+Feature extraction time and memory of the EDA notebook's per-paper loop (object DataFrame + astype) versus the
+vectorized analysis.features builder, on a year of synthetic records, in one piece and chunk by chunk.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_features --days 365 --papers 100
+"""
+import re
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from analysis.features import build_features, iter_features, features_frame
+from .synthetic import arxiv_days, scirate_days
+
+
+def notebook_features(arxiv, scirate):
+    # the notebook: eleven lists filled per paper, one object array, then astype before any numeric work
+    index, title, authors, num_authors, title_length, arxiv_order = [], [], [], [], [], []
+    submit_time, submit_weekday, paper_size, num_versions = [], [], [], []
+    for res in arxiv:
+        for paper in res['papers']:
+            index.append(res['date'] + '_%04d' % paper['order'])
+            title.append(paper['title'])
+            authors.append(paper['authors'])
+            num_authors.append(len(paper['authors']))
+            title_length.append(len(paper['title']))
+            arxiv_order.append(paper['order'])
+            submit_time.append(paper['submit_time'])
+            submit_weekday.append(paper['submit_weekday'])
+            paper_size.append(int(re.findall(r'\d+', paper['size'])[0]))
+            num_versions.append(paper['num_versions'])
+    scirate = dict((paper['arxiv_id'], paper) for res in scirate for paper in res['papers'])
+    scirate_rank = [scirate[i]['rank'] for res in arxiv for i in (p['arxiv_id'] for p in res['papers'])]
+    scite_score = [scirate[i]['scite_count'] for res in arxiv for i in (p['arxiv_id'] for p in res['papers'])]
+
+    columns = [title, authors, num_authors, title_length, arxiv_order, submit_time, submit_weekday, paper_size,
+               num_versions, scirate_rank, scite_score]
+    data = np.empty((len(index), len(columns)), dtype=object)
+    for j, column in enumerate(columns):
+        data[:, j] = column
+    df = pd.DataFrame(data=data, index=index,
+                      columns=['title', 'authors', 'num_authors', 'title_length', 'arxiv_order', 'submit_time',
+                               'submit_weekday', 'paper_size', 'num_versions', 'scirate_rank', 'scite_score'])
+    numeric = df[['num_authors', 'title_length', 'arxiv_order', 'paper_size', 'num_versions', 'scirate_rank',
+                  'scite_score']].astype(float)
+    return df, numeric
+
+
+def measure(func):
+    # wall time of a plain run, then the peak of the memory allocated by a second, traced run
+    t0 = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - t0
+    del result
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2. ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--papers', type=int, default=100, help='papers per day')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    arxiv = arxiv_days(args.days, args.papers)
+    scirate, _ = scirate_days(arxiv)
+    print('%d papers' % sum(len(res['papers']) for res in arxiv))
+
+    (df, numeric), elapsed, peak = measure(lambda: notebook_features(arxiv, scirate))
+    print('notebook    %6.2f s  peak %7.1f MiB  frame %7.1f MiB' % (
+        elapsed, peak, df.memory_usage(deep=True).sum() / 2. ** 20))
+    reference = numeric.corr(method='spearman')
+    del df, numeric
+
+    df, elapsed, peak = measure(lambda: build_features(arxiv, scirate))
+    print('vectorized  %6.2f s  peak %7.1f MiB  frame %7.1f MiB' % (
+        elapsed, peak, df.memory_usage(deep=True).sum() / 2. ** 20))
+    corr = df[reference.columns].corr(method='spearman')
+    print('same correlations: %s' % np.allclose(corr.values, reference.values))
+    del df
+
+    # columns that are already laid out column-wise, e.g. ColumnStore.load, skip the per-paper transposition
+    columns = dict((name, [paper[name] for res in arxiv for paper in res['papers']])
+                   for name in ['order', 'title', 'authors', 'submit_time', 'submit_weekday', 'size', 'num_versions'])
+    columns['date'] = [res['date'] for res in arxiv for _ in res['papers']]
+    df, elapsed, peak = measure(lambda: features_frame(columns))
+    print('columns     %6.2f s  peak %7.1f MiB' % (elapsed, peak))
+    del df, columns
+
+    # chunk by chunk, keeping only a running aggregate, as for data that does not fit in memory
+    def chunked():
+        total = None
+        for chunk in iter_features(arxiv, scirate, args.chunk_size):
+            counts = chunk.groupby('submit_weekday', observed=False)['scite_score'].agg(['sum', 'count'])
+            total = counts if total is None else total + counts
+        return total
+
+    total, elapsed, peak = measure(chunked)
+    print('chunked     %6.2f s  peak %7.1f MiB  (%d papers per chunk)' % (elapsed, peak, args.chunk_size))
+
+
+if __name__ == '__main__':
+    main()
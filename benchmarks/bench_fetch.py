@@ -0,0 +1,65 @@
+"""
+Papers-per-second benchmark of the ArxivScraper fetch modes (sequential, joblib, async and threads) against a
+local mock server. Exits with status 1 when a mode's records differ from the first one's.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_fetch --days 2 --papers 30 --latency 0.05
+"""
+import sys
+import time
+import argparse
+from scrapers.arxivscraper import ArxivScraper
+from .mockserver import MockArxiv, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def run(params):
+    scraper = ArxivScraper(params)
+    t0 = time.perf_counter()
+    results = scraper.start_scraping()
+    elapsed = time.perf_counter() - t0
+    num_papers = sum(len(res['papers']) for res in results)
+    return results, num_papers, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--papers', type=int, default=30, help='papers per day')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of server latency per request')
+    parser.add_argument('--modes', default='sequential,joblib,async,threads')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate-limit', type=float, default=100.)
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    end = arxiv.days[-1][0]
+    with MockServer(arxiv, latency=args.latency) as server:
+        reference = None
+        failed = False
+        for mode in args.modes.split(','):
+            params = {'start': START,
+                      'end': {'year': end.year, 'month': end.month, 'day': end.day},
+                      'archive': 'quant-ph',
+                      'abstract': True,
+                      'parallel': mode == 'joblib',
+                      'save_by_day': False,
+                      'save_dir': '',
+                      'fetch_mode': mode,
+                      'concurrency': args.concurrency,
+                      'rate_limit': args.rate_limit,
+                      'url_header': server.url}
+            results, num_papers, elapsed = run(params)
+            if reference is None:
+                reference = results
+            print('%-12s %5d papers  %7.2f s  %8.2f papers/s  same output: %s' % (
+                mode, num_papers, elapsed, num_papers / elapsed, results == reference))
+            failed |= results != reference
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Speed and accuracy of the indexed PaperMatcher versus the EDA notebook's title.index / SequenceMatcher loop on a
+synthetic multi-month dataset, and of the arXiv identifier join (merge_by_id).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_matching --days 30 --papers 60
+"""
+import time
+import argparse
+from difflib import SequenceMatcher
+import numpy as np
+from analysis.matching import PaperMatcher, merge_by_id
+from .synthetic import arxiv_days, scirate_days
+
+
+def notebook_match(arxiv, scirate):
+    # the notebook's join: exact title lookup, then SequenceMatcher against every Arxiv title
+    title = [paper['title'] for res in arxiv for paper in res['papers']]
+    keys = [(res['date'], paper['order']) for res in arxiv for paper in res['papers']]
+    matches = {}
+    for res in scirate:
+        for paper in res['papers']:
+            title_sci = paper['title']
+            try:
+                idx = title.index(title_sci)
+            except ValueError:
+                str_match = np.array([SequenceMatcher(a=title_sci, b=title_arx).ratio() for title_arx in title])
+                idx = np.argmax(str_match)
+            matches[(res['date'], paper['rank'])] = keys[idx]
+    return matches
+
+
+def accuracy(matches, truth):
+    correct = sum(1 for key, order in truth.items() if matches.get(key) == (key[0], order))
+    return correct / float(len(truth))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--papers', type=int, default=60, help='papers per day')
+    parser.add_argument('--typo-rate', type=float, default=0.05)
+    parser.add_argument('--skip-notebook', action='store_true', help='skip the quadratic baseline')
+    args = parser.parse_args()
+
+    arxiv = arxiv_days(args.days, args.papers)
+    scirate, truth = scirate_days(arxiv, typo_rate=args.typo_rate)
+    print('%d Arxiv papers, %d Scirate papers' % (sum(len(r['papers']) for r in arxiv), len(truth)))
+
+    # titles only, as for data scraped before identifiers were recorded
+    by_title = [{'date': res['date'], 'papers': [dict(paper, arxiv_id=None) for paper in res['papers']]}
+                for res in scirate]
+
+    t0 = time.perf_counter()
+    matcher = PaperMatcher(arxiv)
+    t1 = time.perf_counter()
+    result = matcher.match(by_title)
+    t2 = time.perf_counter()
+    matches = dict(((m['scirate_date'], m['rank']), (m['arxiv_date'], m['order'])) for m in result)
+    fuzzy = sum(1 for m in result if m['method'] == 'fuzzy')
+    unmatched = sum(1 for m in result if m['method'] is None)
+    print('indexed   build %6.2f s  match %6.2f s  accuracy %.4f  (fuzzy %d, unmatched %d)' % (
+        t1 - t0, t2 - t1, accuracy(matches, truth), fuzzy, unmatched))
+
+    t0 = time.perf_counter()
+    rows = merge_by_id(arxiv, scirate)
+    t1 = time.perf_counter()
+    matches = dict(((row['scirate_date'], row['scirate_rank']), (row['date'], row['order']))
+                   for row in rows if row['scirate_rank'] >= 0)
+    print('id join                 match %6.2f s  accuracy %.4f' % (t1 - t0, accuracy(matches, truth)))
+
+    if not args.skip_notebook:
+        t0 = time.perf_counter()
+        matches = notebook_match(arxiv, scirate)
+        t1 = time.perf_counter()
+        print('notebook                match %6.2f s  accuracy %.4f' % (t1 - t0, accuracy(matches, truth)))
+
+
+if __name__ == '__main__':
+    main()
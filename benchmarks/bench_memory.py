@@ -0,0 +1,81 @@
+"""
+Traced memory of a long ArxivScraper run over a synthetic listing of 1000 abstract pages, with and without the
+low-memory mode, against a local mock server. Days are streamed with iter_days and dropped, so any growth comes from
+the scraper itself. The peak is reset every `--window` abstract pages: a flat run has the same peak in every window.
+Only the low-memory mode is expected to be flat: the script exits with status 1 when it is not.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_memory --days 20 --papers 50 --mode threads
+"""
+import sys
+import argparse
+import tracemalloc
+from scrapers.arxivscraper import ArxivScraper
+from .mockserver import MockArxiv, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+MIB = 2. ** 20
+
+
+def traced_run(params, window):
+    # (abstract pages, current MiB, peak MiB of the window) every time a window of pages is done
+    rows = []
+    num_pages = 0
+    tracemalloc.start()
+    try:
+        for res in ArxivScraper(params).iter_days():
+            num_pages += len(res['papers'])
+            del res
+            if num_pages >= (len(rows) + 1) * window:
+                current, peak = tracemalloc.get_traced_memory()
+                rows.append((num_pages, current / MIB, peak / MIB))
+                tracemalloc.reset_peak()
+    finally:
+        tracemalloc.stop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--papers', type=int, default=50, help='papers per day')
+    parser.add_argument('--mode', default='threads', help='fetch mode')
+    parser.add_argument('--parser', default='soup', help='parser backend')
+    parser.add_argument('--window', type=int, default=100, help='abstract pages per peak measurement')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='largest ratio of any window peak to the first one in a flat run')
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    end = arxiv.days[-1][0]
+    with MockServer(arxiv) as server:
+        for low_memory in [False, True]:
+            params = {'start': START,
+                      'end': {'year': end.year, 'month': end.month, 'day': end.day},
+                      'archive': 'quant-ph',
+                      'abstract': True,
+                      'parallel': args.mode == 'joblib',
+                      'save_by_day': False,
+                      'save_dir': '',
+                      'fetch_mode': args.mode,
+                      'concurrency': args.concurrency,
+                      'rate_limit': 0,
+                      'url_header': server.url,
+                      'parser': args.parser,
+                      'low_memory': low_memory}
+            rows = traced_run(params, args.window)
+            print('low_memory %s' % low_memory)
+            for num_pages, current, peak in rows:
+                print('    %5d pages  %7.2f MiB current  %7.2f MiB window peak' % (num_pages, current, peak))
+            peaks = [peak for _, _, peak in rows]
+            flat = max(peaks) <= args.tolerance * peaks[0]
+            print('    max peak %.2f MiB  flat: %s' % (max(peaks), flat))
+            failed = low_memory and not flat
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
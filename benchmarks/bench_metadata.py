@@ -0,0 +1,61 @@
+"""
+Round trips of the two ArxivScraper metadata sources against a local mock server: one abstract page per paper versus
+bulk OAI-PMH records. Exits with status 1 when the two give different records.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_metadata --days 5 --papers 40
+"""
+import sys
+import time
+import argparse
+from scrapers.arxivscraper import ArxivScraper
+from .mockserver import MockArxiv, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+# fields that both sources must agree on
+FIELDS = ('title', 'authors', 'order', 'abstract', 'num_versions', 'submit_weekday', 'submit_time', 'size',
+          'paper_link')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--papers', type=int, default=40, help='papers per day')
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    end = arxiv.days[-1][0]
+    with MockServer(arxiv, latency=args.latency) as server:
+        outputs = {}
+        for metadata in ['abstract_page', 'oai']:
+            params = {'start': START,
+                      'end': {'year': end.year, 'month': end.month, 'day': end.day},
+                      'archive': 'quant-ph',
+                      'abstract': True,
+                      'parallel': False,
+                      'save_by_day': False,
+                      'save_dir': '',
+                      'fetch_mode': 'threads',
+                      'rate_limit': None,
+                      'metadata': metadata,
+                      'url_header': server.url,
+                      'oai_url': server.url + '/oai2'}
+            before = server.num_requests
+            t0 = time.perf_counter()
+            results = ArxivScraper(params).start_scraping()
+            elapsed = time.perf_counter() - t0
+            num_papers = sum(len(res['papers']) for res in results)
+            outputs[metadata] = [[tuple(paper[k] for k in FIELDS) for paper in res['papers']] for res in results]
+            print('%-14s %5d papers  %5d requests  %6.2f s' % (metadata, num_papers, server.num_requests - before,
+                                                              elapsed))
+        same = outputs['abstract_page'] == outputs['oai']
+        print('same records: %s' % same)
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Where the time of an ArxivScraper run goes, per fetch mode: the stage timers, request counts and latency of the run's
+metrics report, against a local mock server. Stage seconds are summed over threads, and the stages of joblib worker
+processes are only seen through the wall time of day_papers.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_metrics --days 2 --papers 30 --latency 0.05 --progress 1
+"""
+import os
+import json
+import shutil
+import argparse
+import tempfile
+from scrapers.arxivscraper import ArxivScraper
+from .mockserver import MockArxiv, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--papers', type=int, default=30, help='papers per day')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of server latency per request')
+    parser.add_argument('--modes', default='sequential,joblib,threads')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--progress', type=float, default=None, help='seconds between progress lines')
+    parser.add_argument('--profile', action='store_true', help='also write cProfile and tracemalloc output')
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    end = arxiv.days[-1][0]
+    root = tempfile.mkdtemp()
+    try:
+        with MockServer(arxiv, latency=args.latency) as server:
+            for mode in args.modes.split(','):
+                params = {'start': START,
+                          'end': {'year': end.year, 'month': end.month, 'day': end.day},
+                          'archive': 'quant-ph',
+                          'abstract': True,
+                          'parallel': mode == 'joblib',
+                          'save_by_day': False,
+                          'save_dir': '',
+                          'fetch_mode': mode,
+                          'concurrency': args.concurrency,
+                          'rate_limit': 0,
+                          'url_header': server.url,
+                          'parser': 'lxml',
+                          'metrics_report': os.path.join(root, mode + '.json'),
+                          'progress_interval': args.progress}
+                if args.profile:
+                    params['profile_path'] = os.path.join(root, mode)
+                ArxivScraper(params).start_scraping()
+                with open(params['metrics_report'], 'r') as f:
+                    report = json.load(f)
+
+                print('%s: %.2f s, %.2f papers/s' % (mode, report['elapsed'], report['papers_per_second']))
+                for counter in report['counters']:
+                    if counter['name'] == 'stage_seconds':
+                        stage = counter['labels']['stage']
+                        calls = [c['value'] for c in report['counters']
+                                 if c['name'] == 'stage_calls' and c['labels']['stage'] == stage][0]
+                        print('    %-16s %6d calls  %8.3f s' % (stage, calls, counter['value']))
+                for histogram in report['histograms']:
+                    print('    %-16s %6d requests  mean %6.1f ms' % (
+                        histogram['labels']['url_type'], histogram['count'],
+                        1e3 * histogram['sum'] / max(histogram['count'], 1)))
+                if args.profile:
+                    with open(params['profile_path'] + '.txt', 'r') as f:
+                        print(''.join(f.readlines()[:20]))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Offline benchmark of the scrapers on the recorded pages of benchmarks/fixtures, replayed by a local mock server with
+optional latency, errors and rate limiting: end-to-end papers per second, requests, retries and peak traced memory of
+ArxivScraper's sequential and joblib (`parallel: true`) modes and of ScirateScraper, then the parse cost per recorded
+page of each parser backend.
+
+The scrapers are network-bound, so memory is traced during the timed run. tracemalloc only sees the allocations of
+this process, not those of joblib worker processes or lxml's C trees.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_offline --latency 0.05 --error-rate 0.05 --rate-limit 20
+"""
+import os
+import time
+import argparse
+import tracemalloc
+from scrapers.arxivscraper import ArxivScraper
+from scrapers.sciratescraper import ScirateScraper
+from scrapers.parsers import PARSERS, get_parser
+from .mockserver import MockServer
+from .recorded import FixtureSet
+from .bench_parse import extract, measure
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# bench_parse's name of the pages of each url type
+PAGE_KINDS = {'catchup': 'catchup', 'abstract': 'abstract', 'scirate_day': 'scirate'}
+
+
+def run(scraper):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    results = scraper.start_scraping()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return results, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', default=FIXTURES, help='directory of recorded pages')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of server latency per request')
+    parser.add_argument('--error-rate', type=float, default=0., help='fraction of requests answered with a 503')
+    parser.add_argument('--rate-limit', type=float, default=None, help='requests per second before 429 errors')
+    parser.add_argument('--modes', default='sequential,joblib')
+    parser.add_argument('--parser', default='soup', help='parser backend of the scrapers')
+    parser.add_argument('--repeat', type=int, default=20, help='parses per page for the parse cost')
+    args = parser.parse_args()
+
+    fixtures = FixtureSet(args.fixtures)
+    with MockServer(fixtures=fixtures, latency=args.latency, error_rate=args.error_rate, retry_after=0.1,
+                    rate_limit=args.rate_limit) as server:
+        runs = [(mode, ArxivScraper, dict(fixtures.scraper_params('arxiv', server.url), parallel=mode == 'joblib',
+                                          fetch_mode=mode)) for mode in args.modes.split(',')]
+        runs.append(('scirate', ScirateScraper, fixtures.scraper_params('scirate', server.url)))
+
+        reference = {}
+        for name, scraper_class, params in runs:
+            # injected errors are retried quickly, so the numbers show the cost of the retries, not of the backoff
+            params.update({'parser': args.parser, 'backoff_base': 0.05, 'max_retries': 5})
+            scraper = scraper_class(params)
+            num_requests, num_throttled = server.num_requests, server.num_throttled
+            results, elapsed, peak = run(scraper)
+            num_papers = sum(len(res['papers']) for res in results)
+            reference.setdefault(scraper_class, results)
+            print('%-10s %4d papers  %7.2f s  %7.2f papers/s  %4d requests  %3d retries  %3d throttled  '
+                  '%7.1f KiB peak  same output: %s' % (
+                      name, num_papers, elapsed, num_papers / elapsed, server.num_requests - num_requests,
+                      scraper.metrics.total('retries'), server.num_throttled - num_throttled, peak / 1024.,
+                      results == reference[scraper_class]))
+
+    pages = {}
+    for kind, html in fixtures.kinds():
+        if kind in PAGE_KINDS:
+            pages.setdefault(PAGE_KINDS[kind], []).append(html)
+    reference = get_parser('soup')
+    for kind, htmls in sorted(pages.items()):
+        for name in sorted(PARSERS):
+            backend = get_parser(name)
+            costs = [measure(backend, kind, html, args.repeat) for html in htmls]
+            identical = all(extract(backend, kind, html) == extract(reference, kind, html) for html in htmls)
+            print('%-9s %-5s %3d pages  %8.2f ms/page  %8.1f KiB peak  identical: %s' % (
+                kind, name, len(htmls), 1e3 * sum(c[0] for c in costs) / len(costs),
+                max(c[1] for c in costs) / 1024., identical))
+
+
+if __name__ == '__main__':
+    main()
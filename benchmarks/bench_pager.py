@@ -0,0 +1,72 @@
+"""
+Wall time and number of catchup pages of ArxivScraper for several page sizes, with and without prefetching the next
+catchup page, against a local mock server.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pager --days 6 --papers 30 --latency 0.05
+"""
+import time
+import argparse
+from scrapers.arxivscraper import ArxivScraper
+from .mockserver import MockArxiv, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+class PageCounter:
+    # wraps a transport's get to count catchup page requests
+    def __init__(self, get):
+        self.get = get
+        self.num_pages = 0
+
+    def __call__(self, url):
+        if '/catchup?' in url:
+            self.num_pages += 1
+        return self.get(url)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=6)
+    parser.add_argument('--papers', type=int, default=30, help='papers per day')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of server latency per request')
+    parser.add_argument('--page-sizes', default='25,50,100,200')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    # the period ends before the last listed day, so pages past the end could be downloaded
+    arxiv = MockArxiv(START, num_days=args.days + 2, papers_per_day=args.papers)
+    end = arxiv.days[args.days - 1][0]
+    with MockServer(arxiv, latency=args.latency) as server:
+        reference = None
+        for page_size in [int(size) for size in args.page_sizes.split(',')]:
+            for prefetch in [False, True]:
+                params = {'start': START,
+                          'end': {'year': end.year, 'month': end.month, 'day': end.day},
+                          'archive': 'quant-ph',
+                          'abstract': False,
+                          'parallel': False,
+                          'save_by_day': False,
+                          'save_dir': '',
+                          'fetch_mode': 'threads',
+                          'concurrency': args.concurrency,
+                          'rate_limit': 0,
+                          'url_header': server.url,
+                          'parser': 'lxml',
+                          'page_size': page_size,
+                          'prefetch': prefetch}
+                scraper = ArxivScraper(params)
+                counter = PageCounter(scraper.transport.get)
+                scraper.transport.get = counter
+                t0 = time.perf_counter()
+                results = scraper.start_scraping()
+                elapsed = time.perf_counter() - t0
+                if reference is None:
+                    reference = results
+                print('page size %4d  prefetch %-5s  %6.2f s  %3d catchup pages  %2d days  same output: %s' % (
+                    page_size, prefetch, elapsed, counter.num_pages, len(results), results == reference))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Parse time and memory per page of the html parser backends, and a golden-output check that every backend extracts
+exactly the same records as the BeautifulSoup reference. Exits with status 1 when a backend's records differ.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_parse --papers 50 --repeat 20
+"""
+import sys
+import time
+import argparse
+import tracemalloc
+from scrapers.parsers import PARSERS, get_parser
+from .mockserver import MockArxiv, MockScirate
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def extract(parser, kind, html):
+    # every record a scraper would extract from one page
+    if kind == 'catchup':
+        doc = parser.load(html)
+        days = [(date, parser.arxiv_entries(section)) for date, section in parser.arxiv_days(doc)]
+        return days, parser.arxiv_next_href(doc)
+    if kind == 'abstract':
+        return parser.arxiv_abstract(html)
+    doc = parser.load(html)
+    return parser.scirate_papers(doc), parser.scirate_next_href(doc)
+
+
+def measure(parser, kind, html, repeat):
+    # mean seconds and peak traced memory per page. tracemalloc only sees Python allocations, not lxml's C trees
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        extract(parser, kind, html)
+    elapsed = (time.perf_counter() - t0) / repeat
+
+    tracemalloc.start()
+    extract(parser, kind, html)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def fixture_pages(num_papers):
+    arxiv = MockArxiv(START, num_days=1, papers_per_day=num_papers)
+    scirate = MockScirate(arxiv)
+    query = {'syear': ['2018'], 'smonth': ['3'], 'sday': ['1'], 'num': [str(num_papers)]}
+    return [('catchup', arxiv.catchup_page(query)),
+            ('abstract', arxiv.abstract_page(arxiv.days[0][1][0])),
+            ('scirate', scirate.day_page({'date': ['2018-03-01']}))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--papers', type=int, default=50, help='papers per listing page')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    reference = get_parser('soup')
+    failed = False
+    for kind, html in fixture_pages(args.papers):
+        golden = extract(reference, kind, html)
+        for name in sorted(PARSERS):
+            backend = get_parser(name)
+            elapsed, peak = measure(backend, kind, html, args.repeat)
+            identical = extract(backend, kind, html) == golden
+            print('%-9s %-5s %8.2f ms/page  %8.1f KiB peak  identical: %s' % (
+                kind, name, elapsed * 1e3, peak / 1024., identical))
+            failed |= not identical
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
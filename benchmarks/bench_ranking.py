@@ -0,0 +1,87 @@
+"""
+Training and scoring throughput of analysis.ranking.RankingModel on synthetic features, with both losses, and how
+well it ranks held-out days next to the Arxiv listing order alone.
+
+The synthetic scite counts of benchmarks.synthetic do not depend on the papers, so they are redrawn here from a
+known log-linear function of the listing order, author count, size and submit time, plus noise.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_ranking --days 730 --papers 100
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from analysis.features import build_features
+from analysis.ranking import RankingModel
+from .synthetic import arxiv_days, scirate_days
+
+
+def add_scites(df, seed):
+    # scites drawn from a Poisson whose log mean falls with the listing order and grows with the number of authors
+    rng = np.random.RandomState(seed)
+    hours = df['submit_seconds'].to_numpy() / 3600.
+    log_mean = (1.5 - 0.35 * np.log1p(df['arxiv_order'].to_numpy()) + 0.4 * np.log1p(df['num_authors'].to_numpy()) +
+                0.1 * np.log1p(df['paper_size'].to_numpy()) + 0.3 * np.cos(2 * np.pi * (hours - 18) / 24.) +
+                rng.normal(0, 0.5, size=len(df)))
+    df['scite_score'] = rng.poisson(np.exp(log_mean)).astype(np.int32)
+    ranks = df.groupby('date')['scite_score'].rank(ascending=False, method='first')
+    df['scirate_rank'] = (ranks.to_numpy() - 1).astype(np.int32)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--papers', type=int, default=100, help='papers per day')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    arxiv = arxiv_days(args.days, args.papers, seed=args.seed)
+    df = add_scites(build_features(arxiv, scirate_days(arxiv)[0]), args.seed)
+    dates = np.sort(df['date'].unique())
+    split = dates[int(len(dates) * 0.8)]
+    train, test = df[df['date'] < split], df[df['date'] >= split]
+    print('%d training papers, %d test papers' % (len(train), len(test)))
+
+    root = tempfile.mkdtemp()
+    try:
+        for loss in ['pairwise', 'regression']:
+            model = RankingModel(loss, seed=args.seed)
+            t0 = time.perf_counter()
+            losses = model.fit(train, epochs=args.epochs)
+            elapsed = time.perf_counter() - t0
+            examples = args.epochs * max(1, len(train) // model.batch_size) * model.batch_size
+            print('%-10s fit %6.2f s  %8.0f k %s/s  loss %.3f -> %.3f' % (
+                loss, elapsed, examples / elapsed / 1e3, 'pairs' if loss == 'pairwise' else 'papers', losses[0],
+                losses[-1]))
+
+            t0 = time.perf_counter()
+            model.score(test)
+            elapsed = time.perf_counter() - t0
+            day = test[test['date'] == test['date'].iloc[0]]
+            t1 = time.perf_counter()
+            for _ in range(100):
+                model.rank(day)
+            print('%-10s score %8.0f k papers/s   rank one day (%d papers) %.2f ms' % (
+                '', len(test) / elapsed / 1e3, len(day), (time.perf_counter() - t1) * 10))
+
+            metrics = model.evaluate(test)
+            print('%-10s held-out spearman %.3f  kendall %.3f   (listing order alone %.3f, %.3f)' % (
+                '', metrics['spearman'], metrics['kendall'], metrics['order_spearman'], metrics['order_kendall']))
+
+            path = os.path.join(root, '%s.npz' % loss)
+            model.save(path)
+            same = np.array_equal(RankingModel.load(path).score(test), model.score(test))
+            print('%-10s saved and loaded scores identical: %s' % ('', same))
+            print('%-10s weights %s' % ('', pd.Series(model.coefficients()).round(3).to_dict()))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Memory of 100k scraped papers held as the scrapers' dicts versus scrapers.records.DayRecords, with and without
+abstracts. The dicts are read back from json, like the saved day files, so no string is shared between papers.
+Also times the conversion both ways and checks that it is lossless.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_records --papers 100000 --per-day 60
+"""
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+from scrapers.records import AuthorNames, DayRecords
+from .synthetic import arxiv_days, scirate_days
+
+
+MIB = 2. ** 20
+
+
+def traced(build):
+    # (result, traced bytes still held by the result)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--papers', type=int, default=100000)
+    parser.add_argument('--per-day', type=int, default=60, help='papers per day')
+    args = parser.parse_args()
+
+    num_days = -(-args.papers // args.per_day)
+    arxiv = arxiv_days(num_days, args.per_day)
+    scirate, _ = scirate_days(arxiv)
+    scale = 100000. / (num_days * args.per_day)
+    print('%d papers, figures per 100k papers' % (num_days * args.per_day))
+
+    without_abstract = [dict(res, papers=[dict(paper, abstract='') for paper in res['papers']]) for res in arxiv]
+    for name, days in [('arxiv', arxiv), ('arxiv, no abstract', without_abstract), ('scirate', scirate)]:
+        text = json.dumps(days)
+        dicts, dict_bytes = traced(lambda: json.loads(text))
+        del text
+        names = AuthorNames()
+        records, record_bytes = traced(lambda: [DayRecords.from_dict(res, names) for res in dicts])
+        # timed again without tracing, which slows every allocation down
+        names = AuthorNames()
+        t0 = time.perf_counter()
+        records = [DayRecords.from_dict(res, names) for res in dicts]
+        encode = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        lossless = [res.to_dict() for res in records] == dicts
+        decode = time.perf_counter() - t0
+        print('%-20s dicts %8.1f MiB  records %8.1f MiB (%.1fx)  encode %6.2f s  decode %6.2f s  lossless: %s' % (
+            name, dict_bytes * scale / MIB, record_bytes * scale / MIB, dict_bytes / float(record_bytes),
+            encode * scale, decode * scale, lossless))
+        del dicts, records
+
+
+if __name__ == '__main__':
+    main()
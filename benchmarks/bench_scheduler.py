@@ -0,0 +1,89 @@
+"""
+Wall time of getpaperdata.py's back-to-back Arxiv and Scirate runs versus the sharded Scheduler with a pool of
+worker processes, against a local mock server, with a per-host rate limit shared by all the workers.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_scheduler --days 8 --papers 20 --workers 4 --rate-limit 40
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from scrapers.arxivscraper import ArxivScraper
+from scrapers.sciratescraper import ScirateScraper
+from scrapers.scheduler import Scheduler
+from scrapers.transport import Transport
+from scrapers.ratelimit import SharedRateLimiter
+from .mockserver import MockArxiv, MockScirate, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def saved_files(root):
+    return sorted(os.path.relpath(os.path.join(path, name), root) for path, _, names in os.walk(root)
+                  for name in names if name.endswith('.json') and 'checkpoint' not in path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=8)
+    parser.add_argument('--papers', type=int, default=20, help='papers per day')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of server latency per request')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--shard-days', type=int, default=2)
+    parser.add_argument('--rate-limit', type=float, default=40., help='requests per second to the mock host')
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    end = arxiv.days[-1][0]
+    end = {'year': end.year, 'month': end.month, 'day': end.day}
+    root = tempfile.mkdtemp()
+    try:
+        with MockServer(arxiv, MockScirate(arxiv), latency=args.latency) as server:
+            sources = {
+                'arxiv': {'abstract': True, 'parallel': False, 'fetch_mode': 'threads', 'rate_limit': 0,
+                          'url_header': server.url, 'parser': 'lxml'},
+                'scirate': {'url_header': server.url, 'parser': 'lxml'}
+            }
+            host = server.url.split('//')[1]
+
+            # getpaperdata.py: one process, Arxiv then Scirate, with the same shared rate limit
+            rate_limiter = SharedRateLimiter(os.path.join(root, 'sequential.db'), {host: args.rate_limit})
+            transport = Transport(rate_limiter=rate_limiter)
+            t0 = time.perf_counter()
+            for source, scraper in [('arxiv', ArxivScraper), ('scirate', ScirateScraper)]:
+                params = dict(sources[source], start=START, end=end, archive='quant-ph', save_by_day=True,
+                              save_dir=os.path.join(root, 'sequential', source, 'quant-ph'))
+                os.makedirs(params['save_dir'])
+                scraper(params, transport).start_scraping()
+            elapsed = time.perf_counter() - t0
+            num_requests = server.num_requests
+            print('sequential            %7.2f s  %5d requests  %6.1f requests/s' % (
+                elapsed, num_requests, num_requests / elapsed))
+
+            params = {'sources': dict((source, dict(p, save_dir=os.path.join(root, 'sharded', source, '{archive}')))
+                                      for source, p in sources.items()),
+                      'archives': ['quant-ph'],
+                      'start': START,
+                      'end': end,
+                      'shard_days': args.shard_days,
+                      'num_workers': args.workers,
+                      'queue_path': os.path.join(root, 'queue.db'),
+                      'rate_limits': {host: args.rate_limit}}
+            t0 = time.perf_counter()
+            counts = Scheduler(params).run()
+            elapsed = time.perf_counter() - t0
+            num_requests = server.num_requests - num_requests
+            print('scheduler %2d workers  %7.2f s  %5d requests  %6.1f requests/s  (limit %.1f)  units %s' % (
+                args.workers, elapsed, num_requests, num_requests / elapsed, args.rate_limit, counts))
+
+        same = saved_files(os.path.join(root, 'sequential')) == saved_files(os.path.join(root, 'sharded'))
+        print('same days saved: %s' % same)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
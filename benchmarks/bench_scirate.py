@@ -0,0 +1,57 @@
+"""
+Wall time of ScirateScraper's chain mode (following the next-day link of every page) versus the direct mode
+(all day urls built up front and fetched concurrently), with daily pages and with week-long range windows, against
+a local mock server with empty days.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_scirate --days 28 --papers 20 --latency 0.05
+"""
+import time
+import argparse
+from scrapers.sciratescraper import ScirateScraper
+from .mockserver import MockArxiv, MockScirate, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--papers', type=int, default=20, help='papers per day')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of server latency per request')
+    parser.add_argument('--empty-every', type=int, default=7, help='every n-th day has no papers, like weekends')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate-limit', type=float, default=100.)
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    end = arxiv.days[-1][0]
+    with MockServer(arxiv, MockScirate(arxiv, empty_every=args.empty_every), latency=args.latency) as server:
+        reference = None
+        for mode, day_range in [('chain', 1), ('direct', 1), ('direct', 7)]:
+            params = {'start': START,
+                      'end': {'year': end.year, 'month': end.month, 'day': end.day},
+                      'archive': 'quant-ph',
+                      'save_by_day': False,
+                      'save_dir': '',
+                      'url_header': server.url,
+                      'parser': 'lxml',
+                      'fetch_mode': mode,
+                      'day_range': day_range,
+                      'concurrency': args.concurrency,
+                      'rate_limit': args.rate_limit}
+            num_requests = server.num_requests
+            t0 = time.perf_counter()
+            results = ScirateScraper(params).start_scraping()
+            elapsed = time.perf_counter() - t0
+            papers = set(paper['arxiv_id'] for res in results for paper in res['papers'])
+            if reference is None:
+                reference = results
+            print('%-7s range %d  %7.2f s  %4d requests  %5d papers  same days: %-5s  same papers: %s' % (
+                mode, day_range, elapsed, server.num_requests - num_requests, len(papers), results == reference,
+                papers == set(paper['arxiv_id'] for res in reference for paper in res['papers'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Scite tracking over simulated weeks against a local mock Scirate whose counts keep growing after listing: the pages
+polled and records written by scrapers.scites (re-polls at 1, 2, 4 and 8 days) versus re-scraping and storing every
+listed day each day, and the time to rebuild scite curves from the log. The rebuilt curves are checked against the
+mock's counts at every poll.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_scites --days 60 --papers 50
+"""
+import os
+import time
+import shutil
+import argparse
+import calendar
+import datetime
+import tempfile
+import numpy as np
+from scrapers.sciratescraper import ScirateScraper
+from scrapers.scites import SciteLog, track, DELTA_DTYPE
+from .mockserver import MockArxiv, MockScirate, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def grow(scirate, today, rng):
+    # new scites of the papers listed before today, fewer as papers get older
+    for date, ids in scirate.days:
+        age = (today - date).days
+        if age < 0:
+            continue
+        for arxiv_id, new in zip(ids, rng.poisson(4. * 0.5 ** age, size=len(ids))):
+            scirate.scites[arxiv_id] += int(new)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--papers', type=int, default=50, help='papers per day')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+    scirate = MockScirate(arxiv)
+    scirate.scites = dict((arxiv_id, 0) for arxiv_id in scirate.scites)
+    first = arxiv.days[0][0]
+    root = tempfile.mkdtemp()
+    try:
+        with MockServer(arxiv, scirate) as server:
+            params = {'start': START, 'end': START, 'archive': 'quant-ph', 'save_by_day': False, 'save_dir': '',
+                      'url_header': server.url, 'parser': 'lxml'}
+            scraper = ScirateScraper(params)
+            log = SciteLog(os.path.join(root, 'scites'))
+            truth = {}
+            pages, full_pages, full_records = 0, 0, 0
+            elapsed = 0.
+            for d in range(args.days + 9):
+                today = first + datetime.timedelta(days=d)
+                grow(scirate, today, rng)
+                polled_at = calendar.timegm(today.timetuple()) + 12 * 3600
+                t0 = time.perf_counter()
+                summary = track(scraper, log, today, polled_at)
+                elapsed += time.perf_counter() - t0
+                pages += summary['days']
+                # the counts the mock served at this poll, for the papers of the days polled
+                for date in log.polls:
+                    if polled_at in log.polls[date]:
+                        listed = datetime.date(*[int(x) for x in date.split('_')[1:]])
+                        for day, ids in scirate.days:
+                            if day == listed:
+                                for arxiv_id in ids:
+                                    truth.setdefault(arxiv_id, []).append((polled_at, scirate.scites[arxiv_id]))
+                # re-scraping every listed day instead
+                listed_days = [ids for day, ids in scirate.days if day < today]
+                full_pages += len(listed_days)
+                full_records += sum(len(ids) for ids in listed_days)
+
+        num_records = len(log.deltas())
+        print('%d papers over %d days' % (log.num_papers, args.days))
+        print('tracking   %6d pages  %8d records  %8.1f KiB  %.2f s' % (
+            pages, num_records, num_records * DELTA_DTYPE.itemsize / 1024., elapsed))
+        print('full daily %6d pages  %8d records  %8.1f KiB' % (
+            full_pages, full_records, full_records * DELTA_DTYPE.itemsize / 1024.))
+
+        # the step curve at every poll time is the count the mock served
+        log = SciteLog(os.path.join(root, 'scites'))
+        t0 = time.perf_counter()
+        curves = dict((arxiv_id, log.curve(arxiv_id)) for arxiv_id in log.arxiv_ids)
+        elapsed = time.perf_counter() - t0
+        same = all(curves[arxiv_id]['counts'][np.searchsorted(curves[arxiv_id]['times'], polled, side='right') - 1]
+                   == count for arxiv_id, polls in truth.items() for polled, count in polls)
+        print('rebuild every curve %.1f ms (%.3f ms per paper)  same as served: %s' % (
+            elapsed * 1e3, elapsed * 1e3 / max(1, log.num_papers), same))
+        t0 = time.perf_counter()
+        counts = log.counts_at(8.5)
+        print('counts at 8.5 days for every paper %.2f ms  mean %.1f scites' % (
+            (time.perf_counter() - t0) * 1e3, counts[counts >= 0].mean()))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Full-text search over years of synthetic Arxiv abstracts: a scan of every paper's strings (what answering a query
+from the json files needs) versus scrapers.search.SearchIndex, for word, phrase, author and date queries, plus the
+cost of building the index and of adding one day to it.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_search --days 1095 --papers 60
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from scrapers.search import SearchIndex, tokenize
+from .synthetic import arxiv_days
+
+
+QUERIES = [('words', 'topological photonic', {}),
+           ('phrase', '"quantum error correction"', {}),
+           ('phrase and words', '"spin noise" gate', {}),
+           ('author', '', {'authors': ['Author 12']}),
+           ('words, author and dates', 'entanglement', {'authors': ['Author 12'], 'date_from': 'day_2019_01_01',
+                                                        'date_until': 'day_2019_06_30'})]
+
+
+def timed(func, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - t0) / repeat
+
+
+def scan(days, query):
+    # arXiv identifiers of the papers whose title or abstract contains every word of the query, in order
+    words = tokenize(query)
+    found = []
+    for res in days:
+        for paper in res['papers']:
+            tokens = ' %s %s ' % (' '.join(tokenize(paper['title'])), ' '.join(tokenize(paper['abstract'])))
+            if ' %s ' % ' '.join(words) in tokens:
+                found.append(paper['arxiv_id'])
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--papers', type=int, default=60, help='papers per day')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    days = arxiv_days(args.days, args.papers)
+    print('%d papers' % sum(len(res['papers']) for res in days))
+    root = tempfile.mkdtemp()
+    try:
+        index = SearchIndex(os.path.join(root, 'index'), buffer_size=args.papers)
+        _, elapsed = timed(lambda: (index.add_days(days[:-1]), index.flush()))
+        print('build, one segment per day  %9.2f s   %d segments' % (elapsed, len(index.segments)))
+        _, elapsed = timed(lambda: (index.add_day(days[-1]), index.flush()))
+        print('add one day                 %9.2f ms' % (elapsed * 1e3))
+
+        found, elapsed = timed(lambda: scan(days, 'quantum error correction'))
+        print('scan: phrase                %9.2f ms   %d papers' % (elapsed * 1e3, len(found)))
+        index = SearchIndex(os.path.join(root, 'index'))
+        matches = index.search('"quantum error correction"', limit=len(found) + 1)
+        print('index: same papers as the scan: %s' % (set(r['arxiv_id'] for r in matches) == set(found)))
+        for name, query, filters in QUERIES:
+            results, elapsed = timed(lambda: index.search(query, limit=10, **filters), args.repeat)
+            print('index: %-20s %9.2f ms   top score %.3g' % (
+                name, elapsed * 1e3, results[0]['score'] if results else float('nan')))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
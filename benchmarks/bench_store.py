@@ -0,0 +1,72 @@
+"""
+Load time of scraped data from per-day json files (the EDA notebook's path) versus the ColumnStore, including a
+date-range query, and a lossless round-trip check.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_store --days 365 --papers 60
+"""
+import os
+import json
+import time
+import glob
+import shutil
+import argparse
+import tempfile
+from scrapers.checkpoint import write_json
+from scrapers.store import ColumnStore
+from .synthetic import arxiv_days
+
+
+def load_json(json_dir, date_from=None, date_until=None):
+    # the notebook: open every file, then build Python lists column by column
+    data = []
+    for path in sorted(glob.glob(os.path.join(json_dir, '*_arxiv.json'))):
+        with open(path, 'r') as f:
+            res = json.load(f)
+        if (date_from is None or res['date'] >= date_from) and (date_until is None or res['date'] <= date_until):
+            data.append(res)
+    order = [paper['order'] for res in data for paper in res['papers']]
+    num_versions = [paper['num_versions'] for res in data for paper in res['papers']]
+    return order, num_versions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--papers', type=int, default=60, help='papers per day')
+    args = parser.parse_args()
+
+    days = arxiv_days(args.days, args.papers)
+    root = tempfile.mkdtemp()
+    try:
+        json_dir = os.path.join(root, 'json')
+        os.makedirs(json_dir)
+        store = ColumnStore(os.path.join(root, 'store'))
+
+        t0 = time.perf_counter()
+        for res in days:
+            write_json(os.path.join(json_dir, res['date'] + '_arxiv.json'), res)
+        t1 = time.perf_counter()
+        for res in days:
+            store.append('arxiv', 'quant-ph', res['date'], res['papers'])
+        t2 = time.perf_counter()
+        print('write       json %7.3f s   store %7.3f s' % (t1 - t0, t2 - t1))
+
+        # a month in the middle of the range
+        month = (days[len(days) // 2]['date'], days[min(len(days) - 1, len(days) // 2 + 30)]['date'])
+        for label, date_from, date_until in [('all days', None, None), ('one month', month[0], month[1])]:
+            t0 = time.perf_counter()
+            order, num_versions = load_json(json_dir, date_from, date_until)
+            t1 = time.perf_counter()
+            table = store.load('arxiv', 'quant-ph', date_from, date_until, columns=['order', 'num_versions'])
+            t2 = time.perf_counter()
+            same = table['order'].tolist() == order and table['num_versions'].tolist() == num_versions
+            print('%-11s json %7.3f s   store %7.3f s   same values: %s' % (label, t1 - t0, t2 - t1, same))
+
+        print('lossless round trip: %s' % (list(store.records('arxiv', 'quant-ph')) == days))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
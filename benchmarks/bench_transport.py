@@ -0,0 +1,83 @@
+"""
+Retry and backoff check of the shared Transport against a local mock server that injects 503 errors. Exits with
+status 1 when the output changes under errors or a failing server does not raise.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_transport --error-rate 0.2
+"""
+import sys
+import time
+import argparse
+import requests
+from scrapers.arxivscraper import ArxivScraper
+from scrapers.transport import Transport
+from .mockserver import MockArxiv, MockServer
+
+
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def scrape(server, transport):
+    end = server.arxiv.days[-1][0]
+    params = {'start': START,
+              'end': {'year': end.year, 'month': end.month, 'day': end.day},
+              'archive': 'quant-ph',
+              'abstract': True,
+              'parallel': False,
+              'save_by_day': False,
+              'save_dir': '',
+              'fetch_mode': 'threads',
+              'rate_limit': None,
+              'url_header': server.url}
+    return ArxivScraper(params, transport).start_scraping()
+
+
+def strip_links(results):
+    # paper links contain the port of the mock server, which differs between servers
+    return [[dict((k, v) for k, v in paper.items() if k != 'paper_link') for paper in res['papers']]
+            for res in results]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--papers', type=int, default=30, help='papers per day')
+    parser.add_argument('--error-rate', type=float, default=0.2)
+    parser.add_argument('--retry-after', type=float, default=0.05)
+    args = parser.parse_args()
+
+    arxiv = MockArxiv(START, num_days=args.days, papers_per_day=args.papers)
+
+    # reference run without errors
+    with MockServer(arxiv) as server:
+        reference = scrape(server, Transport(backoff_base=0.01))
+
+    # every injected 503 must be retried, and the output must not change
+    with MockServer(arxiv, error_rate=args.error_rate, retry_after=args.retry_after) as server:
+        transport = Transport(max_retries=10, backoff_base=0.01)
+        t0 = time.perf_counter()
+        results = scrape(server, transport)
+        elapsed = time.perf_counter() - t0
+        stats = transport.stats()[server.url.split('//')[1]]
+        same = strip_links(results) == strip_links(reference)
+        print('injected errors: %d  retries: %d  requests: %d  %.2f s  same output: %s' % (
+            server.num_errors, stats['retries'], stats['requests'], elapsed, same))
+
+    # a server that always fails: bounded retries, backoff honoring Retry-After, then an error
+    with MockServer(arxiv, error_rate=1., retry_after=args.retry_after) as server:
+        transport = Transport(max_retries=3)
+        t0 = time.perf_counter()
+        try:
+            transport.get(server.url + '/catchup')
+            raised = False
+        except requests.HTTPError:
+            raised = True
+        elapsed = time.perf_counter() - t0
+        print('always failing: %d requests  %.2f s (>= %.2f s of Retry-After)  raised: %s' % (
+            server.num_requests, elapsed, 3 * args.retry_after, raised))
+    if not (same and raised):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
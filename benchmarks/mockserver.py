@@ -0,0 +1,354 @@
+import time
+import hashlib
+import random
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+class MockArxiv:
+    """
+    Synthetic Arxiv listing with the same html layout as the real catchup and abstract pages.
+
+    Inputs:
+        - start: dict, first listed date. Keys are: day, month, year
+        - num_days: int, number of listed days
+        - papers_per_day: int, number of new submissions per day
+        - seed: int, random seed for titles, authors and submission history
+
+    """
+    def __init__(self, start, num_days=3, papers_per_day=20, seed=0):
+        rng = random.Random(seed)
+        first = datetime.date(start['year'], start['month'], start['day'])
+
+        self.days = []
+        self.papers = {}
+        for d in range(num_days):
+            date = first + datetime.timedelta(days=d)
+            ids = []
+            for i in range(papers_per_day):
+                arxiv_id = '%02d%02d.%05d' % (date.year % 100, date.month, d * papers_per_day + i + 1)
+                num_versions = rng.randint(1, 3)
+                self.papers[arxiv_id] = {
+                    'title': 'Synthetic paper %d on quantum topic %d' % (i, rng.randint(0, 10 ** 6)),
+                    'authors': ['Author %d' % rng.randint(0, 500) for _ in range(rng.randint(1, 6))],
+                    'abstract': ' '.join('word%d' % rng.randint(0, 5000) for _ in range(150)),
+                    'history': [(date - datetime.timedelta(days=num_versions - v),
+                                 '%02d:%02d:%02d' % (rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)),
+                                 '%dkb' % rng.randint(10, 5000))
+                                for v in range(num_versions)]
+                }
+                ids.append(arxiv_id)
+            self.days.append((date, ids))
+
+    def catchup_page(self, query, page_size=50):
+        # return every day that starts within [skip, skip + num) of the listing, like Arxiv's catchup pages
+        skip = int(query.get('skip', ['0'])[0])
+        num = int(query.get('num', [str(page_size)])[0])
+
+        first = datetime.date(int(query['syear'][0]), int(query['smonth'][0]), int(query['sday'][0]))
+        days = [(date, ids) for date, ids in self.days if date >= first]
+
+        html = '<html><body><div id="dlpage">\n'
+        position = 0
+        last = skip
+        for date, ids in days:
+            if skip <= position < skip + num:
+                html += '<h2><a name="day_%s">%s</a></h2>\n' % (date.strftime('%Y_%m_%d'), date.isoformat())
+                html += '<dl>\n' + ''.join(self._listing_entry(arxiv_id) for arxiv_id in ids) + '</dl>\n'
+                last = position + len(ids)
+            position += len(ids)
+
+        query = dict((k, v[0]) for k, v in query.items())
+        query['skip'] = str(max(last, skip + num))
+        href = '/catchup?' + '&'.join('%s=%s' % (k, v) for k, v in sorted(query.items()))
+        html += '<ul><li><a href="/">home</a></li><li><a href="%s">next</a></li></ul>\n' % href
+        html += '</div></body></html>'
+        return html
+
+    def abstract_page(self, arxiv_id):
+        paper = self.papers.get(arxiv_id)
+        if paper is None:
+            return None
+
+        history = ''
+        for v, (date, hms, size) in enumerate(paper['history']):
+            history += '<b><a href="/abs/%sv%d">[v%d]</a></b> %s, %d %s %d %s UTC (%s)<br/>\n' % (
+                arxiv_id, v + 1, v + 1, WEEKDAYS[date.weekday()], date.day, MONTHS[date.month - 1], date.year,
+                hms, size)
+
+        html = '<html><body>\n'
+        html += '<h1 class="title mathjax"><span class="descriptor">Title:</span>%s</h1>\n' % paper['title']
+        html += '<blockquote class="abstract mathjax">\n<span class="descriptor">Abstract:</span> %s\n' \
+                '</blockquote>\n' % paper['abstract']
+        html += '<div class="submission-history">\n<h2>Submission history</h2> From: %s<br/>\n%s</div>\n' % (
+            paper['authors'][0], history)
+        html += '</body></html>'
+        return html
+
+    def oai_page(self, query, page_size=100):
+        # OAI-PMH ListRecords response in the arXivRaw format, paged with resumption tokens
+        if 'resumptionToken' in query:
+            date_from, date_until, offset = query['resumptionToken'][0].split('|')
+            offset = int(offset)
+        else:
+            date_from, date_until, offset = query['from'][0], query['until'][0], 0
+        first = datetime.date(*[int(x) for x in date_from.split('-')])
+        last = datetime.date(*[int(x) for x in date_until.split('-')])
+
+        # the datestamp of a record is the date of its latest version
+        ids = [arxiv_id for arxiv_id, paper in sorted(self.papers.items())
+               if first <= paper['history'][-1][0] <= last]
+
+        xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
+        xml += '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><ListRecords>\n'
+        for arxiv_id in ids[offset:offset + page_size]:
+            xml += self._oai_record(arxiv_id)
+        if offset + page_size < len(ids):
+            xml += '<resumptionToken cursor="%d" completeListSize="%d">%s|%s|%d</resumptionToken>\n' % (
+                offset, len(ids), date_from, date_until, offset + page_size)
+        xml += '</ListRecords></OAI-PMH>'
+        return xml
+
+    def _oai_record(self, arxiv_id):
+        paper = self.papers[arxiv_id]
+        versions = ''
+        for v, (date, hms, size) in enumerate(paper['history']):
+            versions += '<version version="v%d"><date>%s, %d %s %d %s GMT</date><size>%s</size></version>' % (
+                v + 1, WEEKDAYS[date.weekday()], date.day, MONTHS[date.month - 1], date.year, hms, size)
+        return ('<record><header><identifier>oai:arXiv.org:%s</identifier><datestamp>%s</datestamp></header>'
+                '<metadata><arXivRaw xmlns="http://arxiv.org/OAI/arXivRaw/"><id>%s</id>%s'
+                '<title>%s</title><authors>%s</authors><abstract>  %s\n</abstract></arXivRaw></metadata>'
+                '</record>\n') % (arxiv_id, paper['history'][-1][0].isoformat(), arxiv_id, versions, paper['title'],
+                                  ', '.join(paper['authors']), paper['abstract'])
+
+    def _listing_entry(self, arxiv_id):
+        paper = self.papers[arxiv_id]
+        authors = ', \n'.join('<a href="/find/%s">%s</a>' % (a.replace(' ', '_'), a) for a in paper['authors'])
+        return ('<dt><a name="item"></a><span class="list-identifier">'
+                '<a href="/abs/%s" title="Abstract">arXiv:%s</a> [<a href="/pdf/%s" title="Download PDF">pdf</a>]'
+                '</span></dt>\n'
+                '<dd><div class="meta">\n'
+                '<div class="list-title mathjax">\n<span class="descriptor">Title:</span> %s\n</div>\n'
+                '<div class="list-authors">\n<span class="descriptor">Authors:</span>\n%s\n</div>\n'
+                '</div></dd>\n') % (arxiv_id, arxiv_id, arxiv_id, paper['title'], authors)
+
+
+class MockScirate:
+    """
+    Synthetic Scirate listing of the papers of a MockArxiv, with the same html layout as Scirate's day pages.
+
+    Papers of a day are ranked by a random scite count. Some days can be left empty, like weekends.
+
+    Inputs:
+        - arxiv: MockArxiv, the papers to list
+        - archive: string, archive name used in the urls
+        - empty_every: int, every n-th calendar day is listed without papers. 0 means no empty days
+        - seed: int, random seed for the scite counts
+
+    """
+    def __init__(self, arxiv, archive='quant-ph', empty_every=0, seed=0):
+        rng = random.Random(seed)
+        self.arxiv = arxiv
+        self.archive = archive
+        self.days = []
+        self.scites = {}
+        for d, (date, ids) in enumerate(arxiv.days):
+            if empty_every and d % empty_every == empty_every - 1:
+                ids = []
+            for arxiv_id in ids:
+                self.scites[arxiv_id] = rng.randint(0, 50)
+            ranked = sorted(ids, key=lambda arxiv_id: -self.scites[arxiv_id])
+            self.days.append((date, ranked))
+
+    def day_page(self, query):
+        # papers of the `range` days starting at `date`, and a link to the following day
+        first = datetime.date(*[int(x) for x in query['date'][0].split('-')])
+        num_days = int(query.get('range', ['1'])[0])
+        last = first + datetime.timedelta(days=num_days)
+
+        ids = []
+        for date, ranked in self.days:
+            if first <= date < last:
+                ids += ranked
+        ids = sorted(ids, key=lambda arxiv_id: -self.scites[arxiv_id])
+
+        html = '<html><body>\n<table><tr>'
+        html += '<td class="btn-default half top left"><a href="/arxiv/%s?date=%s&range=%d">Prev</a></td>' % (
+            self.archive, (first - datetime.timedelta(days=1)).isoformat(), num_days)
+        html += '<td class="btn-default half top right"><a href="/arxiv/%s?date=%s&range=%d">Next</a></td>' % (
+            self.archive, (first + datetime.timedelta(days=1)).isoformat(), num_days)
+        html += '</tr></table>\n<ul class="papers">\n'
+        html += ''.join(self._paper_entry(arxiv_id) for arxiv_id in ids)
+        html += '</ul>\n</body></html>'
+        return html
+
+    def _paper_entry(self, arxiv_id):
+        paper = self.arxiv.papers[arxiv_id]
+        authors = ', '.join('<a href="/search?q=au:%s">%s</a>' % (a.replace(' ', '+'), a) for a in paper['authors'])
+        return ('<li class="paper tex2jax"><div class="row">'
+                '<div class="scite-toggle"><button class="btn btn-default count">%d</button></div>'
+                '<div class="title"><a href="/arxiv/%s">%s</a></div>'
+                '<div class="authors">%s</div>'
+                '<div class="uid"><a href="/arxiv/%s">arXiv:%s</a></div>'
+                '</div></li>\n') % (self.scites[arxiv_id], arxiv_id, paper['title'], authors, arxiv_id, arxiv_id)
+
+
+class _Server(ThreadingHTTPServer):
+    # room for every connection of a large client pool, instead of dropping connections beyond the default backlog
+    request_queue_size = 128
+
+
+class MockServer:
+    """
+    Local HTTP server that serves MockArxiv and MockScirate listings, or recorded pages, for benchmarks that must not
+    touch the live sites. Arxiv pages are served under /catchup and /abs, Scirate pages under /arxiv/<archive>.
+
+    Inputs:
+        - arxiv: MockArxiv, optional. The listing to serve
+        - scirate: MockScirate, optional. Scirate listing to serve
+        - latency: float, seconds of delay added to every response
+        - error_rate: float, fraction of requests answered with a 503 error
+        - retry_after: float, value of the Retry-After header sent with injected errors. None sends no header
+        - seed: int, random seed for error injection
+        - fixtures: FixtureSet, optional. Recorded pages (see benchmarks.recorded), served before the mock listings
+        - rate_limit: float, optional. Requests per second allowed, with bursts of up to one second of requests.
+          Requests over the limit are answered with a 429 error and the seconds until the next free slot as
+          Retry-After. Default: no limit
+
+    """
+    def __init__(self, arxiv=None, scirate=None, latency=0., error_rate=0., retry_after=None, seed=0, fixtures=None,
+                 rate_limit=None):
+        self.arxiv = arxiv
+        self.scirate = scirate
+        self.fixtures = fixtures
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.num_requests = 0
+        self.num_errors = 0
+        self.num_throttled = 0
+        self.num_not_modified = 0
+        self._rng = random.Random(seed)
+        self._tokens = rate_limit
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def route(self, path, query):
+        # return html for a request path, or None for 404
+        if self.fixtures is not None:
+            html = self.fixtures.route(path, query)
+            if html is not None:
+                return html
+        if self.arxiv is None:
+            return None
+        if path == '/catchup':
+            return self.arxiv.catchup_page(query)
+        if path == '/oai2':
+            return self.arxiv.oai_page(query)
+        if path.startswith('/abs/'):
+            return self.arxiv.abstract_page(path[len('/abs/'):])
+        if self.scirate is not None and path == '/arxiv/%s' % self.scirate.archive:
+            return self.scirate.day_page(query)
+        return None
+
+    def _throttle(self):
+        # seconds until a request is allowed, or None when it is allowed now. Called with the lock held
+        if not self.rate_limit:
+            return None
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return None
+        return (1 - self._tokens) / self.rate_limit
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive connections, like the real sites
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.num_requests += 1
+                    wait = server._throttle()
+                    if wait is not None:
+                        server.num_throttled += 1
+                    failed = wait is None and server._rng.random() < server.error_rate
+                    if failed:
+                        server.num_errors += 1
+                if server.latency > 0:
+                    time.sleep(server.latency)
+
+                if wait is not None:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '%.3f' % wait)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if failed:
+                    self.send_response(503)
+                    if server.retry_after is not None:
+                        self.send_header('Retry-After', str(server.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                url = urlparse(self.path)
+                html = server.route(url.path, parse_qs(url.query))
+                if html is None:
+                    self.send_error(404)
+                    return
+                # pages are static, so an ETag of the body lets clients revalidate their cached copy
+                body = html.encode('utf-8')
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    with server._lock:
+                        server.num_not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
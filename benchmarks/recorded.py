@@ -0,0 +1,165 @@
+"""
+Recorded catchup, abstract and Scirate pages for offline benchmarks.
+
+`record` runs ArxivScraper and ScirateScraper once over a short period and saves every page they download, with a
+manifest of the request each page answers and of the scraping params. A MockServer given the FixtureSet replays the
+pages, so the same params scrape the same data without touching the live sites.
+
+Usage (from the repository root):
+    python -m benchmarks.recorded ./benchmarks/fixtures --start 2018-03-13 --end 2018-03-14
+    python -m benchmarks.recorded ./benchmarks/fixtures --mock --days 3 --papers 15
+"""
+import os
+import json
+import argparse
+import datetime
+from urllib.parse import urlparse, parse_qs
+from scrapers.arxivscraper import ArxivScraper
+from scrapers.sciratescraper import ScirateScraper
+from scrapers.metrics import url_type
+from .mockserver import MockArxiv, MockScirate, MockServer
+
+
+def page_key(path, query):
+    # request path with its query in a canonical order, e.g. "/catchup?archive=quant-ph&group=grp_&..."
+    items = sorted((k, v) for k, values in query.items() for v in values)
+    return path + ('?' + '&'.join('%s=%s' % item for item in items) if items else '')
+
+
+def url_key(url):
+    url = urlparse(url)
+    return page_key(url.path, parse_qs(url.query))
+
+
+class FixtureSet:
+    """
+    Recorded pages of a directory written by `record`.
+
+    Inputs:
+        - root: string, directory with manifest.json and the recorded pages
+
+    """
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+        self.params = manifest['params']
+        self.pages = manifest['pages']
+
+    def route(self, path, query):
+        # html of a recorded request, or None
+        name = self.pages.get(page_key(path, query))
+        if name is None:
+            return None
+        with open(os.path.join(self.root, name), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def kinds(self):
+        # (url type, html) of every recorded page
+        for key, name in sorted(self.pages.items()):
+            with open(os.path.join(self.root, name), 'r', encoding='utf-8') as f:
+                yield url_type(key), f.read()
+
+    def scraper_params(self, source, url_header):
+        # params that replay the recorded run of a source against a server at url_header
+        params = {'start': self.params['start'],
+                  'end': self.params['end'],
+                  'archive': self.params['archive'],
+                  'save_by_day': False,
+                  'save_dir': '',
+                  'url_header': url_header}
+        if source == 'arxiv':
+            params.update({'abstract': True, 'parallel': False, 'page_size': self.params['page_size']})
+        return params
+
+
+class _Recorder:
+    # wraps a transport's get to keep the text of every page it returns
+    def __init__(self, get, pages):
+        self.get = get
+        self.pages = pages
+
+    def __call__(self, url):
+        response = self.get(url)
+        self.pages[url_key(url)] = response.text
+        return response
+
+
+def record(root, start, end, archive='quant-ph', page_size=50, arxiv_url=None, scirate_url=None):
+    """
+    Scrape a period with both scrapers and save every downloaded page.
+
+    Inputs:
+        - root: string, output directory
+        - start: dict, contains starting date. Keys are: day, month, year
+        - end: dict, contains end date. Keys are: day, month, year
+        - archive: string, archive type
+        - page_size: int, entries per catchup page
+        - arxiv_url: string, optional. Base url of Arxiv. Default: the live site
+        - scirate_url: string, optional. Base url of Scirate. Default: the live site
+
+    Outputs:
+        - num_pages: int, number of recorded pages
+    """
+    os.makedirs(root, exist_ok=True)
+    pages = {}
+    base = {'start': start, 'end': end, 'archive': archive, 'save_by_day': False, 'save_dir': ''}
+
+    arxiv_params = dict(base, abstract=True, parallel=False, fetch_mode='sequential', page_size=page_size,
+                        prefetch=False)
+    if arxiv_url is not None:
+        arxiv_params['url_header'] = arxiv_url
+    scraper = ArxivScraper(arxiv_params)
+    scraper.transport.get = _Recorder(scraper.transport.get, pages)
+    scraper.start_scraping()
+
+    scirate_params = dict(base)
+    if scirate_url is not None:
+        scirate_params['url_header'] = scirate_url
+    scraper = ScirateScraper(scirate_params)
+    scraper.transport.get = _Recorder(scraper.transport.get, pages)
+    scraper.start_scraping()
+
+    names = {}
+    for i, (key, html) in enumerate(sorted(pages.items())):
+        names[key] = '%03d_%s.html' % (i, url_type(key))
+        with open(os.path.join(root, names[key]), 'w', encoding='utf-8') as f:
+            f.write(html)
+    manifest = {'params': {'start': start, 'end': end, 'archive': archive, 'page_size': page_size},
+                'pages': names}
+    with open(os.path.join(root, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return len(pages)
+
+
+def _date(text):
+    date = datetime.date(*map(int, text.split('-')))
+    return {'year': date.year, 'month': date.month, 'day': date.day}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root', help='output directory')
+    parser.add_argument('--start', default='2018-03-13', help='YYYY-MM-DD')
+    parser.add_argument('--end', default='2018-03-14', help='YYYY-MM-DD')
+    parser.add_argument('--archive', default='quant-ph')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--mock', action='store_true', help='record the synthetic mock site instead of the live sites')
+    parser.add_argument('--days', type=int, default=3, help='listed days of the mock site')
+    parser.add_argument('--papers', type=int, default=15, help='papers per day of the mock site')
+    args = parser.parse_args()
+
+    start, end = _date(args.start), _date(args.end)
+    if not args.mock:
+        num_pages = record(args.root, start, end, args.archive, args.page_size)
+    else:
+        arxiv = MockArxiv(start, num_days=args.days, papers_per_day=args.papers)
+        last = arxiv.days[-1][0]
+        end = {'year': last.year, 'month': last.month, 'day': last.day}
+        with MockServer(arxiv, MockScirate(arxiv, archive=args.archive)) as server:
+            num_pages = record(args.root, start, end, args.archive, args.page_size, server.url, server.url)
+    print('Recorded %d pages in %s.' % (num_pages, args.root))
+
+
+if __name__ == '__main__':
+    main()
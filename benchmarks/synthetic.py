@@ -0,0 +1,86 @@
+import random
+import datetime
+
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def arxiv_days(num_days, papers_per_day=60, start=datetime.date(2018, 1, 1), num_authors=5000, seed=0):
+    """
+    Synthetic ArxivScraper output: a list of {'date', 'papers'} per day with the scraper's record layout.
+
+    Inputs:
+        - num_days: int, number of listed days
+        - papers_per_day: int, number of papers per day
+        - start: datetime.date, first listed date
+        - num_authors: int, size of the author population
+        - seed: int, random seed
+
+    Outputs:
+        - days: list, a list of dict for each day
+    """
+    rng = random.Random(seed)
+    days = []
+    for d in range(num_days):
+        date = start + datetime.timedelta(days=d)
+        papers = []
+        for i in range(papers_per_day):
+            arxiv_id = '%02d%02d.%05d' % (date.year % 100, date.month, d * papers_per_day + i + 1)
+            words = ['quantum', 'entanglement', 'qubit', 'channel', 'state', 'error', 'correction', 'spin',
+                     'photonic', 'topological', 'measurement', 'algorithm', 'simulation', 'noise', 'gate']
+            title = ' '.join(rng.choice(words) for _ in range(rng.randint(4, 12))).capitalize()
+            title += ' %d' % rng.randint(0, 10 ** 6)
+            papers.append({
+                'title': title,
+                'authors': ['Author %d' % (int(rng.paretovariate(1.2) * 10) % num_authors)
+                            for _ in range(rng.randint(1, 8))],
+                'abstract': ' '.join(rng.choice(words) for _ in range(rng.randint(80, 200))),
+                'order': i,
+                'arxiv_id': arxiv_id,
+                'num_versions': rng.randint(1, 3),
+                'submit_weekday': WEEKDAYS[rng.randint(0, 6)],
+                'submit_time': '%02d:%02d:%02d' % (rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)),
+                'size': '%dkb' % rng.randint(10, 8000),
+                'paper_link': 'https://arxiv.org/abs/' + arxiv_id
+            })
+        days.append({'date': date.strftime('day_%Y_%m_%d'), 'papers': papers})
+    return days
+
+
+def scirate_days(arxiv, typo_rate=0.05, seed=0):
+    """
+    Synthetic ScirateScraper output for the papers of synthetic Arxiv days, ranked by a random scite count.
+
+    Inputs:
+        - arxiv: list, output of `arxiv_days`
+        - typo_rate: float, fraction of titles altered slightly, so that exact title matching misses them
+        - seed: int, random seed
+
+    Outputs:
+        - days: list, a list of dict for each day
+        - truth: dict, Arxiv listing order of each Scirate paper, keyed by (date, rank)
+    """
+    rng = random.Random(seed)
+    days = []
+    truth = {}
+    for res in arxiv:
+        papers = []
+        for paper in res['papers']:
+            title = paper['title']
+            if rng.random() < typo_rate:
+                # e.g. a changed character or a trailing period, like retitled or reformatted papers
+                pos = rng.randint(0, len(title) - 1)
+                title = title[:pos] + rng.choice('abcdefghijklmnopqrstuvwxyz') + title[pos + 1:] + '.'
+            papers.append({
+                'title': title,
+                'authors': list(paper['authors']),
+                'scite_count': int(rng.expovariate(0.2)),
+                'arxiv_id': paper['arxiv_id']
+            })
+        orders = sorted(range(len(papers)), key=lambda i: -papers[i]['scite_count'])
+        papers = [papers[i] for i in orders]
+        for rank, paper in enumerate(papers):
+            paper['rank'] = rank
+            truth[(res['date'], rank)] = res['papers'][orders[rank]]['order']
+        days.append({'date': res['date'], 'papers': papers})
+    return days, truth
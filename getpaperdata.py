@@ -1,17 +1,13 @@
-import json
-from scrapers.arxivscraper import ArxivScraper
-from scrapers.sciratescraper import ScirateScraper
+from scrapers.scheduler import Scheduler, load_config
 
 
 if __name__ == '__main__':
-    with open('./configs/arxiv_config.json', 'r') as f:
-        params_arxiv = json.load(f)
-    with open('./configs/scirate_config.json', 'r') as f:
-        params_scirate = json.load(f)
-
-    scraper_arxiv = ArxivScraper(params_arxiv)
-    scraper_scirate = ScirateScraper(params_scirate)
-    scraper_arxiv.start_scraping()
-    print('Arxiv Scraping Complete.')
-    scraper_scirate.start_scraping()
-    print('Scirate Scraping Complete.')
+    # archives, period and sources are in `schedule_config.json`, which points to the arxiv and scirate configs.
+    # Arxiv and Scirate shards run at the same time in a pool of worker processes with shared per-host rate limits
+    scheduler = Scheduler(load_config('./configs/schedule_config.json'))
+    print('Enqueued %d units.' % scheduler.enqueue())
+    counts = scheduler.work()
+    print('Scraping Complete. Units per state: %s' % counts)
+    for unit in scheduler.failures():
+        print('Failed after %(attempts)d attempts: %(source)s %(archive)s %(date_from)s to %(date_until)s: '
+              '%(error)s' % unit)
@@ -1,16 +1,22 @@
 import re
 import os
-import sys
-import json
 import time
-import pickle
-import numpy as np
+import datetime
+from concurrent.futures import ThreadPoolExecutor
 from joblib import Parallel, delayed
-import requests
-from bs4 import BeautifulSoup
-
-
-sys.setrecursionlimit(100000)
+from .parsers import get_parser, parse_arxiv_id
+from .transport import Transport
+from .ratelimit import TokenBucket
+from .asyncfetch import AsyncFetcher, aiterate
+from .workerpool import WorkerPool
+from .oai import OaiMetadata
+from .store import ColumnStore
+from .checkpoint import Checkpoint, write_json, saved_days, next_date
+from .metrics import Metrics, instrument
+from .authors import open_index
+from .dedup import open_dedup
+from .search import SearchIndex
+from .records import AuthorNames, DayRecords, as_dict
 
 
 class ArxivScraper:
@@ -26,14 +32,69 @@ class ArxivScraper:
             - parallel: bool, whether it parses each paper info in parallel
             - save_by_day: bool, whether it saves papers data day by day. If true, it saves the data in a json format
             - save_dir: string, the directory you save your data to. Only matters when save_by_day is true
+            - save_format: string, optional. "json" writes one json file per day, "columnar" appends each day to a
+              ColumnStore in save_dir. Default: "json"
+            - fetch_mode: string, optional. How abstract pages are fetched: "sequential", "joblib", "async" or
+              "threads". Defaults to "joblib" when parallel is true and "sequential" otherwise
+            - concurrency: int, optional. Number of abstract-page requests in flight in the async and threads
+              modes. Default: 8
+            - rate_limit: float, optional. Requests per second allowed in the async and threads modes. Default: 5
+            - url_header: string, optional. Base url of Arxiv. Default: "https://arxiv.org"
+            - parser: string, optional. Html parser backend, "soup" (BeautifulSoup) or "lxml" (lxml and XPath).
+              Default: "soup"
+            - timeout: float, optional. Seconds before a request attempt is abandoned. Default: 30
+            - max_retries: int, optional. Retries of a failed request (5xx, 429, timeout). Default: 3
+            - backoff_base: float, optional. Seconds before the first retry, doubled on each retry. Default: 1
+            - backoff_max: float, optional. Maximum backoff and Retry-After delay in seconds. Default: 60
+            - cache_dir: string, optional. Directory of the on-disk response cache. No cache when omitted
+            - cache_ttl: float, optional. Seconds a cached page stays fresh before it is revalidated. Default: forever
+            - cache_max_size: int, optional. Maximum size of the cache in bytes, LRU evicted. Default: no limit
+            - cache_compress: bool, optional. Whether cached pages are gzip-compressed. Default: false
+            - resume: bool, optional. Whether an interrupted run resumes from its checkpoint, skipping the days already
+              saved. Requires save_by_day. Default: false
+            - incremental: bool, optional. Whether only the days newer than the latest saved day are scraped. Requires
+              save_by_day. Default: false
+            - checkpoint_path: string, optional. Path of the checkpoint manifest. Default: "arxiv_checkpoint.json"
+              in save_dir
+            - metadata: string, optional. Where abstracts, versions, submit time and size come from: "abstract_page"
+              (one request per paper) or "oai" (bulk OAI-PMH records, with the abstract page as a fallback for papers
+              missing from the harvest). Default: "abstract_page"
+            - oai_url: string, optional. OAI-PMH endpoint. Default: "https://export.arxiv.org/oai2"
+            - oai_window: int, optional. Days before the start date included in the OAI harvest. Default: 7
+            - page_size: int, optional. Number of entries per catchup page. Default: 50
+            - prefetch: bool, optional. Whether the next catchup page is downloaded in the background while the
+              papers of the current page are fetched. Default: true
+            - metrics_report: string, optional. Path of the report of the run's counters, stage timers and request
+              latency histograms, written at the end of the run: Prometheus text for .prom or .txt, json otherwise
+            - progress_interval: float, optional. Seconds between progress lines on stderr. Default: no progress
+            - profile_path: string, optional. Path prefix of cProfile and tracemalloc output. Default: no profiling
+            - author_index: string, optional. Path of an AuthorIndex (.npz) that every scraped day is added to, and
+              that is saved at the end of the run. It must not be written by two processes at once
+            - dedup_index: string, optional. Path of a DedupIndex (.npz) of the papers scraped so far. Papers listed
+              again under an identifier already scraped (replaced, cross-listed from another archive of the index
+              or repeated) are dropped from the days, near-duplicates of earlier papers by the same authors are
+              counted, and the index is saved at the end of the run. It must not be written by two processes at once
+            - search_index: string, optional. Directory of a SearchIndex that the titles and abstracts of every
+              scraped day are added to. It must not be written by two processes at once
+            - compact_records: bool, optional. Whether days are yielded and collected as DayRecords, papers stored
+              as arrays with integer weekdays, submit times, sizes and author ids, instead of dicts. They convert
+              back to the dict layout with `to_dict`. Default: false
+            - low_memory: bool, optional. Whether every page tree is freed as soon as its fields are extracted, and
+              at most max_pages_in_flight abstract pages of a day are fetched at a time. Default: false
+            - max_pages_in_flight: int, optional. Abstract pages fetched at a time in the low-memory mode. Default: 16
+        - transport: Transport, optional. HTTP transport to share with other scrapers. A new one is built from
+          params when omitted
 
     Outputs:
         - results: list, a list of dict for each day within a specified period. Empty when save_by_day is set true
 
+    `iter_days` and `aiter_days` stream the same days one by one as soon as they are parsed, instead of collecting
+    them; `start_scraping` is a consumer of that stream.
+
 
     """
-    def __init__(self, params):
-        self.url_header = 'https://arxiv.org'
+    def __init__(self, params, transport=None):
+        self.url_header = params.get('url_header', 'https://arxiv.org')
         self.start_date = params['start']
         self.end_date = params['end']
         self.abstract = params['abstract']
@@ -41,110 +102,263 @@ class ArxivScraper:
         self.parallel = params['parallel']
         self.save_by_day = params['save_by_day']
         self.save_dir = params['save_dir']
+        self.transport = transport if transport is not None else Transport.from_params(params)
+        self.low_memory = params.get('low_memory', False)
+        self.compact_records = params.get('compact_records', False)
+        self.author_names = AuthorNames() if self.compact_records else None
+        self.author_index_path = params.get('author_index')
+        self.author_index = open_index(self.author_index_path) if self.author_index_path else None
+        self.dedup_index_path = params.get('dedup_index')
+        self.dedup_index = open_dedup(self.dedup_index_path) if self.dedup_index_path else None
+        self.search_index = SearchIndex(params['search_index']) if params.get('search_index') else None
+        self.max_pages_in_flight = params.get('max_pages_in_flight', 16)
+        self.parser = get_parser(params.get('parser', 'soup'), release=self.low_memory)
+        self.fetch_mode = params.get('fetch_mode', 'joblib' if self.parallel else 'sequential')
+        self.concurrency = params.get('concurrency', 8)
+        self.rate_limiter = TokenBucket(params.get('rate_limit', 5))
+        self.async_fetcher = AsyncFetcher(self.concurrency, self.rate_limiter, self.transport.get_text)
+        self.worker_pool = None
+
+        self.metadata = None
+        if params.get('metadata', 'abstract_page') == 'oai':
+            self.metadata = OaiMetadata(self.archive, self.transport,
+                                        params.get('oai_url', 'https://export.arxiv.org/oai2'))
+        self.oai_window = params.get('oai_window', 7)
+        self.page_size = params.get('page_size', 50)
+        self.prefetch = params.get('prefetch', True)
+
+        self.metrics = Metrics('arxiv')
+        self.metrics_report = params.get('metrics_report')
+        self.progress_interval = params.get('progress_interval')
+        self.profile_path = params.get('profile_path')
+
+        self.resume = params.get('resume', False)
+        self.incremental = params.get('incremental', False)
+        self.store = None
+        if self.save_by_day and params.get('save_format', 'json') == 'columnar':
+            self.store = ColumnStore(self.save_dir)
+        if (self.resume or self.incremental) and not self.save_by_day:
+            # the checkpoint lives next to the saved days, so there is nothing to resume from without them
+            raise ValueError('resume and incremental need save_by_day')
+        self.checkpoint = None
+        if self.resume or self.incremental:
+            checkpoint_path = params.get('checkpoint_path', os.path.join(self.save_dir, 'arxiv_checkpoint.json'))
+            if self.store is not None:
+                completed = self.store.dates('arxiv', self.archive)
+            else:
+                completed = saved_days(self.save_dir, 'arxiv')
+            self.checkpoint = Checkpoint(checkpoint_path, completed)
 
         self.date_pattern = '\w{3}, \d+ \w{3} 20\d{2} \d{2}:\d{2}:\d{2}'
         self.weekday_pattern = r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)'
         self.time_pattern = '\d{2}:\d{2}:\d{2}'
 
     def start_scraping(self):
-        # obtain starting url
-        url_start = self._get_url(self.start_date)
-
+        # save each day as it comes when save_by_day is set, otherwise collect them
+        if not self.save_by_day:
+            return list(self.iter_days())
+
+        for res in self.iter_days():
+            with self.metrics.timer('save'):
+                self._save_day(res)
+            if self.checkpoint is not None:
+                self.checkpoint.mark_completed(res['date'])
+        return []
+
+    def iter_days(self):
+        """
+        Generator of the days of the search period, each a dict {'date', 'papers'} yielded as soon as its papers are
+        parsed. With prefetch (the default), the next listing page downloads in the background as soon as the days of
+        the current one are parsed, so at most one page is read ahead of the consumer. Without it, the next page is
+        only requested once the consumer has taken every day of the current one.
+        """
+        # the thread pool lives for the whole run and is shared by all the days
+        if self.fetch_mode == 'threads':
+            self.worker_pool = WorkerPool(self.concurrency, self.rate_limiter)
+        self.transport.metrics = self.metrics
+        try:
+            with instrument(self.metrics, self.metrics_report, self.progress_interval, self.profile_path):
+                for res in self._scrape():
+                    if self.dedup_index is not None:
+                        res, checks = self.dedup_index.filter_day(res, self.archive)
+                        for check in checks:
+                            if check['status'] != 'new':
+                                self.metrics.count('duplicates', status=check['status'])
+                    self.metrics.count('days')
+                    self.metrics.count('papers', len(res['papers']))
+                    if self.author_index is not None:
+                        self.author_index.add_day(res, 'arxiv')
+                    if self.search_index is not None:
+                        self.search_index.add_day(res)
+                    if self.compact_records:
+                        res = DayRecords.from_dict(res, self.author_names)
+                    yield res
+        finally:
+            if self.author_index is not None:
+                self.author_index.save(self.author_index_path)
+            if self.dedup_index is not None:
+                self.dedup_index.save(self.dedup_index_path)
+            if self.search_index is not None:
+                self.search_index.flush()
+            if self.worker_pool is not None:
+                self.worker_pool.close()
+                self.worker_pool = None
+            # its thread pool is started again by the next run
+            self.async_fetcher.close()
+
+    def aiter_days(self):
+        # async iterator over `iter_days` - scraping runs on a background thread, so the event loop stays free
+        return aiterate(self.iter_days())
+
+    def _scrape(self):
         # compute end date for search
         date_end = self._parse_date(self.end_date)
 
+        # obtain starting url
+        start_date = self.start_date
+        if self.incremental and self.checkpoint.latest() is not None:
+            # only the days newer than the latest saved day
+            start_date = max(start_date, next_date(self.checkpoint.latest()), key=self._parse_date)
+            if self._parse_date(start_date) > date_end:
+                return
+        url_start = self._get_url(start_date)
+        if self.resume and self.checkpoint.cursor is not None:
+            url_start = self.checkpoint.cursor
+
+        # bulk metadata of every paper that can appear in the listings of the period
+        if self.metadata is not None:
+            date_from = datetime.date(**start_date) - datetime.timedelta(days=self.oai_window)
+            with self.metrics.timer('oai_harvest'):
+                self.metadata.harvest(date_from.isoformat(), datetime.date(**self.end_date).isoformat())
+
         # get html from the url by requests
-        response = requests.get(url_start)
+        with self.metrics.timer('listing_fetch'):
+            response = self.transport.get(url_start)
         # prepare parser
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        # parse first page
-        results, next_page = self.parse_page(soup, date_end)
-
-        # until no more page appears:
-        while next_page:
-            res, next_page = self.parse_page(next_page, date_end)
-            results += res
-
-            # this is not to send requests too much - avoid IP ban
-            time.sleep(0.2)
-
-        return results
-
-    def parse_page(self, soup, date_end):
-        # parse html (soup) and return papers and next page html
-        results = []
-
-        # find all the dates in this page
-        headers = soup.find_all('h2')
-        if len(headers) == 0:
-            return results, None
-
-        for h2 in headers:
-            date = h2.find('a').get_attribute_list('name')[0]
+        with self.metrics.timer('listing_parse'):
+            soup = self.parser.load(response.text)
+
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            # until no more page appears:
+            while True:
+                # the entries of every day are extracted up front, so the page tree can be freed before the
+                # papers are fetched
+                with self.metrics.timer('listing_parse'):
+                    headers = [(date, self.parser.arxiv_entries(section))
+                               for date, section in self.parser.arxiv_days(soup)]
+                # the date headers tell when the period ends on this page - then no further page is downloaded
+                last_page = len(headers) == 0 or headers[-1][0] >= date_end
+                url_next = None if last_page else self.url_header + self.parser.arxiv_next_href(soup)
+                self.parser.release(soup)
+                soup = None
+                if last_page:
+                    yield from self.parse_days(headers, date_end)
+                    break
+
+                if executor is None:
+                    yield from self.parse_days(headers, date_end)
+                    soup = self._load_page(url_next)
+                    # this is not to send requests too much - avoid IP ban
+                    with self.metrics.timer('sleep'):
+                        time.sleep(0.2)
+                    continue
+
+                # the next page downloads while the papers of this one are fetched. The checkpoint cursor only
+                # moves on once every day of this page has been consumed
+                next_page = executor.submit(self._prefetch_page, url_next)
+                yield from self.parse_days(headers, date_end)
+                if self.checkpoint is not None:
+                    self.checkpoint.set_cursor(url_next)
+                with self.metrics.timer('prefetch_wait'):
+                    html = next_page.result()
+                with self.metrics.timer('listing_parse'):
+                    soup = self.parser.load(html)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        # the run is complete - the next run starts over from its start date
+        if self.checkpoint is not None:
+            self.checkpoint.set_cursor(None)
+
+    def parse_days(self, headers, date_end):
+        # generator of the days of a page, given its (date, listing entries) headers
+        for date, paper_list in headers:
             # if the date exceeds end date for search, terminate parsing
             if date > date_end:
-                return results, None
+                return
+            # the day was saved by an earlier run
+            if self.checkpoint is not None and self.checkpoint.is_completed(date):
+                continue
 
-            paper_data = h2.find_next_siblings()[0]
-            papers = self.get_papers(paper_data)
-            res = {
+            yield {
                 'date': date,
-                'papers': papers
+                'papers': self.get_papers(paper_list)
             }
-            if self.save_by_day:
-                save_path = os.path.join(self.save_dir, date + '_arxiv.json')
-                with open(save_path, 'w') as f:
-                    json.dump(res, f)
-            else:
-                results.append(res)
-
-        next_page = self.get_next_page(soup)
-        return results, next_page
-
-    def get_papers(self, soup):
-        ident_list = soup.find_all('dt')
-        meta_list = soup.find_all('dd')
-
-        ident_info = [item.find('span', class_='list-identifier') for item in ident_list]
-        indices = [i for i, m in enumerate(ident_info) if (m.text != 'replaced') and (m.text != 'cross_list')]
 
-        paper_list = [{'identifier': ident_info[i],
-                       'meta': meta_list[i],
-                       'order': i}
-                      for i in indices]
+    def get_papers(self, paper_list):
+        with self.metrics.timer('day_papers'):
+            if not self.low_memory:
+                return self._get_papers(paper_list)
+            # a bounded number of abstract pages in memory at a time
+            papers = []
+            for i in range(0, len(paper_list), self.max_pages_in_flight):
+                papers += self._get_papers(paper_list[i:i + self.max_pages_in_flight])
+            return papers
+
+    def _get_papers(self, paper_list):
+        # the entries are plain strings, so no tree is handed to the workers. Papers found in the bulk metadata need
+        # no abstract page
+        known = []
+        if self.metadata is not None:
+            missing = []
+            for paper in paper_list:
+                fields = self.metadata.get(parse_arxiv_id(paper['href'])[0])
+                if fields is None:
+                    missing.append(paper)
+                    continue
+                if not self.abstract:
+                    fields = dict(fields, abstract='')
+                with self.metrics.timer('build'):
+                    known.append(self.build_paper_info(paper, self.url_header + paper['href'], fields))
+            paper_list = missing
 
         # parallel paper information retrieval for all the papers in a day
-        if self. parallel:
+        if self.fetch_mode == 'async':
+            papers = self._get_papers_async(paper_list)
+        elif self.fetch_mode == 'threads':
+            papers = self.worker_pool.map(self._get_paper_info_limited, paper_list)
+        elif self.fetch_mode == 'joblib':
             papers = Parallel(n_jobs=-1)([delayed(self.get_paper_info)(paper) for paper in paper_list])
         else:
             papers = list(map(self.get_paper_info, paper_list))
 
+        if len(known) > 0:
+            papers = sorted(known + papers, key=lambda paper: paper['order'])
         return papers
 
     def get_paper_info(self, paper):
-        title = paper['meta'].find('div', class_='list-title mathjax').text.split('\nTitle: ')[1].split('\n')[0]
-        author_list = np.array(paper['meta'].find('div', class_='list-authors').text.split('\n'))[2:-1]
-        authors = []
-        for author in author_list:
-            authors.append(author.split(',')[0])
-
         # parse the paper's abstract page
-        paper_href = paper['identifier'].find('a', title='Abstract').get_attribute_list('href')[0]
-        paper_link = self.url_header + paper_href
-        response = requests.get(paper_link)
+        paper_link = self.url_header + paper['href']
+        with self.metrics.timer('abstract_fetch'):
+            response = self.transport.get(paper_link)
 
         # this is not to send requests too much - avoid IP ban
-        time.sleep(0.2)
+        with self.metrics.timer('sleep'):
+            time.sleep(0.2)
 
-        soup = BeautifulSoup(response.text, 'lxml')
+        return self.parse_paper_info(paper, paper_link, response.text)
 
+    def parse_paper_info(self, paper, paper_link, html):
         # get abstract when the abstract option is set true
-        abstract = ''
-        if self.abstract:
-            for s in soup.find('blockquote').text.split('\n'):
-                abstract += s
+        with self.metrics.timer('abstract_parse'):
+            fields = self.parser.arxiv_abstract(html, self.abstract)
+        with self.metrics.timer('build'):
+            return self.build_paper_info(paper, paper_link, fields)
 
+    def build_paper_info(self, paper, paper_link, fields):
+        # combine the listing entry with the abstract, number of versions and latest submission line of a paper
         # comments = soup.find('td', class_='tablecell comments mathjax')
         # if comments:
         #     text = comments.text
@@ -153,10 +367,8 @@ class ArxivScraper:
         # else:
         #     num_pages = -1  # missing value handling
 
-        num_versions = len(soup.find_all('b'))
-
         # paper submit time and paper size
-        latest_submit = soup.find('div', class_='submission-history').text.split('\n')[-2]
+        latest_submit = fields['latest_submit']
         match = re.findall(self.date_pattern, latest_submit)
         if len(match) > 0:
             submit_weekday = re.findall(self.weekday_pattern, match[0])[0]
@@ -167,12 +379,13 @@ class ArxivScraper:
         size = re.findall('[0-9]+[a-z]b', latest_submit)[0]
 
         paper_info = {
-            'title': title,
-            'authors': authors,
-            'abstract': abstract,
+            'title': paper['title'],
+            'authors': paper['authors'],
+            'abstract': fields['abstract'],
             'order': paper['order'],
+            'arxiv_id': parse_arxiv_id(paper['href'])[0],
             # 'num_pages': num_pages,
-            'num_versions': num_versions,
+            'num_versions': fields['num_versions'],
             'submit_weekday': submit_weekday,
             'submit_time': submit_time,
             'size': size,
@@ -181,18 +394,51 @@ class ArxivScraper:
         return paper_info
 
     def get_next_page(self, soup):
-        next_page = soup.find_all('li')[-1]
-        link = next_page.find('a').get_attribute_list('href')[0]
+        link = self.parser.arxiv_next_href(soup)
 
         # form next url and send request
         url_next = self.url_header + link
-        response = requests.get(url_next)
+        return self._load_page(url_next)
+
+    # helper methods
+    def _load_page(self, url_next):
+        if self.checkpoint is not None:
+            self.checkpoint.set_cursor(url_next)
+        with self.metrics.timer('listing_fetch'):
+            response = self.transport.get(url_next)
 
         # prepare parser for the next page html
-        next_page = BeautifulSoup(response.text, 'lxml')
+        with self.metrics.timer('listing_parse'):
+            next_page = self.parser.load(response.text)
         return next_page
 
-    # helper methods
+    def _save_day(self, res):
+        if self.store is not None:
+            self.store.append('arxiv', self.archive, res['date'], res['papers'])
+        else:
+            write_json(os.path.join(self.save_dir, res['date'] + '_arxiv.json'), as_dict(res))
+
+    def _prefetch_page(self, url):
+        # this is not to send requests too much - avoid IP ban. The wait overlaps with the current page's papers
+        time.sleep(0.2)
+        with self.metrics.timer('listing_fetch'):
+            return self.transport.get(url).text
+
+    def _get_papers_async(self, paper_list):
+        # fetch all the abstract pages of a day concurrently, then parse them in the listing order
+        paper_links = [self.url_header + paper['href'] for paper in paper_list]
+        with self.metrics.timer('abstract_fetch'):
+            pages = self.async_fetcher.fetch_all(paper_links)
+        return [self.parse_paper_info(paper, paper_link, html)
+                for paper, paper_link, html in zip(paper_list, paper_links, pages)]
+
+    def _get_paper_info_limited(self, paper):
+        # worker pool task - the pool's shared rate limiter replaces the sleep after each request
+        paper_link = self.url_header + paper['href']
+        with self.metrics.timer('abstract_fetch'):
+            response = self.transport.get(paper_link)
+        return self.parse_paper_info(paper, paper_link, response.text)
+
     def _parse_date(self, date):
         # parse date from a given parameters to generate date string
         if date['day'] < 10:
@@ -208,18 +454,28 @@ class ArxivScraper:
 
     def _get_url(self, date):
         # url generation given parameters for accessing the first page
-        url = 'https://arxiv.org/catchup?'
+        url = self.url_header + '/catchup?'
         url += 'smonth=%d&' % date['month']
         url += 'sday=%d&' % date['day']
         url += 'group=grp_&'
         url += 'archive=%s&' % self.archive
-        url += 'num=50&'
+        url += 'num=%d&' % self.page_size
         url += 'method=without&'
         url += 'syear=%d' % date['year']
         return url
 
+    # the indexes and author names stay in this process - copies sent to joblib workers only fetch and parse papers
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['author_index'] = None
+        state['author_names'] = None
+        state['dedup_index'] = None
+        state['search_index'] = None
+        return state
+
 
 if __name__ == '__main__':
+    # run as a module from the repository root: python -m scrapers.arxivscraper
     # !!! parameters for ArchiveScraper are stored in `arxiv_config.json` under the `configs` directory.
     params = {'start': {'year': 2018, 'month': 3, 'day': 13},
               'end': {'year': 2018, 'month': 3, 'day': 14},
@@ -238,5 +494,6 @@ if __name__ == '__main__':
     print('Last date: ', results[-1]['date'])
     print('First paper of the last day: ', results[-1]['papers'][0])
 
-    # with open('../data/arxiv-2018-04-11-2018-04-11.pkl', 'wb') as f:
+    # import pickle
+    # with open('./data/arxiv-2018-04-11-2018-04-11.pkl', 'wb') as f:
     #     pickle.dump(results, f)
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+
+def _get_text(url):
+    response = requests.get(url)
+    return response.text
+
+
+class AsyncFetcher:
+    """
+    Asyncio-based page fetcher that keeps a bounded number of requests in flight.
+
+    Blocking fetches run on a private thread pool driven by an asyncio event loop. A semaphore caps the number of
+    outstanding requests and an optional token bucket spaces them out, so it replaces the fixed sleep after every
+    request.
+
+    Inputs:
+        - concurrency: int, maximum number of requests in flight at the same time
+        - rate_limiter: TokenBucket, shared rate limiter. None means no limit
+        - fetch: callable, takes a url and returns the page html. Defaults to a plain `requests.get`
+
+    """
+    def __init__(self, concurrency=8, rate_limiter=None, fetch=None):
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter
+        self.fetch = fetch if fetch is not None else _get_text
+        self._executor = None
+
+    def fetch_all(self, urls):
+        # fetch all the urls concurrently and return their html in the same order
+        if len(urls) == 0:
+            return []
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self._fetch_all(urls))
+        finally:
+            loop.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _fetch_all(self, urls):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*[self._fetch_one(url, semaphore) for url in urls])
+
+    async def _fetch_one(self, url, semaphore):
+        async with semaphore:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.fetch, url)
+
+    # thread pools cannot be pickled - copies sent to worker processes start their own
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        return state
+
+
+async def aiterate(iterator):
+    # async iterator over a blocking iterator, advanced on a private thread so the event loop keeps running
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+    done = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(executor, next, iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        # a consumer that stops early still closes the iterator, after any step still running on the thread
+        if hasattr(iterator, 'close'):
+            executor.submit(iterator.close)
+        executor.shutdown(wait=False)
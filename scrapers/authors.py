@@ -0,0 +1,237 @@
+import os
+import re
+import sys
+import glob
+import json
+import unicodedata
+import numpy as np
+from .common import Column, SortedRuns, day_number
+
+
+# papers with more authors (large collaborations) get no co-authorship pairs, which grow with the square of the list
+MAX_COAUTHORS = 50
+
+_LOW_BITS = (1 << 32) - 1
+
+
+def author_key(name):
+    # canonical form of an author name: first initial and last name, lowercase and without accents or latex markup,
+    # so that "J. Smith", "John  Smith" and "J\\'ohn Smith" all become "j smith"
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+    name = re.sub(r'\\[a-z]+|\\.|[{}$]', '', name)
+    tokens = re.sub(r'[^0-9a-z\- ]+', ' ', name).split()
+    if len(tokens) == 0:
+        return ''
+    if len(tokens) == 1:
+        return tokens[0]
+    return '%s %s' % (tokens[0][0], tokens[-1])
+
+
+class AuthorIndex:
+    """
+    Interned author names, an inverted index from authors to papers and a sparse co-authorship matrix, updated day
+    by day as papers are scraped.
+
+    Author names are normalized (see `author_key`) and interned to integer ids, and papers (keyed by arXiv
+    identifier) to integer rows with their listing day, Arxiv order, Scirate rank and scite count (-1 when unknown).
+    Both sparse structures are int64 (row << 32 | column) keys kept as sorted runs merged level by level (see
+    scrapers.common.SortedRuns): the papers of an author, or its co-authors, are one binary search per run away, and
+    a day's papers are added as a new run, without rewriting the edges of earlier days. A paper seen again, e.g. on
+    Scirate after Arxiv, only updates its fields.
+
+    Inputs:
+        - max_coauthors: int, papers with more authors are indexed but left out of the co-authorship matrix
+
+    """
+    def __init__(self, max_coauthors=MAX_COAUTHORS):
+        self.max_coauthors = max_coauthors
+        self.keys = []
+        self.names = []
+        self.ids = {}
+        self.arxiv_ids = []
+        self.papers = {}
+        self.columns = dict((name, Column(np.int32)) for name in ['day', 'order', 'rank', 'scite_count'])
+        self.author_papers = SortedRuns(np.int64)
+        # co-author pairs, with their number of shared papers
+        self.pairs = SortedRuns(np.int64, np.int32, combine=True)
+
+    @property
+    def num_authors(self):
+        return len(self.names)
+
+    @property
+    def num_papers(self):
+        return len(self.arxiv_ids)
+
+    def intern(self, name):
+        # integer id of an author name, assigned on first sight
+        key = author_key(name)
+        author = self.ids.get(key)
+        if author is None:
+            author = self.ids[key] = len(self.names)
+            self.keys.append(key)
+            self.names.append(name)
+        return author
+
+    def add_day(self, res, source='arxiv'):
+        """
+        Add the papers of a scraped day ({'date', 'papers'}) of either scraper.
+
+        Outputs:
+            - num_new: int, number of papers not seen before
+        """
+        day = day_number(res['date'])
+        new_edges, new_pairs = [], []
+        updates = dict((name, ([], [])) for name in self.columns)
+        num_papers = self.num_papers
+        for paper in res['papers']:
+            arxiv_id = paper.get('arxiv_id')
+            row = self.papers.get(arxiv_id) if arxiv_id else None
+            if row is None:
+                row = num_papers + len(new_edges)
+                if arxiv_id:
+                    self.papers[arxiv_id] = row
+                self.arxiv_ids.append(arxiv_id or '')
+                authors = sorted(set(self.intern(name) for name in paper['authors']))
+                new_edges.append([(author << 32) | row for author in authors])
+                if 1 < len(authors) <= self.max_coauthors:
+                    new_pairs += [(a << 32) | b for a in authors for b in authors if a != b]
+                fields = {'day': day, 'order': -1, 'rank': -1, 'scite_count': -1}
+            else:
+                fields = {}
+                if source == 'arxiv':
+                    fields['day'] = day
+            if source == 'arxiv':
+                fields['order'] = paper['order']
+            else:
+                fields['rank'] = paper['rank']
+                fields['scite_count'] = paper['scite_count']
+            for name, value in fields.items():
+                updates[name][0].append(row)
+                updates[name][1].append(value)
+
+        # new rows first, then the fields of every row of the day
+        for name, column in self.columns.items():
+            column.append(np.full(len(new_edges), -1))
+            rows, values = updates[name]
+            column.values()[rows] = values
+        self.author_papers.add([key for keys in new_edges for key in keys])
+        self.pairs.add(new_pairs, np.ones(len(new_pairs)))
+        return len(new_edges)
+
+    def add_days(self, days, source='arxiv'):
+        # add every day of an iterable of scraped days, and return the number of new papers
+        return sum(self.add_day(res, source) for res in days)
+
+    def papers_of(self, name):
+        # rows of the papers of an author, in the order they were added. Empty for an unknown author
+        author = self.ids.get(author_key(name))
+        if author is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.author_papers.between(author << 32, (author + 1) << 32)[0] & _LOW_BITS
+
+    def coauthors_of(self, name):
+        # (author ids, number of shared papers) of the co-authors of an author, most frequent first
+        author = self.ids.get(author_key(name))
+        if author is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        pairs, counts = self.pairs.between(author << 32, (author + 1) << 32)
+        coauthors = pairs & _LOW_BITS
+        order = np.argsort(-counts, kind='stable')
+        return coauthors[order], counts[order]
+
+    def author_summary(self, name):
+        # number of papers, Scirate-ranked papers, mean Scirate rank and mean scite count of an author
+        rows = self.papers_of(name)
+        rank = self.columns['rank'].values()[rows]
+        ranked = rank >= 0
+        return {'num_papers': len(rows),
+                'num_ranked': int(ranked.sum()),
+                'mean_rank': float(rank[ranked].mean()) if ranked.any() else float('nan'),
+                'mean_scite_count': (float(self.columns['scite_count'].values()[rows][ranked].mean())
+                                     if ranked.any() else float('nan'))}
+
+    def author_table(self):
+        """
+        Per-author aggregates over every paper, computed with NumPy in one pass over the inverted index.
+
+        Outputs:
+            - table: dict of arrays indexed by author id: num_papers, num_ranked, mean_rank, mean_scite_count,
+              first_day and last_day (proleptic ordinals)
+        """
+        edges = self.author_papers.merged()[0]
+        authors = (edges >> 32).astype(np.int64)
+        rows = edges & _LOW_BITS
+        rank = self.columns['rank'].values()[rows].astype(float)
+        scite = self.columns['scite_count'].values()[rows].astype(float)
+        day = self.columns['day'].values()[rows]
+        ranked = rank >= 0
+        n = self.num_authors
+
+        num_papers = np.bincount(authors, minlength=n)
+        num_ranked = np.bincount(authors, weights=ranked, minlength=n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_rank = np.bincount(authors, weights=np.where(ranked, rank, 0.), minlength=n) / num_ranked
+            mean_scite = np.bincount(authors, weights=np.where(ranked, scite, 0.), minlength=n) / num_ranked
+        # the edges are sorted by author, so every author is one contiguous segment
+        starts = np.searchsorted(authors, np.arange(n))
+        present = num_papers > 0
+        first_day = np.full(n, -1, dtype=np.int64)
+        last_day = np.full(n, -1, dtype=np.int64)
+        if present.any():
+            first_day[present] = np.minimum.reduceat(day, starts[present])
+            last_day[present] = np.maximum.reduceat(day, starts[present])
+        return {'num_papers': num_papers, 'num_ranked': num_ranked.astype(np.int64), 'mean_rank': mean_rank,
+                'mean_scite_count': mean_scite, 'first_day': first_day, 'last_day': last_day}
+
+    def coauthorship_matrix(self):
+        # symmetric co-authorship counts as CSR arrays (indptr, indices, data) of shape (num_authors, num_authors),
+        # e.g. for scipy.sparse.csr_matrix((data, indices, indptr))
+        pairs, counts = self.pairs.merged()
+        indptr = np.searchsorted(pairs >> 32, np.arange(self.num_authors + 1))
+        return indptr, (pairs & _LOW_BITS).astype(np.int32), counts
+
+    def save(self, path):
+        # write to a temporary file first, so a crash never leaves a truncated index behind
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, keys=np.array(self.keys, dtype=str), names=np.array(self.names, dtype=str),
+                 arxiv_ids=np.array(self.arxiv_ids, dtype=str), max_coauthors=self.max_coauthors,
+                 **self.author_papers.arrays('author_papers'), **self.pairs.arrays('pairs', 'pair_counts'),
+                 **dict((name, column.values()) for name, column in self.columns.items()))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(int(data['max_coauthors']))
+            index.keys = data['keys'].tolist()
+            index.names = data['names'].tolist()
+            index.ids = dict((key, i) for i, key in enumerate(index.keys))
+            index.arxiv_ids = data['arxiv_ids'].tolist()
+            index.papers = dict((arxiv_id, i) for i, arxiv_id in enumerate(index.arxiv_ids) if arxiv_id)
+            for name in index.columns:
+                index.columns[name] = Column(np.int32, data[name].copy())
+            # indexes saved before the runs have each structure as one sorted array
+            index.author_papers.load(data, 'author_papers')
+            index.pairs.load(data, 'pairs', 'pair_counts')
+        return index
+
+
+def open_index(path):
+    # the index saved at path, or a new one when there is none yet
+    if path is not None and os.path.exists(path):
+        return AuthorIndex.load(path)
+    return AuthorIndex()
+
+
+if __name__ == '__main__':
+    # usage: python -m scrapers.authors <index.npz> <save_dir>
+    #   adds the day files saved by the scrapers (save_by_day, json) to the index, Arxiv days first
+    index = open_index(sys.argv[1])
+    for source in ['arxiv', 'scirate']:
+        for path in sorted(glob.glob(os.path.join(sys.argv[2], '*_%s.json' % source))):
+            with open(path, 'r') as f:
+                index.add_day(json.load(f), source)
+    index.save(sys.argv[1])
+    print('%d authors, %d papers.' % (index.num_authors, index.num_papers))
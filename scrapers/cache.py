@@ -0,0 +1,158 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+
+
+class ResponseCache:
+    """
+    On-disk cache of HTTP response bodies, keyed by the sha256 of the url.
+
+    Each entry is a body file (gzip-compressed when `compress` is true) and a small json file with the url, ETag,
+    Last-Modified and fetch time. An entry older than `ttl` is stale: the transport revalidates it with a conditional
+    request and keeps the cached body on a 304. When the bodies exceed `max_size` bytes, the least recently used
+    entries are evicted.
+
+    Inputs:
+        - cache_dir: string, directory of the cache. Created when missing
+        - ttl: float, seconds an entry stays fresh. None means entries never go stale, e.g. pages of past dates
+        - max_size: int, maximum total size of the cached bodies in bytes. None means no limit
+        - compress: bool, whether bodies are stored gzip-compressed
+
+    """
+    def __init__(self, cache_dir, ttl=None, max_size=None, compress=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compress = compress
+
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_size = sum(size for _, size, _ in self._entries())
+
+    def get(self, url):
+        # return the cached entry of a url as a dict (body, etag, last_modified, fresh), or None on a miss
+        key = self._key(url)
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        body_path = self._body_path(key, meta['compressed'])
+        try:
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        if meta['compressed']:
+            body = gzip.decompress(body)
+
+        # the body's mtime records the last access for LRU eviction
+        os.utime(body_path, None)
+
+        fresh = self.ttl is None or time.time() - meta['fetched_at'] < self.ttl
+        return {'body': body,
+                'etag': meta.get('etag'),
+                'last_modified': meta.get('last_modified'),
+                'fresh': fresh}
+
+    def put(self, url, body, etag=None, last_modified=None):
+        key = self._key(url)
+        old = self._read_meta(key)
+        data = gzip.compress(body) if self.compress else body
+
+        os.makedirs(os.path.dirname(self._meta_path(key)), exist_ok=True)
+        self._write(self._body_path(key, self.compress), data)
+        self._write(self._meta_path(key), json.dumps({'url': url,
+                                                      'etag': etag,
+                                                      'last_modified': last_modified,
+                                                      'fetched_at': time.time(),
+                                                      'compressed': self.compress,
+                                                      'size': len(data)}).encode('utf-8'))
+        with self._lock:
+            if old is not None:
+                self._total_size -= old['size']
+                if old['compressed'] != self.compress:
+                    self._remove(self._body_path(key, old['compressed']))
+            self._total_size += len(data)
+        self._evict()
+
+    def touch(self, url):
+        # mark a stale entry as fresh again after a successful revalidation (304)
+        key = self._key(url)
+        meta = self._read_meta(key)
+        if meta is not None:
+            meta['fetched_at'] = time.time()
+            self._write(self._meta_path(key), json.dumps(meta).encode('utf-8'))
+
+    def size(self):
+        return self._total_size
+
+    # helper methods
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def _body_path(self, key, compressed):
+        return os.path.join(self.cache_dir, key[:2], key + ('.html.gz' if compressed else '.html'))
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, data):
+        # write to a temporary file first so that readers never see a partial entry
+        tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        # (key, size, last access) of every cached body
+        entries = []
+        for sub in os.listdir(self.cache_dir):
+            sub_dir = os.path.join(self.cache_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if name.endswith('.html') or name.endswith('.html.gz'):
+                    stat = os.stat(os.path.join(sub_dir, name))
+                    entries.append((name.split('.')[0], stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        if self.max_size is None or self._total_size <= self.max_size:
+            return
+        with self._lock:
+            # drop the least recently used entries until the cache fits again
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for key, size, _ in entries:
+                if total <= self.max_size:
+                    break
+                self._remove(self._body_path(key, False))
+                self._remove(self._body_path(key, True))
+                self._remove(self._meta_path(key))
+                total -= size
+            self._total_size = total
+
+    # locks cannot be pickled - a copy sent to another process shares the directory but not the size counter
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,76 @@
+import os
+import json
+import datetime
+
+
+class Checkpoint:
+    """
+    Manifest of a scraping run, so that an interrupted run can resume where it stopped.
+
+    It records the days that are completely scraped and the cursor of the page in progress (the url of the next
+    Arxiv catchup page, or the next Scirate day). Every update is written to disk immediately.
+
+    Inputs:
+        - path: string, path of the json manifest. Created when missing
+        - completed: iterable, optional. Days known to be complete already, e.g. the day files in the save directory
+
+    """
+    def __init__(self, path, completed=()):
+        self.path = path
+        self.completed = set(completed)
+        self.cursor = None
+
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            self.completed.update(manifest['completed'])
+            self.cursor = manifest['cursor']
+
+    def is_completed(self, date):
+        return date in self.completed
+
+    def mark_completed(self, date):
+        self.completed.add(date)
+        self._save()
+
+    def set_cursor(self, cursor):
+        # None marks the end of the run
+        self.cursor = cursor
+        self._save()
+
+    def latest(self):
+        # the most recent completed day, or None when nothing is completed yet
+        if len(self.completed) == 0:
+            return None
+        return max(self.completed)
+
+    def _save(self):
+        write_json(self.path, {'completed': sorted(self.completed), 'cursor': self.cursor})
+
+
+def write_json(path, obj):
+    # write to a temporary file first, so a crash never leaves a truncated file behind
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def saved_days(save_dir, suffix):
+    # days already written by save_by_day, e.g. "day_2018_03_13" for "day_2018_03_13_arxiv.json"
+    if not os.path.isdir(save_dir):
+        return []
+    ending = '_%s.json' % suffix
+    return [name[:-len(ending)] for name in os.listdir(save_dir) if name.endswith(ending)]
+
+
+def to_date(date):
+    # "day_2018_03_13" -> {'year': 2018, 'month': 3, 'day': 13}
+    year, month, day = date.split('_')[1:]
+    return {'year': int(year), 'month': int(month), 'day': int(day)}
+
+
+def next_date(date):
+    # the day after a "day_YYYY_MM_DD" string, as a start/end dict
+    day = datetime.date(**to_date(date)) + datetime.timedelta(days=1)
+    return {'year': day.year, 'month': day.month, 'day': day.day}
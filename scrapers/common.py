@@ -0,0 +1,208 @@
+import re
+import zlib
+import datetime
+import numpy as np
+
+
+_PRIME = (1 << 31) - 1
+
+# sorted runs (or index segments) of the same level merged into one of the next level
+MERGE_FACTOR = 8
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# units of the submission history sizes ("123kb", "2mb"): unit i is 1024 ** (i + 1) bytes
+SIZE_UNITS = ['k', 'm', 'g']
+
+
+def day_number(date):
+    # "day_2018_03_13" -> proleptic ordinal, so that date windows are plain integer ranges
+    year, month, day = date.split('_')[1:]
+    return datetime.date(int(year), int(month), int(day)).toordinal()
+
+
+class Column:
+    # growable numeric array with amortized appends, of rows of `shape` (scalars by default)
+    def __init__(self, dtype, data=None, shape=()):
+        self.data = np.zeros((1024,) + shape, dtype=dtype) if data is None else data
+        self.size = 0 if data is None else len(data)
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        if self.size + len(values) > len(self.data):
+            grown = np.zeros((max(2 * len(self.data), self.size + len(values)),) + self.data.shape[1:],
+                             dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+    def values(self):
+        return self.data[:self.size]
+
+
+class SortedRuns:
+    """
+    Sorted integer keys with an optional integer value each, kept as sorted runs merged level by level.
+
+    Every `add` appends a sorted run of level 0, and every MERGE_FACTOR runs of a level are merged into one of the
+    next level, as the segments of scrapers.search: adding keys costs O(log n) per key, amortized, instead of
+    rewriting every key already there, and a lookup is one binary search per run. With `combine`, equal keys are
+    kept once with the sum of their values, e.g. counts.
+
+    Inputs:
+        - dtype: numpy dtype of the keys
+        - value_dtype: numpy dtype of the values. None for keys without values
+        - combine: bool, whether equal keys are merged into one with the sum of their values
+
+    """
+    def __init__(self, dtype, value_dtype=None, combine=False):
+        self.dtype = np.dtype(dtype)
+        self.value_dtype = np.dtype(value_dtype) if value_dtype is not None else None
+        self.combine = combine
+        # (keys, values, level) of every run, oldest first
+        self.runs = []
+        self._merged = None
+
+    def __len__(self):
+        return sum(len(keys) for keys, _, _ in self.runs)
+
+    def add(self, keys, values=None):
+        # add keys (and their values) as a new run, then merge full levels
+        keys = np.asarray(keys, dtype=self.dtype)
+        if len(keys) == 0:
+            return
+        values = np.asarray(values, dtype=self.value_dtype) if self.value_dtype is not None else None
+        self.runs.append(self._sorted(keys, values) + (0,))
+        self._merged = None
+        while True:
+            levels = [level for _, _, level in self.runs[-MERGE_FACTOR:]]
+            if len(levels) < MERGE_FACTOR or len(set(levels)) > 1:
+                break
+            keys, values = self._concatenate(self.runs[-MERGE_FACTOR:])
+            self.runs[-MERGE_FACTOR:] = [self._sorted(keys, values) + (levels[0] + 1,)]
+
+    def values_of(self, queries):
+        # values of the keys equal to every query, one array per query
+        queries = np.asarray(queries, dtype=self.dtype)
+        found = [[] for _ in range(len(queries))]
+        for keys, values, _ in self.runs:
+            start = np.searchsorted(keys, queries, side='left')
+            end = np.searchsorted(keys, queries, side='right')
+            for i in np.flatnonzero(end > start).tolist():
+                found[i].append(values[start[i]:end[i]])
+        empty = np.zeros(0, dtype=self.value_dtype)
+        return [np.concatenate(arrays) if len(arrays) > 0 else empty for arrays in found]
+
+    def between(self, low, high):
+        # (keys, values) of the keys in [low, high), sorted by key
+        bounds = np.array([low, high], dtype=self.dtype)
+        parts = []
+        for keys, values, _ in self.runs:
+            start, end = np.searchsorted(keys, bounds).tolist()
+            parts.append((keys[start:end], values[start:end] if values is not None else None, 0))
+        return self._sorted(*self._concatenate(parts))
+
+    def merged(self):
+        # (keys, values) of every key as one sorted run, kept until the next add
+        if self._merged is None:
+            self._merged = self._sorted(*self._concatenate(self.runs))
+        return self._merged
+
+    def arrays(self, name, values_name=None):
+        # the runs as arrays to save with np.savez, read back by `load`
+        keys, values = self._concatenate(self.runs)
+        arrays = {name: keys,
+                  name + '_run_ends': np.cumsum([len(run[0]) for run in self.runs], dtype=np.int64),
+                  name + '_run_levels': np.array([run[2] for run in self.runs], dtype=np.int32)}
+        if values_name is not None:
+            arrays[values_name] = values
+        return arrays
+
+    def load(self, data, name, values_name=None):
+        # replace the runs with the arrays saved by `arrays`. Keys saved as one sorted array are one run
+        keys = data[name]
+        values = data[values_name] if values_name is not None else None
+        if name + '_run_ends' in data.files:
+            ends = data[name + '_run_ends'].tolist()
+            levels = data[name + '_run_levels'].tolist()
+        else:
+            ends, levels = ([len(keys)], [0]) if len(keys) > 0 else ([], [])
+        self.runs = []
+        self._merged = None
+        for start, end, level in zip([0] + ends[:-1], ends, levels):
+            self.runs.append((keys[start:end], values[start:end] if values is not None else None, level))
+        return self
+
+    # helper methods
+    def _concatenate(self, runs):
+        keys = np.concatenate([np.zeros(0, dtype=self.dtype)] + [run[0] for run in runs])
+        if self.value_dtype is None:
+            return keys, None
+        return keys, np.concatenate([np.zeros(0, dtype=self.value_dtype)] + [run[1] for run in runs])
+
+    def _sorted(self, keys, values):
+        # keys sorted (stable, so equal keys keep their order), with their values
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        values = values[order] if values is not None else None
+        if self.combine and len(keys) > 0:
+            first = np.ones(len(keys), dtype=bool)
+            first[1:] = keys[1:] != keys[:-1]
+            values = np.add.reduceat(values, np.flatnonzero(first)).astype(self.value_dtype)
+            keys = keys[first]
+        return keys, values
+
+
+def normalize_title(title):
+    # lowercase, drop latex markup and punctuation, and collapse whitespace
+    title = re.sub(r'[\$\\{}^_]', ' ', title.lower())
+    title = re.sub(r'[^0-9a-z]+', ' ', title)
+    return ' '.join(title.split())
+
+
+def normalize_author(author):
+    # last name only, since the two sites abbreviate first names differently
+    tokens = re.sub(r'[^0-9a-z ]+', ' ', author.lower()).split()
+    return tokens[-1] if len(tokens) > 0 else ''
+
+
+def shingles(title, n=3):
+    # crc32 hashes of the character n-grams of a normalized title
+    text = ' %s ' % title
+    return set(zlib.crc32(text[i:i + n].encode('utf-8')) for i in range(max(1, len(text) - n + 1)))
+
+
+def word_shingles(text, n=3):
+    # crc32 hashes of the word n-grams of a normalized text, e.g. an abstract
+    words = normalize_title(text).split()
+    return set(zlib.crc32(' '.join(words[i:i + n]).encode('utf-8')) for i in range(max(0, len(words) - n + 1)))
+
+
+def author_overlap(authors_a, authors_b):
+    # fraction of the shorter author list found in the other one
+    a = set(normalize_author(author) for author in authors_a)
+    b = set(normalize_author(author) for author in authors_b)
+    if len(a) == 0 or len(b) == 0:
+        return 0.
+    return len(a & b) / float(min(len(a), len(b)))
+
+
+class MinHasher:
+    """
+    MinHash signatures of shingle sets, computed with NumPy for all the hash functions at once.
+
+    Inputs:
+        - num_perm: int, number of hash functions (signature length)
+        - seed: int, random seed of the hash functions
+
+    """
+    def __init__(self, num_perm=64, seed=0):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, _PRIME, size=num_perm).astype(np.int64)
+        self.b = rng.randint(0, _PRIME, size=num_perm).astype(np.int64)
+
+    def signature(self, hashes):
+        values = np.fromiter(hashes, dtype=np.int64, count=len(hashes)) % _PRIME
+        return ((np.outer(values, self.a) + self.b) % _PRIME).min(axis=0)
@@ -0,0 +1,276 @@
+import os
+import sys
+import glob
+import json
+import zlib
+import numpy as np
+from .common import (Column, MinHasher, SortedRuns, day_number, normalize_author, normalize_title, shingles,
+                     word_shingles)
+
+
+# statuses of a paper checked against the index
+STATUSES = ['new', 'repeat', 'replaced', 'cross_list', 'near_duplicate']
+
+# statuses of the papers kept by `filter_day`: near-duplicates have their own identifier, so they are only reported
+KEPT_STATUSES = ['new', 'near_duplicate']
+
+# FNV-1a constants, to hash the rows of a signature band into one 64-bit key
+_FNV_OFFSET = np.uint64(14695981039346656037)
+_FNV_PRIME = np.uint64(1099511628211)
+
+
+def author_hashes(authors):
+    # crc32 hashes of the normalized last names of an author list
+    return set(zlib.crc32(normalize_author(author).encode('utf-8')) for author in authors)
+
+
+class DedupIndex:
+    """
+    Persistent index of the papers already scraped, to drop the ones listed again.
+
+    The parsers skip the entries a listing page marks as replaced or cross-listed, but a paper still comes back when
+    a listing is scraped again over an overlapping range, when its replacement is not marked, or when the listings of
+    several archives go into the same index. Every paper is first looked up by arXiv identifier: one seen on another
+    day is "replaced" when it has more versions than then and a "repeat" otherwise, and one seen in another archive is
+    a "cross_list". A day scraped again is recognized as the same listing, so its papers stay new.
+
+    Papers with a new identifier go through a MinHash LSH index of title trigrams and abstract word trigrams: a paper
+    whose signature agrees with an indexed one on at least `threshold` of its values, and that shares at least
+    `min_author_overlap` of its authors with it, is a "near_duplicate" (e.g. the same work submitted twice). Since
+    sequels and comments can be just as similar, near-duplicates are only reported: they are indexed under their own
+    identifier and kept by `filter_day`.
+
+    Lookups are a dictionary access and one binary search per band into the sorted runs of band keys (see
+    scrapers.common.SortedRuns), which a day's papers are merged into without rewriting the earlier keys, so checking
+    and adding a paper take about the same time whether the index holds a month or years of listings. `save` writes
+    everything to one .npz file, so incremental runs keep deduplicating against the earlier ones.
+
+    Inputs:
+        - num_perm: int, MinHash signature length
+        - bands: int, number of LSH bands. num_perm must be divisible by bands
+        - threshold: float, minimum fraction of equal signature values of a near-duplicate
+        - min_author_overlap: float, minimum fraction of the shorter author list shared by a near-duplicate
+
+    """
+    def __init__(self, num_perm=64, bands=16, threshold=0.8, min_author_overlap=0.5):
+        if num_perm % bands != 0:
+            raise ValueError('num_perm must be divisible by bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_author_overlap = min_author_overlap
+        self.hasher = MinHasher(num_perm)
+
+        self.arxiv_ids = []
+        self.papers = {}
+        self.archive_names = []
+        self.columns = {'day': Column(np.int32), 'archive': Column(np.int16), 'num_versions': Column(np.int16),
+                        'author_end': Column(np.int64)}
+        self.signatures = Column(np.uint32, shape=(num_perm,))
+        # author hashes of all the papers, back to back: those of row r end at author_end[r]
+        self.author_hashes = Column(np.uint32)
+        # the row of every band key of every paper
+        self.band_index = SortedRuns(np.uint64, np.int32)
+
+    @property
+    def num_papers(self):
+        return len(self.arxiv_ids)
+
+    def signature(self, paper):
+        # MinHash signature of the title and abstract of a paper
+        hashes = shingles(normalize_title(paper['title'])) | word_shingles(paper.get('abstract') or '')
+        return self.hasher.signature(hashes).astype(np.uint32)
+
+    def check_day(self, res, archive):
+        """
+        Check the papers of a scraped Arxiv day against the index, then add its new papers to it.
+
+        Inputs:
+            - res: dict, {'date', 'papers'}
+            - archive: string, archive of the listing
+
+        Outputs:
+            - checks: list, one dict per paper with keys status (see STATUSES), duplicate_of (arXiv identifier of
+              the earlier paper, None for new papers) and similarity (fraction of equal signature values, 1 for
+              identifier matches)
+        """
+        day = day_number(res['date'])
+        if archive not in self.archive_names:
+            self.archive_names.append(archive)
+        code = self.archive_names.index(archive)
+        papers = res['papers']
+        signatures = np.array([self.signature(paper) for paper in papers], dtype=np.uint32).reshape(-1, self.num_perm)
+        keys = self._band_keys(signatures)
+        candidates = self._lookup(keys)
+        authors = [author_hashes(paper.get('authors') or []) for paper in papers]
+
+        checks = []
+        new_rows = []
+        day_buckets = {}
+        days = self.columns['day'].values()
+        archives = self.columns['archive'].values()
+        versions = self.columns['num_versions'].values()
+        for i, paper in enumerate(papers):
+            arxiv_id = paper.get('arxiv_id')
+            row = self.papers.get(arxiv_id) if arxiv_id else None
+            if row is not None and row >= self.num_papers - len(new_rows):
+                # listed twice on this day
+                checks.append({'status': 'repeat', 'duplicate_of': arxiv_id, 'similarity': 1.})
+                continue
+            if row is not None:
+                if days[row] == day and archives[row] == code:
+                    status = 'new'
+                elif archives[row] != code:
+                    status = 'cross_list'
+                elif paper.get('num_versions', 0) > versions[row]:
+                    status = 'replaced'
+                else:
+                    status = 'repeat'
+                if paper.get('num_versions', 0) > versions[row]:
+                    versions[row] = paper['num_versions']
+                checks.append({'status': status, 'duplicate_of': None if status == 'new' else arxiv_id,
+                               'similarity': 1.})
+                continue
+
+            # a new identifier: near-duplicates by the same authors among the indexed papers and the new ones of
+            # this day. Either way it is indexed, so that its own later listings are recognized
+            rows = set(candidates[i])
+            for key in keys[i].tolist():
+                rows.update(day_buckets.get(key, ()))
+            best, best_similarity = None, 0.
+            for other in rows:
+                similarity = self._similarity(signatures[i], other, signatures, new_rows)
+                if (similarity >= self.threshold and similarity > best_similarity and
+                        self._author_overlap(authors[i], other, authors, new_rows) >= self.min_author_overlap):
+                    best, best_similarity = other, similarity
+            if best is not None:
+                checks.append({'status': 'near_duplicate', 'duplicate_of': self.arxiv_ids[best] or None,
+                               'similarity': best_similarity})
+            else:
+                checks.append({'status': 'new', 'duplicate_of': None, 'similarity': 0.})
+
+            row = self.num_papers
+            if arxiv_id:
+                self.papers[arxiv_id] = row
+            self.arxiv_ids.append(arxiv_id or '')
+            new_rows.append(i)
+            for key in keys[i].tolist():
+                day_buckets.setdefault(key, []).append(row)
+
+        self._add(day, code, [papers[i] for i in new_rows], signatures[new_rows], keys[new_rows],
+                  [authors[i] for i in new_rows])
+        return checks
+
+    def filter_day(self, res, archive):
+        # (the day without the papers listed again, the checks of all its papers)
+        checks = self.check_day(res, archive)
+        papers = [paper for paper, check in zip(res['papers'], checks) if check['status'] in KEPT_STATUSES]
+        return dict(res, papers=papers), checks
+
+    def save(self, path):
+        # write to a temporary file first, so a crash never leaves a truncated index behind
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, arxiv_ids=np.array(self.arxiv_ids, dtype=str),
+                 archive_names=np.array(self.archive_names, dtype=str), signatures=self.signatures.values(),
+                 author_hashes=self.author_hashes.values(), params=np.array([self.num_perm, self.bands]),
+                 threshold=self.threshold, min_author_overlap=self.min_author_overlap,
+                 **self.band_index.arrays('band_keys', 'band_rows'),
+                 **dict((name, column.values()) for name, column in self.columns.items()))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            num_perm, bands = data['params'].tolist()
+            index = cls(num_perm, bands, float(data['threshold']))
+            index.arxiv_ids = data['arxiv_ids'].tolist()
+            index.papers = dict((arxiv_id, i) for i, arxiv_id in enumerate(index.arxiv_ids) if arxiv_id)
+            index.archive_names = data['archive_names'].tolist()
+            # indexes saved before authors were stored have no authors, so their papers have no near-duplicates
+            if 'author_hashes' in data.files:
+                index.min_author_overlap = float(data['min_author_overlap'])
+                index.author_hashes = Column(np.uint32, data['author_hashes'].copy())
+            for name, column in index.columns.items():
+                values = data[name] if name in data.files else np.zeros(index.num_papers, dtype=column.data.dtype)
+                index.columns[name] = Column(column.data.dtype, values.copy())
+            index.signatures = Column(np.uint32, data['signatures'].copy())
+            # indexes saved before the band keys were kept as runs have them as one sorted array
+            index.band_index.load(data, 'band_keys', 'band_rows')
+        return index
+
+    # helper methods
+    def _band_keys(self, signatures):
+        # (num_papers, bands) keys, each hashing the band number and the values of one band of a signature
+        keys = np.empty((len(signatures), self.bands), dtype=np.uint64)
+        values = signatures.astype(np.uint64)
+        for b in range(self.bands):
+            key = np.full(len(signatures), _FNV_OFFSET ^ np.uint64(b), dtype=np.uint64)
+            for r in range(b * self.rows, (b + 1) * self.rows):
+                key = (key ^ values[:, r]) * _FNV_PRIME
+            keys[:, b] = key
+        return keys
+
+    def _lookup(self, keys):
+        # indexed rows sharing a band with each paper, found with one vectorized binary search per run
+        rows = self.band_index.values_of(keys.ravel())
+        return [np.unique(np.concatenate(rows[i * self.bands:(i + 1) * self.bands])).tolist()
+                for i in range(len(keys))]
+
+    def _similarity(self, signature, row, signatures, new_rows):
+        # rows added on this day are not in the signature column yet
+        first_new = self.num_papers - len(new_rows)
+        other = signatures[new_rows[row - first_new]] if row >= first_new else self.signatures.values()[row]
+        return float((signature == other).mean())
+
+    def _author_overlap(self, hashes, row, authors, new_rows):
+        # fraction of the shorter author list shared with a row, indexed or added on this day
+        first_new = self.num_papers - len(new_rows)
+        if row >= first_new:
+            other = authors[new_rows[row - first_new]]
+        else:
+            ends = self.columns['author_end'].values()
+            other = set(self.author_hashes.values()[ends[row - 1] if row > 0 else 0:ends[row]].tolist())
+        if len(hashes) == 0 or len(other) == 0:
+            return 0.
+        return len(hashes & other) / float(min(len(hashes), len(other)))
+
+    def _add(self, day, code, papers, signatures, keys, authors):
+        ends = self.columns['author_end'].values()
+        self.author_hashes.append([value for hashes in authors for value in sorted(hashes)])
+        self.columns['author_end'].append((ends[-1] if len(ends) > 0 else 0) +
+                                          np.cumsum([len(hashes) for hashes in authors], dtype=np.int64))
+        self.columns['day'].append(np.full(len(papers), day))
+        self.columns['archive'].append(np.full(len(papers), code))
+        self.columns['num_versions'].append([paper.get('num_versions', 0) for paper in papers])
+        self.signatures.append(signatures)
+        rows = np.repeat(np.arange(self.num_papers - len(papers), self.num_papers, dtype=np.int32), self.bands)
+        self.band_index.add(keys.ravel(), rows)
+
+
+def open_dedup(path):
+    # the index saved at path, or a new one when there is none yet
+    if path is not None and os.path.exists(path):
+        return DedupIndex.load(path)
+    return DedupIndex()
+
+
+if __name__ == '__main__':
+    # usage: python -m scrapers.dedup <index.npz> <archive> <save_dir> [<out_dir>]
+    #   checks the Arxiv day files saved by the scrapers (save_by_day, json) in date order, prints the number of papers
+    #   per status, and writes the deduplicated days to out_dir when given
+    index = open_dedup(sys.argv[1])
+    archive = sys.argv[2]
+    out_dir = sys.argv[4] if len(sys.argv) > 4 else None
+    counts = dict((status, 0) for status in STATUSES)
+    for path in sorted(glob.glob(os.path.join(sys.argv[3], '*_arxiv.json'))):
+        with open(path, 'r') as f:
+            res, checks = index.filter_day(json.load(f), archive)
+        for check in checks:
+            counts[check['status']] += 1
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+            with open(os.path.join(out_dir, os.path.basename(path)), 'w') as f:
+                json.dump(res, f)
+    index.save(sys.argv[1])
+    print(', '.join('%s: %d' % (status, counts[status]) for status in STATUSES))
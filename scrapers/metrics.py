@@ -0,0 +1,248 @@
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+# upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., float('inf'))
+
+
+def url_type(url):
+    # kind of page a url points to, used as the label of request metrics
+    path = urlparse(url).path
+    if path.startswith('/catchup'):
+        return 'catchup'
+    if path.startswith('/abs/'):
+        return 'abstract'
+    if path.startswith('/oai2'):
+        return 'oai'
+    if path.startswith('/arxiv/'):
+        return 'scirate_day'
+    return 'other'
+
+
+class Metrics:
+    """
+    Counters, stage timers and latency histograms of a scraping run.
+
+    Every value is labelled, e.g. requests by url type or seconds by stage. Stage timers add up the time spent in
+    each stage by all the threads, so concurrent stages can add up to more than the wall time of the run. Values
+    recorded in joblib worker processes stay in those processes. The totals are exported as json or in the
+    Prometheus text format.
+
+    Inputs:
+        - source: string, name of the scraper, used as the "source" label of every value
+
+    """
+    def __init__(self, source):
+        self.source = source
+        self.start = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        # add a latency to a histogram
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0., 'count': 0}
+            histogram = self._histograms[key]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, stage):
+        # time a block of code as one call of a stage
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.count('stage_seconds', time.perf_counter() - t0, stage=stage)
+            self.count('stage_calls', stage=stage)
+
+    def total(self, name, **labels):
+        # sum of a counter over every label value not given
+        with self._lock:
+            return sum(value for (key, key_labels), value in self._counters.items()
+                       if key == name and set(labels.items()) <= set(key_labels))
+
+    def report(self):
+        # all the values as a json-serializable dict
+        elapsed = time.time() - self.start
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), 'sum': h['sum'], 'count': h['count'],
+                           'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS], h['buckets']))}
+                          for (name, labels), h in sorted(self._histograms.items())]
+        papers = self.total('papers')
+        return {'source': self.source,
+                'elapsed': elapsed,
+                'papers_per_second': papers / elapsed if elapsed > 0 else 0.,
+                'counters': counters,
+                'histograms': histograms}
+
+    def prometheus(self):
+        # all the values in the Prometheus text exposition format, with cumulative histogram buckets
+        report = self.report()
+        lines = []
+        for name in sorted(set(c['name'] for c in report['counters'])):
+            lines.append('# TYPE scraper_%s_total counter' % name)
+            for c in report['counters']:
+                if c['name'] == name:
+                    lines.append('scraper_%s_total%s %s' % (name, self._labels(c['labels']), c['value']))
+        for name in sorted(set(h['name'] for h in report['histograms'])):
+            lines.append('# TYPE scraper_%s histogram' % name)
+            for h in report['histograms']:
+                if h['name'] != name:
+                    continue
+                cumulative = 0
+                for bound, value in zip(LATENCY_BUCKETS, h['buckets'].values()):
+                    cumulative += value
+                    le = '+Inf' if bound == float('inf') else str(bound)
+                    lines.append('scraper_%s_bucket%s %d' % (name, self._labels(h['labels'], le=le), cumulative))
+                lines.append('scraper_%s_sum%s %s' % (name, self._labels(h['labels']), h['sum']))
+                lines.append('scraper_%s_count%s %d' % (name, self._labels(h['labels']), h['count']))
+        lines.append('# TYPE scraper_papers_per_second gauge')
+        lines.append('scraper_papers_per_second%s %s' % (self._labels({}), report['papers_per_second']))
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, path):
+        # Prometheus text for a .prom or .txt path, json otherwise
+        with open(path, 'w') as f:
+            if path.endswith('.prom') or path.endswith('.txt'):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.report(), f, indent=2)
+
+    def progress(self):
+        # one line summary of the run so far
+        elapsed = time.time() - self.start
+        papers = self.total('papers')
+        rate = papers / elapsed if elapsed > 0 else 0.
+        return ('[%s] %7.1f s  days %d  papers %d (%.2f/s)  requests %d  retries %d  errors %d  cache hits %d  '
+                '%.1f MB') % (self.source, elapsed, self.total('days'), papers, rate, self.total('requests'),
+                              self.total('retries'), self.total('errors'), self.total('cache_hits'),
+                              self.total('bytes') / 1e6)
+
+    def _labels(self, labels, **extra):
+        labels = dict(labels, source=self.source, **extra)
+        return '{%s}' % ','.join('%s="%s"' % (key, value) for key, value in sorted(labels.items()))
+
+    # locks cannot be pickled - copies sent to worker processes record into their own metrics
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class ProgressReporter:
+    """
+    Background thread that writes the progress line of a run every `interval` seconds.
+
+    Inputs:
+        - metrics: Metrics, the run's metrics
+        - interval: float, seconds between two lines
+        - stream: file, where the lines are written. Default: stderr
+
+    """
+    def __init__(self, metrics, interval, stream=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream if stream is not None else sys.stderr
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stream.write(self.metrics.progress() + '\n')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.stream.write(self.metrics.progress() + '\n')
+            self.stream.flush()
+
+
+class Profiler:
+    """
+    Opt-in cProfile and tracemalloc profiling of a run.
+
+    cProfile records the thread that drives the run (listing pages, parsing and saving, and the sequential fetch
+    mode). Worker threads and processes are not profiled, but their stages show up in the Metrics timers.
+    tracemalloc traces the allocations of every thread.
+
+    Outputs, next to `path`:
+        - <path>.prof: cProfile stats, e.g. for `python -m pstats` or snakeviz
+        - <path>.txt: the most expensive functions by cumulative time and the top allocation sites
+
+    Inputs:
+        - path: string, path prefix of the output files
+        - top: int, number of functions and allocation sites listed in the text summary
+
+    """
+    def __init__(self, path, top=30):
+        self.path = path
+        self.top = top
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        tracemalloc.start()
+        self._profile.enable()
+        return self
+
+    def stop(self):
+        self._profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self._profile.dump_stats(self.path + '.prof')
+        with open(self.path + '.txt', 'w') as f:
+            stats = pstats.Stats(self._profile, stream=f)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            f.write('memory: current %.1f MiB, peak %.1f MiB\n' % (current / 2. ** 20, peak / 2. ** 20))
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                f.write('%s\n' % stat)
+
+
+@contextmanager
+def instrument(metrics, report_path=None, progress_interval=None, profile_path=None):
+    # progress lines, profiling and the final report around a run, each only when asked for
+    reporter = ProgressReporter(metrics, progress_interval).start() if progress_interval else None
+    profiler = Profiler(profile_path).start() if profile_path else None
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        if reporter is not None:
+            reporter.stop()
+        if report_path:
+            metrics.write_report(report_path)
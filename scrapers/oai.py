@@ -0,0 +1,76 @@
+from lxml import etree
+from .parsers import clean_abstract
+from .transport import Transport
+
+
+OAI_NS = {'oai': 'http://www.openarchives.org/OAI/2.0/',
+          'raw': 'http://arxiv.org/OAI/arXivRaw/'}
+
+# archives that are OAI sets on their own - every other archive is a subset of "physics"
+TOP_LEVEL_SETS = ('cs', 'econ', 'eess', 'math', 'q-bio', 'q-fin', 'stat')
+
+
+class OaiMetadata:
+    """
+    Bulk paper metadata from arXiv's OAI-PMH interface, in the arXivRaw format.
+
+    One ListRecords response carries hundreds of papers with their abstract and full version history (date and
+    size of every version), which is everything ArxivScraper otherwise reads from one abstract page per paper.
+    Records are harvested once per run for a date window and looked up by arXiv identifier.
+
+    Inputs:
+        - archive: string, archive type, e.g. "quant-ph"
+        - transport: Transport, HTTP transport. A new one is created when omitted
+        - url: string, OAI-PMH endpoint
+        - oai_set: string, optional. OAI set to harvest. Derived from archive when omitted, e.g. "physics:quant-ph"
+
+    """
+    def __init__(self, archive, transport=None, url='https://export.arxiv.org/oai2', oai_set=None):
+        self.archive = archive
+        self.transport = transport if transport is not None else Transport()
+        self.url = url
+        if oai_set is None:
+            oai_set = archive if archive in TOP_LEVEL_SETS else 'physics:' + archive
+        self.oai_set = oai_set
+        self.records = {}
+
+    def harvest(self, date_from, date_until):
+        # fetch every record of the set modified within [date_from, date_until] (YYYY-MM-DD strings)
+        url = '%s?verb=ListRecords&metadataPrefix=arXivRaw&set=%s&from=%s&until=%s' % (
+            self.url, self.oai_set, date_from, date_until)
+        num_requests = 0
+        while url is not None:
+            root = etree.fromstring(self.transport.get(url).content)
+            num_requests += 1
+            for record in root.iterfind('.//oai:record', OAI_NS):
+                raw = record.find('.//raw:arXivRaw', OAI_NS)
+                if raw is not None:
+                    self._add(raw)
+
+            # large result sets are split into pages linked by a resumption token
+            token = root.find('.//oai:resumptionToken', OAI_NS)
+            if token is not None and token.text:
+                url = '%s?verb=ListRecords&resumptionToken=%s' % (self.url, token.text)
+            else:
+                url = None
+        return num_requests
+
+    def get(self, arxiv_id):
+        # abstract, num_versions and latest_submit of a paper, the same fields the abstract-page parsers return
+        return self.records.get(arxiv_id)
+
+    def _add(self, raw):
+        arxiv_id = raw.findtext('raw:id', namespaces=OAI_NS)
+        versions = raw.findall('raw:version', OAI_NS)
+        if arxiv_id is None or len(versions) == 0:
+            return
+        latest = versions[-1]
+        abstract = raw.findtext('raw:abstract', default='', namespaces=OAI_NS)
+        self.records[arxiv_id] = {
+            'abstract': clean_abstract(abstract),
+            'num_versions': len(versions),
+            # same layout as the last line of the abstract page's submission history, e.g.
+            # "Tue, 13 Mar 2018 12:34:56 GMT (123kb)"
+            'latest_submit': '%s (%s)' % (latest.findtext('raw:date', namespaces=OAI_NS),
+                                          latest.findtext('raw:size', namespaces=OAI_NS))
+        }
@@ -0,0 +1,249 @@
+import re
+import numpy as np
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+
+# new-style (1803.04567) and old-style (quant-ph/0701001) identifiers, with an optional version suffix
+ARXIV_ID_PATTERN = re.compile(r'(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v(\d+))?')
+
+
+def parse_arxiv_id(link):
+    # canonical arXiv identifier and version (None when the link has none) of an abstract link,
+    # e.g. "/abs/1803.04567v2" -> ("1803.04567", 2)
+    match = ARXIV_ID_PATTERN.search(link)
+    if match is None:
+        return None, None
+    version = match.group(2)
+    return match.group(1), int(version) if version is not None else None
+
+
+def clean_abstract(text):
+    # abstract on one line with single spaces, without the "Abstract:" descriptor of the abstract page. Line breaks
+    # become spaces, so that words at the ends of lines are not glued together
+    text = ' '.join(text.split())
+    return text[len('Abstract:'):].lstrip() if text.startswith('Abstract:') else text
+
+
+def listed_again(identifier):
+    # whether the identifier line of a listing entry marks it as replaced or cross-listed, e.g.
+    # "arXiv:1803.04567 (replaced) [pdf]" or "arXiv:1803.04567 (cross-list from cs.IT) [pdf, other]"
+    return '(replaced' in identifier or '(cross-list' in identifier
+
+
+class SoupParser:
+    """
+    Html parser backend built on full BeautifulSoup trees. This is the reference implementation.
+
+    Every backend takes and returns the same things: `load` turns html into a document, and the other methods
+    extract plain Python values (strings, ints, lists and dicts) from a document, so the scrapers never touch the
+    underlying tree.
+
+    Inputs:
+        - release: bool, whether documents are freed as soon as their values are extracted (`release`, and the
+          abstract pages parsed by `arxiv_abstract`). BeautifulSoup trees are full of reference cycles, so without
+          it they stay in memory until the garbage collector runs
+
+    """
+    name = 'soup'
+
+    def __init__(self, release=False):
+        self.release_docs = release
+
+    def load(self, html):
+        return BeautifulSoup(html, 'lxml')
+
+    def release(self, doc):
+        # free a document whose values have all been extracted. No-op unless release is set
+        if self.release_docs:
+            # decomposing a document does not reach its elements, so its top-level elements are decomposed first
+            for element in list(doc.contents):
+                element.decompose()
+            doc.decompose()
+
+    # Arxiv catchup pages
+    def arxiv_days(self, doc):
+        # (date, day section) for each date header of the page
+        days = []
+        for h2 in doc.find_all('h2'):
+            date = h2.find('a').get_attribute_list('name')[0]
+            days.append((date, h2.find_next_siblings()[0]))
+        return days
+
+    def arxiv_entries(self, section):
+        # title, authors, abstract href and listing order of the papers in a day section
+        ident_list = section.find_all('dt')
+        meta_list = section.find_all('dd')
+
+        ident_info = [item.find('span', class_='list-identifier') for item in ident_list]
+        indices = [i for i, m in enumerate(ident_info) if not listed_again(m.text)]
+
+        entries = []
+        for i in indices:
+            meta = meta_list[i]
+            title = meta.find('div', class_='list-title mathjax').text.split('\nTitle: ')[1].split('\n')[0]
+            author_list = np.array(meta.find('div', class_='list-authors').text.split('\n'))[2:-1]
+            authors = []
+            for author in author_list:
+                authors.append(author.split(',')[0])
+            paper_href = ident_info[i].find('a', title='Abstract').get_attribute_list('href')[0]
+            entries.append({'title': title,
+                            'authors': authors,
+                            'href': paper_href,
+                            'order': i})
+        return entries
+
+    def arxiv_next_href(self, doc):
+        next_page = doc.find_all('li')[-1]
+        return next_page.find('a').get_attribute_list('href')[0]
+
+    # Arxiv abstract pages
+    def arxiv_abstract(self, html, abstract=True):
+        # abstract text, number of versions and the latest line of the submission history
+        doc = self.load(html)
+        text = ''
+        if abstract:
+            text = clean_abstract(doc.find('blockquote').text)
+        fields = {'abstract': text,
+                  'num_versions': len(doc.find_all('b')),
+                  'latest_submit': doc.find('div', class_='submission-history').text.split('\n')[-2]}
+        self.release(doc)
+        return fields
+
+    # Scirate day pages
+    def scirate_papers(self, doc):
+        papers = []
+        paper_list = doc.find_all('li', class_='paper tex2jax')
+
+        for i, paper in enumerate(paper_list):
+            title = paper.find('div', class_='title').text
+            author_list = paper.find('div', class_='authors').text.split(', ')
+            authors = []
+            for author in author_list:
+                authors.append(author.strip())
+
+            scite_count = int(paper.find('button', class_='btn btn-default count').text)
+            arxiv_id, _ = parse_arxiv_id(paper.find('div', class_='title').find('a').get_attribute_list('href')[0])
+
+            paper_info = {
+                'title': title,
+                'authors': authors,
+                'rank': i,
+                'scite_count': scite_count,
+                'arxiv_id': arxiv_id
+            }
+            papers.append(paper_info)
+
+        return papers
+
+    def scirate_next_href(self, doc):
+        nextday = doc.find('td', class_='btn-default half top right').find('a')
+        return nextday.get_attribute_list('href')[0]
+
+
+class LxmlParser:
+    """
+    Fast html parser backend using lxml trees and XPath.
+
+    It skips BeautifulSoup's tree building and selects only the nodes it needs with compiled XPath expressions.
+    The extracted values are identical to SoupParser's. String results are plain `str`: lxml's default "smart"
+    strings keep a reference to their element, and with it to the whole tree of the page.
+
+    Inputs:
+        - release: bool, whether `release` clears documents once their values are extracted
+
+    """
+    name = 'lxml'
+
+    _days = etree.XPath('//h2')
+    _day_name = etree.XPath('string(.//a/@name)', smart_strings=False)
+    _dt = etree.XPath('.//dt')
+    _dd = etree.XPath('.//dd')
+    _identifier = etree.XPath('.//span[@class="list-identifier"]')
+    _abstract_href = etree.XPath('string(.//a[@title="Abstract"]/@href)', smart_strings=False)
+    _title = etree.XPath('.//div[@class="list-title mathjax"]')
+    _authors = etree.XPath('.//div[@class="list-authors"]')
+    _last_li_href = etree.XPath('string((//li)[last()]//a/@href)', smart_strings=False)
+
+    _scirate_papers = etree.XPath('//li[@class="paper tex2jax"]')
+    _scirate_title = etree.XPath('.//div[@class="title"]')
+    _scirate_authors = etree.XPath('.//div[@class="authors"]')
+    _scirate_count = etree.XPath('.//button[@class="btn btn-default count"]')
+    _scirate_href = etree.XPath('string(.//div[@class="title"]//a/@href)', smart_strings=False)
+    _scirate_next = etree.XPath('string((//td[@class="btn-default half top right"])[1]//a/@href)',
+                                smart_strings=False)
+
+    def __init__(self, release=False):
+        self.release_docs = release
+
+    def load(self, html):
+        return lxml.html.fromstring(html)
+
+    def release(self, doc):
+        # drop the content of a document whose values have all been extracted. No-op unless release is set
+        if self.release_docs:
+            doc.clear()
+
+    # Arxiv catchup pages
+    def arxiv_days(self, doc):
+        return [(self._day_name(h2), h2.getnext()) for h2 in self._days(doc)]
+
+    def arxiv_entries(self, section):
+        ident_info = [self._identifier(item)[0] for item in self._dt(section)]
+        meta_list = self._dd(section)
+
+        entries = []
+        for i, identifier in enumerate(ident_info):
+            if listed_again(identifier.text_content()):
+                continue
+            meta = meta_list[i]
+            title = self._title(meta)[0].text_content().split('\nTitle: ')[1].split('\n')[0]
+            authors = [author.split(',')[0] for author in self._authors(meta)[0].text_content().split('\n')[2:-1]]
+            entries.append({'title': title,
+                            'authors': authors,
+                            'href': self._abstract_href(identifier),
+                            'order': i})
+        return entries
+
+    def arxiv_next_href(self, doc):
+        return self._last_li_href(doc)
+
+    # Arxiv abstract pages
+    def arxiv_abstract(self, html, abstract=True):
+        # abstract pages are parsed on worker threads, which must not share compiled XPath evaluators
+        doc = self.load(html)
+        text = ''
+        if abstract:
+            text = clean_abstract(doc.xpath('//blockquote')[0].text_content())
+        return {'abstract': text,
+                'num_versions': int(doc.xpath('count(//b)')),
+                'latest_submit': doc.xpath('//div[@class="submission-history"]')[0].text_content().split('\n')[-2]}
+
+    # Scirate day pages
+    def scirate_papers(self, doc):
+        papers = []
+        for i, paper in enumerate(self._scirate_papers(doc)):
+            papers.append({
+                'title': str(self._scirate_title(paper)[0].text_content()),
+                'authors': [a.strip() for a in self._scirate_authors(paper)[0].text_content().split(', ')],
+                'rank': i,
+                'scite_count': int(self._scirate_count(paper)[0].text_content()),
+                'arxiv_id': parse_arxiv_id(self._scirate_href(paper))[0]
+            })
+        return papers
+
+    def scirate_next_href(self, doc):
+        return self._scirate_next(doc)
+
+
+PARSERS = {
+    'soup': SoupParser,
+    'lxml': LxmlParser
+}
+
+
+def get_parser(name, release=False):
+    if name not in PARSERS:
+        raise ValueError('Unknown parser "%s". Choose from: %s' % (name, ', '.join(sorted(PARSERS))))
+    return PARSERS[name](release)
@@ -0,0 +1,114 @@
+import time
+import asyncio
+import sqlite3
+import threading
+from contextlib import closing
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every request a scraper sends.
+
+    Each request takes one token. Tokens refill at `rate` per second up to `capacity`, so short bursts are allowed
+    but the long-run request rate never exceeds `rate`. Callers that find the bucket empty reserve the next free slot
+    and wait for it, which keeps concurrent callers in arrival order.
+
+    Inputs:
+        - rate: float, number of requests allowed per second. None or a non-positive value disables limiting
+        - capacity: int, maximum number of requests that can be sent in a burst
+
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # block the calling thread until a token is available
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        # same as `acquire`, but yields to the event loop while waiting
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _reserve(self):
+        # take one token and return how many seconds the caller has to wait for it
+        if not self.rate or self.rate <= 0:
+            return 0.
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.
+            return -self._tokens / self.rate
+
+    # locks cannot be pickled - a copy sent to another process gets its own, independent bucket
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class SharedRateLimiter:
+    """
+    Per-host rate limiter shared by every process, and every machine, that opens the same SQLite file.
+
+    The file holds the next free request slot of each host. A caller reserves a slot in a write transaction, which
+    SQLite serializes across processes, and sleeps until it. Every host therefore sees at most `rate` requests per
+    second from all the workers together, however many there are. Across machines the file has to be on a shared
+    filesystem with working locks, and the machines' clocks have to agree.
+
+    Inputs:
+        - path: string, path of the SQLite file. Created when missing
+        - rates: dict, requests per second allowed for each host, e.g. {"arxiv.org": 4}. A key matches the host
+          with or without its port
+        - default_rate: float, optional. Requests per second for the other hosts. None means no limit
+
+    """
+    def __init__(self, path, rates=None, default_rate=None):
+        self.path = path
+        self.rates = dict(rates) if rates is not None else {}
+        self.default_rate = default_rate
+        with closing(self._connect()) as db:
+            db.execute('CREATE TABLE IF NOT EXISTS rate_slots (host TEXT PRIMARY KEY, next REAL)')
+
+    def acquire(self, host):
+        # block the calling thread until the next request slot of the host
+        wait = self._reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+
+    def rate(self, host):
+        if host in self.rates:
+            return self.rates[host]
+        return self.rates.get(host.split(':')[0], self.default_rate)
+
+    def _reserve(self, host):
+        rate = self.rate(host)
+        if not rate or rate <= 0:
+            return 0.
+
+        with closing(self._connect()) as db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute('SELECT next FROM rate_slots WHERE host = ?', (host,)).fetchone()
+            now = time.time()
+            slot = now if row is None else max(now, row[0])
+            db.execute('INSERT OR REPLACE INTO rate_slots (host, next) VALUES (?, ?)', (host, slot + 1. / rate))
+            db.execute('COMMIT')
+        return slot - now
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60., isolation_level=None)
@@ -0,0 +1,280 @@
+import re
+import numpy as np
+from .store import StringColumn
+from .common import WEEKDAYS, SIZE_UNITS
+
+
+# fields of the scraped records stored in an integer encoding instead of their string form
+ENCODED_FIELDS = {'submit_weekday': 'weekday', 'submit_time': 'time', 'size': 'size', 'authors': 'names'}
+
+_SIZE_PATTERN = re.compile(r'^(\d+)([kmg])b$')
+_TIME_PATTERN = re.compile(r'^(\d{2}):(\d{2}):(\d{2})$')
+
+
+class AuthorNames:
+    # exact author names interned to integer ids, shared by all the days of a run. Unlike scrapers.authors, names are
+    # not normalized, so every name converts back to the same string
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, names):
+        ids = []
+        for name in names:
+            i = self.ids.get(name)
+            if i is None:
+                i = self.ids[name] = len(self.names)
+                self.names.append(name)
+            ids.append(i)
+        return ids
+
+
+def encode_weekdays(values):
+    # "Mon".."Sun" -> 0..6, "none" -> -1
+    codes = dict((day, i) for i, day in enumerate(WEEKDAYS))
+    codes['none'] = -1
+    return np.array([codes.get(value, -2) for value in values], dtype=np.int8)
+
+
+def decode_weekdays(codes):
+    return [WEEKDAYS[code] if code >= 0 else 'none' for code in codes.tolist()]
+
+
+def encode_times(values):
+    # "HH:MM:SS" -> seconds of the day, "none" -> -1
+    seconds = np.full(len(values), -2, dtype=np.int32)
+    for i, value in enumerate(values):
+        match = _TIME_PATTERN.match(value) if isinstance(value, str) else None
+        if match is not None:
+            hours, minutes, secs = match.groups()
+            seconds[i] = int(hours) * 3600 + int(minutes) * 60 + int(secs)
+        elif value == 'none':
+            seconds[i] = -1
+    return seconds
+
+
+def decode_times(seconds):
+    return ['%02d:%02d:%02d' % (s // 3600, s // 60 % 60, s % 60) if s >= 0 else 'none' for s in seconds.tolist()]
+
+
+def encode_sizes(values):
+    # "123kb" -> (size in bytes, unit index). The unit is kept, so that "2048kb" does not come back as "2mb"
+    size = np.full(len(values), -1, dtype=np.int64)
+    unit = np.full(len(values), -1, dtype=np.int8)
+    for i, value in enumerate(values):
+        match = _SIZE_PATTERN.match(value) if isinstance(value, str) else None
+        if match is not None:
+            unit[i] = SIZE_UNITS.index(match.group(2))
+            size[i] = int(match.group(1)) * 1024 ** (int(unit[i]) + 1)
+    return size, unit
+
+
+def decode_sizes(size, unit):
+    return ['%d%sb' % (s // 1024 ** (u + 1), SIZE_UNITS[u]) for s, u in zip(size.tolist(), unit.tolist())]
+
+
+class DayRecords:
+    """
+    The papers of one scraped day as a struct of arrays: one NumPy array or utf-8 buffer per field instead of a dict
+    per paper.
+
+    Weekdays, submit times and sizes are stored as integers (weekday 0-6, seconds of the day, size in bytes), author
+    lists as ids into an AuthorNames table shared by the days of a run, numbers as NumPy arrays and strings as one
+    StringColumn per field. A field whose values do not all convert back to the same strings (e.g. an unexpected size
+    format) keeps its string form, so `to_dict` always returns the records `from_dict` was given, keys in the same
+    order. `days[i]` is a PaperRecord view of one paper.
+
+    For code written against the dict layout, `res['date']` and `res['papers']` work as well; the latter builds the
+    paper dicts on every call.
+
+    Inputs:
+        - date: string, e.g. "day_2018_03_13"
+        - num_papers: int
+        - fields: list, field names of every paper, in order
+        - columns: dict, encoded column(s) of every field (see `from_dict`)
+        - names: AuthorNames, table of the author ids
+
+    """
+    def __init__(self, date, num_papers, fields, columns, names):
+        self.date = date
+        self.num_papers = num_papers
+        self.fields = fields
+        self.columns = columns
+        self.names = names
+
+    @classmethod
+    def from_dict(cls, res, names=None):
+        """
+        Encode a scraped day of either scraper.
+
+        Inputs:
+            - res: dict, {'date', 'papers'} with the same keys in every paper
+            - names: AuthorNames, optional. Shared author table; a new one when omitted
+
+        Outputs:
+            - records: DayRecords
+        """
+        names = names if names is not None else AuthorNames()
+        papers = res['papers']
+        fields = list(papers[0]) if len(papers) > 0 else []
+        for paper in papers:
+            if list(paper) != fields:
+                raise ValueError('Papers of %s have different fields.' % res['date'])
+        columns = dict((field, _encode(field, [paper[field] for paper in papers], names)) for field in fields)
+        return cls(res['date'], len(papers), fields, columns, names)
+
+    def to_dict(self):
+        # the day in the scrapers' dict layout, equal to the one it was built from
+        values = [self.column(field) for field in self.fields]
+        return {'date': self.date, 'papers': [dict(zip(self.fields, row)) for row in zip(*values)]}
+
+    def column(self, field):
+        # every value of a field, decoded to its dict form
+        kind, data = self.columns[field]
+        if kind == 'weekday':
+            return decode_weekdays(data)
+        if kind == 'time':
+            return decode_times(data)
+        if kind == 'size':
+            return decode_sizes(*data)
+        if kind == 'names':
+            ids, offsets = data
+            names = [self.names.names[i] for i in ids.tolist()]
+            offsets = offsets.tolist()
+            return [names[offsets[i]:offsets[i + 1]] for i in range(self.num_papers)]
+        if kind == 'str':
+            strings, null = data
+            values = strings.to_list()
+            return values if null is None else [None if n else s for s, n in zip(values, null.tolist())]
+        if kind == 'object':
+            return list(data)
+        return data.tolist()
+
+    def value(self, field, row):
+        # the value of a field for one paper, in its dict form
+        kind, data = self.columns[field]
+        if kind == 'names':
+            ids, offsets = data
+            return [self.names.names[i] for i in ids[offsets[row]:offsets[row + 1]].tolist()]
+        if kind == 'str':
+            strings, null = data
+            return None if null is not None and null[row] else strings[row]
+        if kind == 'size':
+            return decode_sizes(data[0][row:row + 1], data[1][row:row + 1])[0]
+        if kind == 'weekday':
+            return decode_weekdays(data[row:row + 1])[0]
+        if kind == 'time':
+            return decode_times(data[row:row + 1])[0]
+        if kind == 'object':
+            return data[row]
+        return data[row].item()
+
+    def array(self, field):
+        # the integer encoding of a field: weekday, seconds of the day or size in bytes (-1 when missing), author ids
+        # and their row offsets, or the NumPy array of a numeric field
+        kind, data = self.columns[field]
+        if kind in ['str', 'object']:
+            raise ValueError('Field %s is not stored as numbers.' % field)
+        return data[0] if kind == 'size' else data
+
+    def nbytes(self):
+        # bytes held by the columns, not counting the shared author table
+        total = 0
+        for kind, data in self.columns.values():
+            if kind == 'str':
+                strings, null = data
+                total += strings.data.nbytes + strings.offsets.nbytes + (null.nbytes if null is not None else 0)
+            elif kind == 'object':
+                total += sum(len(str(value)) for value in data)
+            elif isinstance(data, tuple):
+                total += sum(array.nbytes for array in data)
+            else:
+                total += data.nbytes
+        return total
+
+    def __len__(self):
+        return self.num_papers
+
+    def __iter__(self):
+        return (PaperRecord(self, row) for row in range(self.num_papers))
+
+    def __getitem__(self, key):
+        if key == 'date':
+            return self.date
+        if key == 'papers':
+            return self.to_dict()['papers']
+        if isinstance(key, str):
+            raise KeyError(key)
+        if not -self.num_papers <= key < self.num_papers:
+            raise IndexError(key)
+        return PaperRecord(self, key % self.num_papers)
+
+    def __eq__(self, other):
+        if isinstance(other, DayRecords):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+
+class PaperRecord:
+    # one paper of a DayRecords, fields read as attributes, e.g. `days[0].title`. Only holds its day and row
+    __slots__ = ('day', 'row')
+
+    def __init__(self, day, row):
+        self.day = day
+        self.row = row
+
+    def __getattr__(self, field):
+        if field not in self.day.columns:
+            raise AttributeError(field)
+        return self.day.value(field, self.row)
+
+    def to_dict(self):
+        return dict((field, self.day.value(field, self.row)) for field in self.day.fields)
+
+    def __repr__(self):
+        return 'PaperRecord(%r)' % self.to_dict()
+
+
+def as_dict(res):
+    # a scraped day in the dict layout, whether it is a dict or a DayRecords
+    return res.to_dict() if isinstance(res, DayRecords) else res
+
+
+# helper functions
+def _encode(field, values, names):
+    # (kind, data) of the values of a field, checked to decode to the same values
+    kind = ENCODED_FIELDS.get(field)
+    if kind == 'weekday':
+        data = encode_weekdays(values)
+        if decode_weekdays(data) == values:
+            return kind, data
+    elif kind == 'time':
+        data = encode_times(values)
+        if decode_times(data) == values:
+            return kind, data
+    elif kind == 'size':
+        data = encode_sizes(values)
+        if (data[1] >= 0).all() and decode_sizes(*data) == values:
+            return kind, data
+    elif kind == 'names' and all(isinstance(value, list) and all(isinstance(name, str) for name in value)
+                                 for value in values):
+        offsets = np.zeros(len(values) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum([len(value) for value in values])
+        return kind, (np.array(names.intern([name for value in values for name in value]), dtype=np.int32),
+                      offsets)
+
+    if all(isinstance(value, bool) for value in values):
+        return 'bool', np.array(values, dtype=bool)
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        small = len(values) == 0 or -2 ** 31 <= min(values) and max(values) < 2 ** 31
+        return 'int', np.array(values, dtype=np.int32 if small else np.int64)
+    if all(isinstance(value, float) for value in values):
+        return 'float', np.array(values, dtype=np.float64)
+    if all(value is None or isinstance(value, str) for value in values):
+        null = np.array([value is None for value in values], dtype=bool)
+        strings = StringColumn.from_list([value if value is not None else '' for value in values])
+        return 'str', (strings, null if null.any() else None)
+    return 'object', list(values)
@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import datetime
+import multiprocessing
+from contextlib import closing
+from .arxivscraper import ArxivScraper
+from .sciratescraper import ScirateScraper
+from .transport import Transport
+from .ratelimit import SharedRateLimiter
+
+
+SCRAPERS = {
+    'arxiv': ArxivScraper,
+    'scirate': ScirateScraper
+}
+
+
+def make_units(sources, archives, start, end, shard_days=7):
+    # (source, archive, date_from, date_until) work units covering [start, end], with YYYY-MM-DD dates. Sources and
+    # archives are interleaved within each shard, so that workers scrape Arxiv and Scirate at the same time
+    units = []
+    date_from = datetime.date(**start)
+    date_end = datetime.date(**end)
+    while date_from <= date_end:
+        date_until = min(date_end, date_from + datetime.timedelta(days=shard_days - 1))
+        for archive in archives:
+            for source in sources:
+                units.append((source, archive, date_from.isoformat(), date_until.isoformat()))
+        date_from = date_until + datetime.timedelta(days=1)
+    return units
+
+
+class WorkQueue:
+    """
+    Work queue of scraping units in a SQLite file, shared by worker processes on one or several machines.
+
+    A unit is claimed in a write transaction, so two workers never get the same one. A unit whose worker died is
+    claimed again once its lease has expired, and a failed unit goes back to the queue until it has been tried
+    `max_attempts` times. Units that used up their attempts, including abandoned ones, end up failed.
+
+    Inputs:
+        - path: string, path of the SQLite file. Created when missing
+        - lease: float, seconds after which a running unit is considered abandoned
+        - max_attempts: int, number of times a unit is tried before it is marked failed
+
+    """
+    def __init__(self, path, lease=3600., max_attempts=3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute('CREATE TABLE IF NOT EXISTS units ('
+                       'id INTEGER PRIMARY KEY, source TEXT, archive TEXT, date_from TEXT, date_until TEXT, '
+                       "state TEXT DEFAULT 'pending', worker TEXT, attempts INTEGER DEFAULT 0, claimed REAL, "
+                       'error TEXT, UNIQUE (source, archive, date_from, date_until))')
+
+    def add(self, units):
+        # enqueue (source, archive, date_from, date_until) units. Units already in the queue are left as they are
+        with closing(self._connect()) as db:
+            db.execute('BEGIN IMMEDIATE')
+            before = db.execute('SELECT COUNT(*) FROM units').fetchone()[0]
+            db.executemany('INSERT OR IGNORE INTO units (source, archive, date_from, date_until) VALUES (?, ?, ?, ?)',
+                           units)
+            after = db.execute('SELECT COUNT(*) FROM units').fetchone()[0]
+            db.execute('COMMIT')
+        return after - before
+
+    def claim(self, worker):
+        # the next pending (or abandoned) unit as a dict, marked running for the worker. None when nothing is left
+        with closing(self._connect()) as db:
+            db.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            # abandoned units without attempts left would otherwise stay running forever
+            db.execute("UPDATE units SET state = 'failed', error = COALESCE(error, 'lease expired') "
+                       "WHERE state = 'running' AND claimed < ? AND attempts >= ?",
+                       (now - self.lease, self.max_attempts))
+            row = db.execute('SELECT id, source, archive, date_from, date_until FROM units '
+                             "WHERE state = 'pending' OR (state = 'running' AND claimed < ? AND attempts < ?) "
+                             'ORDER BY id LIMIT 1', (now - self.lease, self.max_attempts)).fetchone()
+            if row is not None:
+                db.execute("UPDATE units SET state = 'running', worker = ?, claimed = ?, attempts = attempts + 1 "
+                           'WHERE id = ?', (worker, now, row[0]))
+            db.execute('COMMIT')
+        if row is None:
+            return None
+        return dict(zip(['id', 'source', 'archive', 'date_from', 'date_until'], row))
+
+    def complete(self, unit_id):
+        with closing(self._connect()) as db:
+            db.execute("UPDATE units SET state = 'done', error = NULL WHERE id = ?", (unit_id,))
+
+    def fail(self, unit_id, error):
+        # back to the queue, unless the unit has used up its attempts
+        with closing(self._connect()) as db:
+            db.execute("UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                       'error = ? WHERE id = ?', (self.max_attempts, error, unit_id))
+
+    def failures(self):
+        # failed units as dicts, with their number of attempts and last error
+        with closing(self._connect()) as db:
+            rows = db.execute('SELECT source, archive, date_from, date_until, attempts, error FROM units '
+                              "WHERE state = 'failed' ORDER BY id").fetchall()
+        return [dict(zip(['source', 'archive', 'date_from', 'date_until', 'attempts', 'error'], row)) for row in rows]
+
+    def counts(self):
+        # number of units per state
+        with closing(self._connect()) as db:
+            return dict(db.execute('SELECT state, COUNT(*) FROM units GROUP BY state').fetchall())
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60., isolation_level=None)
+
+
+def unit_params(unit, params):
+    # scraper params of a work unit: the source's params for the unit's archive and dates, saved day by day
+    source_params = dict(params['sources'][unit['source']])
+    if source_params.get('fetch_mode', 'joblib' if source_params.get('parallel') else None) == 'joblib':
+        # a joblib pool in every worker process would multiply the processes hitting the site, out of reach of the
+        # shared rate limiter. Threads of the worker go through its transport and the limiter instead
+        source_params.update({'parallel': False, 'fetch_mode': 'threads'})
+    save_dir = source_params['save_dir'].format(archive=unit['archive'])
+    date_from = datetime.date(*map(int, unit['date_from'].split('-')))
+    date_until = datetime.date(*map(int, unit['date_until'].split('-')))
+    source_params.update({
+        'archive': unit['archive'],
+        'start': {'year': date_from.year, 'month': date_from.month, 'day': date_from.day},
+        'end': {'year': date_until.year, 'month': date_until.month, 'day': date_until.day},
+        'save_by_day': True,
+        'save_dir': save_dir,
+        # a unit that is tried again skips the days it already saved
+        'resume': True,
+        'checkpoint_path': os.path.join(os.path.dirname(params['queue_path']), 'checkpoints', '%s_%s_%s_%s.json' % (
+            unit['source'], unit['archive'], unit['date_from'], unit['date_until']))
+    })
+    return source_params
+
+
+def run_worker(params, worker=None):
+    """
+    Claim and scrape work units from the queue until it is empty.
+
+    Inputs:
+        - params: dict, scheduler params (see Scheduler)
+        - worker: string, optional. Name of the worker in the queue. Default: "<hostname>:<pid>"
+
+    Outputs:
+        - num_units: int, number of units completed by this worker
+    """
+    if worker is None:
+        worker = '%s:%d' % (socket.gethostname(), os.getpid())
+    queue = WorkQueue(params['queue_path'], params.get('lease', 3600.), params.get('max_attempts', 3))
+    rate_limiter = SharedRateLimiter(params['queue_path'], params.get('rate_limits'), params.get('default_rate_limit'))
+
+    # one connection pool per source for all the units of this worker
+    transports = {}
+    num_units = 0
+    try:
+        while True:
+            unit = queue.claim(worker)
+            if unit is None:
+                break
+            if unit['source'] not in transports:
+                transports[unit['source']] = Transport.from_params(params['sources'][unit['source']], rate_limiter)
+            try:
+                scraper_params = unit_params(unit, params)
+                os.makedirs(scraper_params['save_dir'], exist_ok=True)
+                os.makedirs(os.path.dirname(scraper_params['checkpoint_path']), exist_ok=True)
+                scraper = SCRAPERS[unit['source']](scraper_params, transports[unit['source']])
+                scraper.start_scraping()
+            except Exception as e:
+                queue.fail(unit['id'], repr(e))
+                continue
+            queue.complete(unit['id'])
+            num_units += 1
+    finally:
+        for transport in transports.values():
+            transport.close()
+    return num_units
+
+
+class Scheduler:
+    """
+    Sharded scraping of several archives and sources over a date range.
+
+    The range is split into shards of `shard_days` days, and every (source, archive, shard) becomes a unit of a
+    WorkQueue in a SQLite file. `run` starts a pool of worker processes that take units from the queue until it is
+    empty; Arxiv and Scirate units are interleaved, so both sites are scraped at the same time. More machines can
+    join by running workers on the same queue file (`python -m scrapers.scheduler <config> work`). Requests to each
+    host are limited across all the workers by a SharedRateLimiter in the same file.
+
+    Inputs:
+        - params: dict, specifies scheduling options. Keys are:
+            - sources: dict, scraper params of each source to scrape, e.g. {"arxiv": {...}, "scirate": {...}}, as
+              in the arxiv and scirate configs. Their archive, start, end and save_by_day are set per unit. With
+              several archives, a json save_dir must contain "{archive}", e.g. "./data/arxiv/{archive}/", since day
+              files are not named by archive. The joblib fetch mode (`parallel: true`) is replaced by threads inside
+              the workers, which are already separate processes
+            - archives: list, archive types, e.g. ["quant-ph", "cs.LG"]
+            - start: dict, contains starting date for search. Keys are: day, month, year
+            - end: dict, contains end date for search. Keys are: day, month, year
+            - queue_path: string, path of the SQLite file of the work queue and the rate limiter. The checkpoints of
+              the units are kept next to it
+            - shard_days: int, optional. Number of days per work unit. Default: 7
+            - num_workers: int, optional. Number of worker processes on this machine. Default: 4
+            - rate_limits: dict, optional. Requests per second allowed per host for all workers together
+            - default_rate_limit: float, optional. Requests per second for the other hosts. Default: no limit
+            - lease: float, optional. Seconds after which a unit of a dead worker is claimed again. Default: 3600
+            - max_attempts: int, optional. Number of times a failing unit is tried. Default: 3
+
+    """
+    def __init__(self, params):
+        for source, source_params in params['sources'].items():
+            if (len(params['archives']) > 1 and source_params.get('save_format', 'json') == 'json' and
+                    '{archive}' not in source_params['save_dir']):
+                raise ValueError('save_dir of "%s" must contain "{archive}" to scrape several archives' % source)
+            if source_params.get('author_index') and params.get('num_workers', 4) > 1:
+                raise ValueError('author_index of "%s" cannot be written by several workers. Build it from the saved '
+                                 'days instead: python -m scrapers.authors <index> <save_dir>' % source)
+            if source_params.get('dedup_index') and params.get('num_workers', 4) > 1:
+                raise ValueError('dedup_index of "%s" cannot be written by several workers. Deduplicate the saved days '
+                                 'instead: python -m scrapers.dedup <index> <archive> <save_dir>' % source)
+            if source_params.get('search_index') and params.get('num_workers', 4) > 1:
+                raise ValueError('search_index of "%s" cannot be written by several workers. Index the saved days '
+                                 'instead: python -m scrapers.search <index_dir> add <save_dir>' % source)
+            if source_params.get('scite_log') and params.get('num_workers', 4) > 1:
+                raise ValueError('scite_log of "%s" cannot be written by several workers' % source)
+        self.params = params
+        self.num_workers = params.get('num_workers', 4)
+        self.queue = WorkQueue(params['queue_path'], params.get('lease', 3600.), params.get('max_attempts', 3))
+
+    def enqueue(self):
+        # add the units of the period to the queue and return how many were new
+        units = make_units(list(self.params['sources']), self.params['archives'], self.params['start'],
+                           self.params['end'], self.params.get('shard_days', 7))
+        return self.queue.add(units)
+
+    def work(self):
+        # run the worker processes of this machine until the queue is empty
+        workers = [multiprocessing.Process(target=run_worker, args=(self.params,)) for _ in range(self.num_workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.queue.counts()
+
+    def run(self):
+        self.enqueue()
+        return self.work()
+
+    def failures(self):
+        # units that failed max_attempts times, with their last error
+        return self.queue.failures()
+
+
+def load_config(path):
+    # scheduler params from a json file. Sources given as paths are read from their own config files
+    with open(path, 'r') as f:
+        params = json.load(f)
+    for source, source_params in params['sources'].items():
+        if isinstance(source_params, str):
+            with open(source_params, 'r') as f:
+                params['sources'][source] = json.load(f)
+    return params
+
+
+if __name__ == '__main__':
+    # usage: python -m scrapers.scheduler <config> [run|enqueue|work]
+    #   run (default) enqueues the units and works on them, enqueue only fills the queue, and work only runs
+    #   workers, e.g. on other machines sharing the queue file
+    scheduler = Scheduler(load_config(sys.argv[1]))
+    command = sys.argv[2] if len(sys.argv) > 2 else 'run'
+    if command in ('run', 'enqueue'):
+        print('Enqueued %d units.' % scheduler.enqueue())
+    if command in ('run', 'work'):
+        print('Units per state: %s' % scheduler.work())
+        for unit in scheduler.failures():
+            print('Failed after %(attempts)d attempts: %(source)s %(archive)s %(date_from)s to %(date_until)s: '
+                  '%(error)s' % unit)
@@ -1,13 +1,17 @@
 import os
-import sys
-import json
 import time
 import pickle
-import requests
-from bs4 import BeautifulSoup
-
-
-sys.setrecursionlimit(100000)
+import datetime
+from .parsers import get_parser
+from .transport import Transport
+from .ratelimit import TokenBucket
+from .asyncfetch import AsyncFetcher, aiterate
+from .store import ColumnStore
+from .checkpoint import Checkpoint, write_json, saved_days, to_date, next_date
+from .metrics import Metrics, instrument
+from .authors import open_index
+from .records import AuthorNames, DayRecords, as_dict
+from .scites import SciteLog
 
 
 class ScirateScraper:
@@ -21,18 +25,97 @@ class ScirateScraper:
             - archive: string, archive type. Currently only "quant-ph" was tested
             - save_by_day: bool, whether it saves papers data day by day. If true, it saves the data in a json format
             - save_dir: string, the directory you save your data to. Only matters when save_by_day is true
+            - save_format: string, optional. "json" writes one json file per day, "columnar" appends each day to a
+              ColumnStore in save_dir. Default: "json"
+            - url_header: string, optional. Base url of Scirate. Default: "https://scirate.com"
+            - parser: string, optional. Html parser backend, "soup" (BeautifulSoup) or "lxml" (lxml and XPath).
+              Default: "soup"
+            - fetch_mode: string, optional. "chain" follows the next-day link of every page, one day after the
+              other. "direct" builds the url of every day up front and fetches them concurrently. Default: "chain"
+            - day_range: int, optional. Days per page in the direct mode (Scirate's range parameter). A page then
+              ranks the papers of its whole window and is recorded under its first day. Default: 1
+            - concurrency: int, optional. Number of pages in flight in the direct mode. Default: 8
+            - rate_limit: float, optional. Requests per second allowed in the direct mode. Default: 5
+            - timeout: float, optional. Seconds before a request attempt is abandoned. Default: 30
+            - max_retries: int, optional. Retries of a failed request (5xx, 429, timeout). Default: 3
+            - backoff_base: float, optional. Seconds before the first retry, doubled on each retry. Default: 1
+            - backoff_max: float, optional. Maximum backoff and Retry-After delay in seconds. Default: 60
+            - cache_dir: string, optional. Directory of the on-disk response cache. No cache when omitted
+            - cache_ttl: float, optional. Seconds a cached page stays fresh before it is revalidated. Default: forever
+            - cache_max_size: int, optional. Maximum size of the cache in bytes, LRU evicted. Default: no limit
+            - cache_compress: bool, optional. Whether cached pages are gzip-compressed. Default: false
+            - resume: bool, optional. Whether an interrupted run resumes from its checkpoint, skipping the days already
+              saved. Requires save_by_day. Default: false
+            - incremental: bool, optional. Whether only the days newer than the latest saved day are scraped. Requires
+              save_by_day. Default: false
+            - checkpoint_path: string, optional. Path of the checkpoint manifest. Default: "scirate_checkpoint.json"
+              in save_dir
+            - metrics_report: string, optional. Path of the report of the run's counters, stage timers and request
+              latency histograms, written at the end of the run: Prometheus text for .prom or .txt, json otherwise
+            - progress_interval: float, optional. Seconds between progress lines on stderr. Default: no progress
+            - profile_path: string, optional. Path prefix of cProfile and tracemalloc output. Default: no profiling
+            - author_index: string, optional. Path of an AuthorIndex (.npz) that every scraped day is added to, and
+              that is saved at the end of the run. It must not be written by two processes at once
+            - scite_log: string, optional. Directory of a SciteLog that the scite counts of every scraped day are
+              recorded in, so that `python -m scrapers.scites <log_dir> track <config>` can follow them afterwards
+            - compact_records: bool, optional. Whether days are yielded and collected as DayRecords, papers stored
+              as arrays with integer weekdays, submit times, sizes and author ids, instead of dicts. They convert
+              back to the dict layout with `to_dict`. Default: false
+            - low_memory: bool, optional. Whether every page tree is freed as soon as its papers are extracted, and
+              the direct mode only has `concurrency` pages in memory at a time. Default: false
+        - transport: Transport, optional. HTTP transport to share with other scrapers. A new one is built from
+          params when omitted
 
     Outputs:
         - results: list, a list of dict for each day within a specified period. Empty when save_by_day is set true
 
+    `iter_days` and `aiter_days` stream the same days one by one as soon as they are parsed, instead of collecting
+    them; `start_scraping` is a consumer of that stream.
+
 
     """
-    def __init__(self, params):
+    def __init__(self, params, transport=None):
+        self.url_header = params.get('url_header', 'https://scirate.com')
         self.start_date = params['start']
         self.end_date = params['end']
         self.archive = params['archive']
         self.save_by_day = params['save_by_day']
         self.save_dir = params['save_dir']
+        self.transport = transport if transport is not None else Transport.from_params(params)
+        self.low_memory = params.get('low_memory', False)
+        self.compact_records = params.get('compact_records', False)
+        self.author_names = AuthorNames() if self.compact_records else None
+        self.author_index_path = params.get('author_index')
+        self.author_index = open_index(self.author_index_path) if self.author_index_path else None
+        self.scite_log = SciteLog(params['scite_log']) if params.get('scite_log') else None
+        self.parser = get_parser(params.get('parser', 'soup'), release=self.low_memory)
+        self.fetch_mode = params.get('fetch_mode', 'chain')
+        self.day_range = params.get('day_range', 1)
+        self.concurrency = params.get('concurrency', 8)
+        self.rate_limiter = TokenBucket(params.get('rate_limit', 5))
+        self.async_fetcher = AsyncFetcher(self.concurrency, self.rate_limiter, self.transport.get_text)
+
+        self.metrics = Metrics('scirate')
+        self.metrics_report = params.get('metrics_report')
+        self.progress_interval = params.get('progress_interval')
+        self.profile_path = params.get('profile_path')
+
+        self.resume = params.get('resume', False)
+        self.incremental = params.get('incremental', False)
+        self.store = None
+        if self.save_by_day and params.get('save_format', 'json') == 'columnar':
+            self.store = ColumnStore(self.save_dir)
+        if (self.resume or self.incremental) and not self.save_by_day:
+            # the checkpoint lives next to the saved days, so there is nothing to resume from without them
+            raise ValueError('resume and incremental need save_by_day')
+        self.checkpoint = None
+        if self.resume or self.incremental:
+            checkpoint_path = params.get('checkpoint_path', os.path.join(self.save_dir, 'scirate_checkpoint.json'))
+            if self.store is not None:
+                completed = self.store.dates('scirate', self.archive)
+            else:
+                completed = saved_days(self.save_dir, 'scirate')
+            self.checkpoint = Checkpoint(checkpoint_path, completed)
 
     def start_scraping(self):
         """
@@ -48,77 +131,181 @@ class ScirateScraper:
         Outputs:
             - results: list, a list of dict for each day within a specified period
         """
+        # save each day as it comes when save_by_day is set, otherwise collect them
+        if not self.save_by_day:
+            return list(self.iter_days())
+
+        for res in self.iter_days():
+            with self.metrics.timer('save'):
+                self._save_day(res)
+            if self.checkpoint is not None:
+                self.checkpoint.mark_completed(res['date'])
+        return []
+
+    def iter_days(self):
+        """
+        Generator of the days of the search period that have papers, each a dict {'date', 'papers'} yielded as soon
+        as it is parsed. In the chain mode, the next day is only requested once the consumer has taken the current
+        one; the direct mode fetches a batch of days ahead.
+        """
+        start_date = self.start_date
+        if self.incremental and self.checkpoint.latest() is not None:
+            # only the days newer than the latest saved day
+            latest = next_date(self.checkpoint.latest())
+            start_date = max(start_date, latest, key=lambda d: (d['year'], d['month'], d['day']))
+        if self.resume and self.checkpoint.cursor is not None:
+            start_date = to_date(self.checkpoint.cursor)
 
-        url_start = self._get_url(self.start_date)
+        if self.fetch_mode == 'direct':
+            days = self._iter_days_direct(start_date)
+        else:
+            days = self._iter_days_chain(start_date)
+        self.transport.metrics = self.metrics
+        try:
+            with instrument(self.metrics, self.metrics_report, self.progress_interval, self.profile_path):
+                for res in days:
+                    self.metrics.count('days')
+                    self.metrics.count('papers', len(res['papers']))
+                    if self.author_index is not None:
+                        self.author_index.add_day(res, 'scirate')
+                    if self.scite_log is not None:
+                        self.scite_log.record(res)
+                    if self.compact_records:
+                        res = DayRecords.from_dict(res, self.author_names)
+                    yield res
+        finally:
+            if self.author_index is not None:
+                self.author_index.save(self.author_index_path)
+            if self.scite_log is not None:
+                self.scite_log.save_polls()
+
+        # the run is complete - the next run starts over from its start date
+        if self.checkpoint is not None:
+            self.checkpoint.set_cursor(None)
+
+    def aiter_days(self):
+        # async iterator over `iter_days` - scraping runs on a background thread, so the event loop stays free
+        return aiterate(self.iter_days())
+
+    def _iter_days_chain(self, start_date):
+        # one day after the other, each url taken from the next-day link of the previous page
+        url_start = self._get_url(start_date)
         url_end = self._get_url(self.end_date)
         date_end = self._parse_date(url_end)
-        response = requests.get(url_start)
-        soup = BeautifulSoup(response.text, 'lxml')
+        if self._parse_date(url_start) > date_end:
+            return
+        with self.metrics.timer('listing_fetch'):
+            response = self.transport.get(url_start)
+        with self.metrics.timer('listing_parse'):
+            soup = self.parser.load(response.text)
         date = self._parse_date(url_start)
-        results = []
 
         while date <= date_end:
+            if self.checkpoint is not None:
+                # the day was saved by an earlier run
+                if self.checkpoint.is_completed(date):
+                    soup, date = self.get_next_page(soup)
+                    continue
+                self.checkpoint.set_cursor(date)
+
             papers = self.get_papers_scirate(soup)
-            time.sleep(0.1)
+            with self.metrics.timer('sleep'):
+                time.sleep(0.1)
             if len(papers) == 0:
-                soup, date = self.get_next_page(soup)
-                continue
+                if self.checkpoint is not None:
+                    self.checkpoint.mark_completed(date)
             else:
-                res = {
+                yield {
                     'date': date,
                     'papers': papers
                 }
-                if self.save_by_day:
-                    save_path = os.path.join(self.save_dir, date + '_scirate.json')
-                    with open(save_path, 'w') as f:
-                        json.dump(res, f)
-                else:
-                    results.append(res)
-                soup, date = self.get_next_page(soup)
+            soup, date = self.get_next_page(soup)
 
-        return results
+    def _iter_days_direct(self, start_date):
+        # urls of all the windows of day_range days built up front, fetched concurrently in batches and yielded in
+        # date order. A paper listed by more than one window is only kept in the first one
+        first = datetime.date(start_date['year'], start_date['month'], start_date['day'])
+        last = datetime.date(self.end_date['year'], self.end_date['month'], self.end_date['day'])
+        urls = []
+        while first <= last:
+            url = self._get_url({'year': first.year, 'month': first.month, 'day': first.day}, self.day_range)
+            if self.checkpoint is None or not self.checkpoint.is_completed(self._parse_date(url)):
+                urls.append(url)
+            first += datetime.timedelta(days=self.day_range)
+
+        seen = set()
+        batch_size = self.concurrency if self.low_memory else 4 * self.concurrency
+        try:
+            for i in range(0, len(urls), batch_size):
+                batch = urls[i:i + batch_size]
+                with self.metrics.timer('listing_fetch'):
+                    pages = self.async_fetcher.fetch_all(batch)
+                for url, html in zip(batch, pages):
+                    date = self._parse_date(url)
+                    papers = []
+                    with self.metrics.timer('listing_parse'):
+                        soup = self.parser.load(html)
+                    day_papers = self.get_papers_scirate(soup)
+                    self.parser.release(soup)
+                    for paper in day_papers:
+                        if paper['arxiv_id'] is not None:
+                            if paper['arxiv_id'] in seen:
+                                continue
+                            seen.add(paper['arxiv_id'])
+                        papers.append(paper)
+
+                    if len(papers) == 0:
+                        if self.checkpoint is not None:
+                            self.checkpoint.mark_completed(date)
+                        continue
+                    yield {
+                        'date': date,
+                        'papers': papers
+                    }
+        finally:
+            self.async_fetcher.close()
 
     def get_papers_scirate(self, soup):
-        papers = []
-        paper_list = soup.find_all('li', class_='paper tex2jax')
-
-        for i, paper in enumerate(paper_list):
-            title = paper.find('div', class_='title').text
-            author_list = paper.find('div', class_='authors').text.split(', ')
-            authors = []
-            for author in author_list:
-                authors.append(author.strip())
-
-            scite_count = int(paper.find('button', class_='btn btn-default count').text)
-
-            paper_info = {
-                'title': title,
-                'authors': authors,
-                'rank': i,
-                'scite_count': scite_count
-            }
-            papers.append(paper_info)
+        with self.metrics.timer('listing_parse'):
+            return self.parser.scirate_papers(soup)
 
+    def get_day_papers(self, date, revalidate=False):
+        # papers of the Scirate page of one listing day ("day_YYYY_MM_DD"), e.g. to poll its scite counts again. With
+        # revalidate, a cached page is checked against the server instead of served as is
+        url = self._get_url(to_date(date))
+        with self.metrics.timer('listing_fetch'):
+            response = self.transport.get(url, revalidate)
+        with self.metrics.timer('listing_parse'):
+            soup = self.parser.load(response.text)
+        papers = self.get_papers_scirate(soup)
+        self.parser.release(soup)
         return papers
 
     def get_next_page(self, soup):
-        nextday = soup.find('td', class_='btn-default half top right').find('a')
-        href = nextday.get_attribute_list('href')[0]
-        header = 'https://scirate.com'
-        url_next = header + href
-        response = requests.get(url_next)
-        next_page = BeautifulSoup(response.text, 'lxml')
+        href = self.parser.scirate_next_href(soup)
+        self.parser.release(soup)
+        url_next = self.url_header + href
+        with self.metrics.timer('listing_fetch'):
+            response = self.transport.get(url_next)
+        with self.metrics.timer('listing_parse'):
+            next_page = self.parser.load(response.text)
         next_date = self._parse_date(url_next)
         return next_page, next_date
 
     # helper methods
+    def _save_day(self, res):
+        if self.store is not None:
+            self.store.append('scirate', self.archive, res['date'], res['papers'])
+        else:
+            write_json(os.path.join(self.save_dir, res['date'] + '_scirate.json'), as_dict(res))
+
     def _parse_date(self, url):
         text = url.split('date=')[-1].split('&')[0]
         year, month, day = text.split('-')
         date = 'day_%s_%s_%s' % (year, month, day)
         return date
 
-    def _get_url(self, date):
+    def _get_url(self, date, day_range=1):
         if date['day'] < 10:
             day = '0' + str(date['day'])
         else:
@@ -129,13 +316,14 @@ class ScirateScraper:
             month = str(date['month'])
         year = str(date['year'])
 
-        href = '?date=%s-%s-%s&range=1' % (year, month, day)
-        url_base = 'https://scirate.com/arxiv/%s' % self.archive
+        href = '?date=%s-%s-%s&range=%d' % (year, month, day, day_range)
+        url_base = self.url_header + '/arxiv/%s' % self.archive
         url = url_base + href
         return url
 
 
 if __name__ == '__main__':
+    # run as a module from the repository root: python -m scrapers.sciratescraper
     # !!! parameters for ArchiveScraper are stored in `arxiv_config.json` under the `configs` directory.
     params = {'start': {'year': 2018, 'month': 4, 'day': 11},
               'end': {'year': 2018, 'month': 4, 'day': 12},
@@ -152,5 +340,5 @@ if __name__ == '__main__':
     print('Last date: ', results[-1]['date'])
     print('First paper of the last day: ', results[-1]['papers'][0])
 
-    with open('../data/scirate-2018-04-11-2018-04-11.pkl', 'wb') as f:
+    with open('./data/scirate-2018-04-11-2018-04-11.pkl', 'wb') as f:
         pickle.dump(results, f)
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import datetime
+import numpy as np
+from .common import day_number
+from .checkpoint import write_json
+
+
+# days after a listing day at which its Scirate page is polled again
+POLL_OFFSETS = [1, 2, 4, 8]
+
+# one scite count change: paper row, unix time of the poll and the new count
+DELTA_DTYPE = np.dtype([('paper', '<i4'), ('time', '<i8'), ('count', '<i4')])
+
+_DAY_SECONDS = 86400
+
+
+class SciteLog:
+    """
+    Append-only log of the scite counts of Scirate papers over time, with one record per change.
+
+    Every poll of a Scirate day page is compared with the latest known count of each paper, and only the papers
+    whose count changed (or that were never seen) are appended to deltas.bin, as fixed-size binary records. Papers
+    are numbered in the order they are first seen, and papers.tsv lists their arXiv identifier and listing day. A
+    paper's scite curve is the step function of its records, rebuilt on demand. polls.json keeps the poll times of
+    the recent listing days, which decide when a day is due again (see `due_days`), and is saved by `save_polls`.
+
+    Both files are only ever appended to, so a crash loses at most the last poll: a partial line or record at the
+    end of a file is cut off when the log is opened. It must not be written by two processes at once.
+
+    Inputs:
+        - log_dir: string, directory of the log. Created when missing
+        - offsets: list, days after a listing day at which it is polled again
+
+    """
+    def __init__(self, log_dir, offsets=POLL_OFFSETS):
+        self.log_dir = log_dir
+        self.offsets = sorted(offsets)
+        os.makedirs(log_dir, exist_ok=True)
+        self.deltas_path = os.path.join(log_dir, 'deltas.bin')
+        self.papers_path = os.path.join(log_dir, 'papers.tsv')
+        self.polls_path = os.path.join(log_dir, 'polls.json')
+
+        self.arxiv_ids = []
+        self.dates = []
+        if os.path.exists(self.papers_path):
+            size = 0
+            with open(self.papers_path, 'r') as f:
+                for line in f:
+                    if line.endswith('\n'):
+                        arxiv_id, date = line[:-1].split('\t')
+                        self.arxiv_ids.append(arxiv_id)
+                        self.dates.append(date)
+                        size += len(line.encode('utf-8'))
+            # a line or record cut by a crash is dropped, so that the next appends start on a boundary
+            os.truncate(self.papers_path, size)
+        if os.path.exists(self.deltas_path):
+            size = os.path.getsize(self.deltas_path)
+            os.truncate(self.deltas_path, size - size % DELTA_DTYPE.itemsize)
+        self.rows = dict((arxiv_id, i) for i, arxiv_id in enumerate(self.arxiv_ids))
+        self.polls = {}
+        if os.path.exists(self.polls_path):
+            with open(self.polls_path, 'r') as f:
+                self.polls = json.load(f)
+
+        # the latest count of every paper is the last record of its row
+        deltas = self.deltas()
+        latest = np.full(len(self.arxiv_ids), -1, dtype=np.int64)
+        latest[deltas['paper']] = deltas['count']
+        self.latest = latest.tolist()
+
+    @property
+    def num_papers(self):
+        return len(self.arxiv_ids)
+
+    def deltas(self):
+        # every complete record of deltas.bin, in the order they were appended
+        if not os.path.exists(self.deltas_path):
+            return np.zeros(0, dtype=DELTA_DTYPE)
+        size = os.path.getsize(self.deltas_path) // DELTA_DTYPE.itemsize
+        deltas = np.fromfile(self.deltas_path, dtype=DELTA_DTYPE, count=size)
+        # records of papers missing from papers.tsv are from an interrupted poll
+        return deltas[deltas['paper'] < self.num_papers]
+
+    def record(self, res, polled_at=None):
+        """
+        Compare a poll of a Scirate day ({'date', 'papers'}) with the latest counts, and append the changes.
+
+        Inputs:
+            - res: dict, a Scirate day as returned by ScirateScraper. Papers without an arXiv identifier are skipped
+            - polled_at: float, optional. Unix time of the poll. Default: now
+
+        Outputs:
+            - num_changed: int, number of records appended
+        """
+        polled_at = int(polled_at if polled_at is not None else time.time())
+        new_papers = []
+        changed = []
+        for paper in res['papers']:
+            arxiv_id = paper.get('arxiv_id')
+            if not arxiv_id:
+                continue
+            row = self.rows.get(arxiv_id)
+            if row is None:
+                row = self.rows[arxiv_id] = len(self.arxiv_ids)
+                self.arxiv_ids.append(arxiv_id)
+                self.dates.append(res['date'])
+                self.latest.append(-1)
+                new_papers.append(arxiv_id)
+            if self.latest[row] != paper['scite_count']:
+                self.latest[row] = paper['scite_count']
+                changed.append((row, polled_at, paper['scite_count']))
+
+        # papers first, so that every record refers to a known paper
+        if len(new_papers) > 0:
+            with open(self.papers_path, 'a') as f:
+                f.write(''.join('%s\t%s\n' % (arxiv_id, res['date']) for arxiv_id in new_papers))
+        if len(changed) > 0:
+            with open(self.deltas_path, 'ab') as f:
+                f.write(np.array(changed, dtype=DELTA_DTYPE).tobytes())
+        self.polls.setdefault(res['date'], []).append(polled_at)
+        return len(changed)
+
+    def due_days(self, today=None):
+        """
+        Listing days whose Scirate page should be polled again.
+
+        A day is due when one of its poll offsets has passed since its last poll: with offsets 1, 2, 4 and 8, a day
+        is polled the day after it is listed, then 2, 4 and 8 days after, and a missed poll is made up at the next
+        run. Days older than twice the last offset are not polled any more.
+
+        Inputs:
+            - today: datetime.date, optional. Default: today (UTC)
+
+        Outputs:
+            - dates: list, "day_YYYY_MM_DD" strings, oldest first
+        """
+        today = today if today is not None else datetime.datetime.now(datetime.timezone.utc).date()
+        due = []
+        for age in range(2 * self.offsets[-1], self.offsets[0] - 1, -1):
+            date = (today - datetime.timedelta(days=age)).strftime('day_%Y_%m_%d')
+            passed = [offset for offset in self.offsets if offset <= age]
+            # the last offset that has passed is due unless a poll was made at or after it
+            since = (day_number(date) + passed[-1] - datetime.date(1970, 1, 1).toordinal()) * _DAY_SECONDS
+            if all(poll < since for poll in self.polls.get(date, [])):
+                due.append(date)
+        return due
+
+    def save_polls(self, today=None):
+        # forget the poll times of the days that are no longer polled, and save the others
+        today = today if today is not None else datetime.datetime.now(datetime.timezone.utc).date()
+        oldest = (today - datetime.timedelta(days=2 * self.offsets[-1])).strftime('day_%Y_%m_%d')
+        self.polls = dict((date, polls) for date, polls in self.polls.items() if date >= oldest)
+        write_json(self.polls_path, self.polls)
+
+    def curve(self, arxiv_id):
+        """
+        Scite curve of a paper, rebuilt from its records.
+
+        Outputs:
+            - curve: dict with keys date (listing day), times (unix times of the changes), days (days since the
+              start of the listing day) and counts (count from each change on). None for an unknown paper
+        """
+        row = self.rows.get(arxiv_id)
+        if row is None:
+            return None
+        deltas = self.deltas()
+        deltas = deltas[deltas['paper'] == row]
+        return {'date': self.dates[row],
+                'times': deltas['time'],
+                'days': deltas['time'] / float(_DAY_SECONDS) - self._listing_epoch_days([row]),
+                'counts': deltas['count'].astype(np.int64)}
+
+    def counts_at(self, days):
+        """
+        Scite count of every paper a given number of days after the start of its listing day, e.g. to compare papers
+        of different ages.
+
+        Inputs:
+            - days: float, days since the listing day
+
+        Outputs:
+            - counts: numpy.ndarray, one count per paper (in the order of arxiv_ids), -1 when not yet polled then
+        """
+        deltas = self.deltas()
+        order = np.lexsort((deltas['time'], deltas['paper']))
+        keys = (deltas['paper'][order].astype(np.int64) << 32) + deltas['time'][order]
+        limits = (self._listing_epoch_days(np.arange(self.num_papers)) + days) * _DAY_SECONDS
+        position = np.searchsorted(keys, (np.arange(self.num_papers, dtype=np.int64) << 32) + limits.astype(np.int64),
+                                   side='right') - 1
+        found = position >= 0
+        found[found] = deltas['paper'][order][position[found]] == np.flatnonzero(found)
+        counts = np.full(self.num_papers, -1, dtype=np.int64)
+        counts[found] = deltas['count'][order][position[found]]
+        return counts
+
+    # helper methods
+    def _listing_epoch_days(self, rows):
+        # listing days of papers as days since the unix epoch
+        epoch = datetime.date(1970, 1, 1).toordinal()
+        return np.array([day_number(self.dates[row]) - epoch for row in rows], dtype=float)
+
+
+def track(scraper, log, today=None, polled_at=None):
+    """
+    Poll the Scirate pages of the days that are due (see `SciteLog.due_days`) and record the changed counts. Cached
+    pages are revalidated with the server, since the counts change while the cached copy still looks fresh.
+
+    Inputs:
+        - scraper: ScirateScraper, used for its transport, parser and urls
+        - log: SciteLog
+        - today: datetime.date, optional. Default: today (UTC)
+        - polled_at: float, optional. Unix time recorded for the polls. Default: now
+
+    Outputs:
+        - summary: dict with keys days (number of pages polled), papers (papers seen) and changes (records
+          appended)
+    """
+    summary = {'days': 0, 'papers': 0, 'changes': 0}
+    for date in log.due_days(today):
+        res = {'date': date, 'papers': scraper.get_day_papers(date, revalidate=True)}
+        summary['days'] += 1
+        summary['papers'] += len(res['papers'])
+        summary['changes'] += log.record(res, polled_at)
+    log.save_polls(today)
+    return summary
+
+
+if __name__ == '__main__':
+    # usage: python -m scrapers.scites <log_dir> track <scirate_config.json>
+    #        python -m scrapers.scites <log_dir> curve <arxiv_id>
+    from .sciratescraper import ScirateScraper
+    log = SciteLog(sys.argv[1])
+    if sys.argv[2] == 'track':
+        with open(sys.argv[3], 'r') as f:
+            print(track(ScirateScraper(json.load(f)), log))
+    else:
+        curve = log.curve(sys.argv[3])
+        if curve is None:
+            print('Unknown paper.')
+        else:
+            print('Listed on %s' % curve['date'])
+            for days, count in zip(curve['days'], curve['counts']):
+                print('%8.2f days  %d scites' % (days, count))
@@ -0,0 +1,404 @@
+import os
+import re
+import glob
+import json
+import shutil
+import hashlib
+import argparse
+import datetime
+import numpy as np
+from .authors import author_key
+from .common import MERGE_FACTOR, day_number, normalize_title
+from .store import StringColumn
+from .checkpoint import write_json
+
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# prefix of the author terms, which tokens never contain
+_AUTHOR_PREFIX = 'author:'
+
+_LOW_BITS = (1 << 32) - 1
+
+
+def tokenize(text):
+    # lowercase words and numbers of a text, without latex markup
+    return normalize_title(text).split()
+
+
+def term_hash(term):
+    # 64-bit hash of a term. Postings are keyed by hash, so segments need no shared vocabulary
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+def parse_query(query):
+    # (free terms, phrases as lists of terms) of a query, phrases in double quotes
+    phrases = [tokenize(phrase) for phrase in re.findall(r'"([^"]*)"', query)]
+    terms = tokenize(re.sub(r'"[^"]*"', ' ', query))
+    return terms, [phrase for phrase in phrases if len(phrase) > 0]
+
+
+class Segment:
+    """
+    One immutable part of a SearchIndex on disk, every array memory-mapped.
+
+    Postings are sorted by term hash and document: term_hash (unique, sorted) and term_start give the postings of a
+    term, each a local document number, a term frequency and a range of word positions.
+
+    Inputs:
+        - path: string, directory of the segment
+        - first_doc: int, global number of its first document
+
+    """
+    names = ['term_hash', 'term_start', 'doc', 'tf', 'pos_start', 'positions', 'doc_length', 'day']
+
+    def __init__(self, path, first_doc):
+        self.path = path
+        self.first_doc = first_doc
+        for name in self.names:
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r'))
+        self.arxiv_ids = _load_strings(path, 'arxiv_id')
+        self.titles = _load_strings(path, 'title')
+
+    @property
+    def num_docs(self):
+        return len(self.doc_length)
+
+    def postings(self, term):
+        # (first posting, end posting) of a term
+        h = term_hash(term)
+        i = np.searchsorted(self.term_hash, h)
+        if i == len(self.term_hash) or self.term_hash[i] != h:
+            return 0, 0
+        return int(self.term_start[i]), int(self.term_start[i + 1])
+
+    def docs(self, term):
+        # (global document numbers, term frequencies) of the documents containing a term
+        start, end = self.postings(term)
+        return self.first_doc + np.asarray(self.doc[start:end], dtype=np.int64), np.asarray(self.tf[start:end])
+
+    def occurrences(self, term):
+        # (global document number, position) of every occurrence of a term
+        start, end = self.postings(term)
+        counts = np.diff(self.pos_start[start:end + 1])
+        docs = np.repeat(self.first_doc + np.asarray(self.doc[start:end], dtype=np.int64), counts)
+        return docs, np.asarray(self.positions[self.pos_start[start]:self.pos_start[end]], dtype=np.int64)
+
+    @staticmethod
+    def write(path, hashes, docs, positions, doc_length, day, arxiv_ids, titles):
+        """
+        Write a segment from its term occurrences.
+
+        Inputs:
+            - path: string, directory of the segment, written through a temporary directory
+            - hashes, docs, positions: arrays, term hash, local document number and position of every occurrence
+            - doc_length, day: arrays, number of words and listing day (proleptic ordinal) of every document
+            - arxiv_ids, titles: lists of strings, of every document
+        """
+        order = np.lexsort((positions, docs, hashes))
+        hashes, docs, positions = hashes[order], docs[order], positions[order]
+        # one posting per (term, document), one term per run of equal hashes
+        new_posting = np.ones(len(hashes), dtype=bool)
+        new_posting[1:] = (hashes[1:] != hashes[:-1]) | (docs[1:] != docs[:-1])
+        pos_start = np.append(np.flatnonzero(new_posting), len(hashes))
+        posting_hash = hashes[new_posting]
+        new_term = np.ones(len(posting_hash), dtype=bool)
+        new_term[1:] = posting_hash[1:] != posting_hash[:-1]
+
+        tmp = path + '.tmp'
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        arrays = {'term_hash': posting_hash[new_term],
+                  'term_start': np.append(np.flatnonzero(new_term), len(posting_hash)).astype(np.int64),
+                  'doc': docs[new_posting].astype(np.int32),
+                  'tf': np.diff(pos_start).astype(np.int32),
+                  'pos_start': pos_start.astype(np.int64),
+                  'positions': positions.astype(np.int32),
+                  'doc_length': np.asarray(doc_length, dtype=np.int32),
+                  'day': np.asarray(day, dtype=np.int32)}
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, name + '.npy'), array)
+        _save_strings(tmp, 'arxiv_id', StringColumn.from_list(arxiv_ids))
+        _save_strings(tmp, 'title', StringColumn.from_list(titles))
+        # a segment of that name was written by a run interrupted before it saved the manifest, so no manifest
+        # refers to it
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp, path)
+
+
+class SearchIndex:
+    """
+    Full-text index of scraped titles and abstracts with BM25 ranking, phrase queries and author and date filters.
+
+    Papers are buffered as days are added and written as immutable segments, whose arrays are memory-mapped. New
+    segments are level 0, and every MERGE_FACTOR segments of a level are merged into one of the next level, so an
+    index of years of listings is a handful of segments and adding a day never rewrites it. A manifest (index.json),
+    replaced atomically, lists the segments. Papers already indexed (by arXiv identifier) are skipped.
+
+    Words of the title and the abstract are indexed with their positions, the title first. Authors are indexed as
+    terms of their normalized names (see scrapers.authors.author_key), which do not count in the BM25 length.
+
+    Inputs:
+        - index_dir: string, directory of the index. Created when missing
+        - buffer_size: int, papers buffered before a segment is written
+
+    """
+    def __init__(self, index_dir, buffer_size=10000):
+        self.index_dir = index_dir
+        self.buffer_size = buffer_size
+        os.makedirs(index_dir, exist_ok=True)
+        self.manifest = {'segments': [], 'next_segment': 0}
+        manifest_path = os.path.join(index_dir, 'index.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        self.indexed = None
+        self.hashes = {}
+        self.segments = []
+        self._clear_buffer()
+        self._open_segments()
+
+    @property
+    def num_docs(self):
+        return len(self.doc_length)
+
+    def add_day(self, res):
+        """
+        Buffer the papers of a scraped Arxiv day ({'date', 'papers'}), and write a segment when the buffer is full.
+
+        Outputs:
+            - num_added: int, number of papers not indexed before
+        """
+        if self.indexed is None:
+            self.indexed = set(arxiv_id for segment in self.segments for arxiv_id in segment.arxiv_ids.to_list())
+        day = day_number(res['date'])
+        num_added = 0
+        for paper in res['papers']:
+            arxiv_id = paper.get('arxiv_id') or ''
+            if arxiv_id in self.indexed:
+                continue
+            if arxiv_id:
+                self.indexed.add(arxiv_id)
+            doc = len(self.buffer['day'])
+            tokens = tokenize(paper['title'])
+            num_title = len(tokens)
+            tokens += tokenize(paper.get('abstract') or '')
+            # the gap keeps phrases from spanning the title and the abstract
+            positions = list(range(num_title)) + list(range(num_title + 1, len(tokens) + 1))
+            authors = sorted(set(_AUTHOR_PREFIX + author_key(author) for author in paper['authors']))
+            self.buffer['hashes'] += [self._hash(term) for term in tokens + authors]
+            self.buffer['positions'] += positions + [0] * len(authors)
+            self.buffer['docs'] += [doc] * (len(tokens) + len(authors))
+            self.buffer['doc_length'].append(len(tokens))
+            self.buffer['day'].append(day)
+            self.buffer['arxiv_ids'].append(arxiv_id)
+            self.buffer['titles'].append(paper['title'])
+            num_added += 1
+        if len(self.buffer['day']) >= self.buffer_size:
+            self.flush()
+        return num_added
+
+    def add_days(self, days):
+        # add every day of an iterable of scraped days, and return the number of new papers
+        return sum(self.add_day(res) for res in days)
+
+    def flush(self):
+        # write the buffered papers as a new segment, then merge full levels
+        if len(self.buffer['day']) == 0:
+            return
+        name = 'seg-%06d' % self.manifest['next_segment']
+        Segment.write(os.path.join(self.index_dir, name), np.array(self.buffer['hashes'], dtype=np.int64),
+                      np.array(self.buffer['docs'], dtype=np.int64), np.array(self.buffer['positions'], dtype=np.int64),
+                      self.buffer['doc_length'], self.buffer['day'], self.buffer['arxiv_ids'], self.buffer['titles'])
+        self.manifest['segments'].append({'name': name, 'level': 0, 'num_docs': len(self.buffer['day'])})
+        self.manifest['next_segment'] += 1
+        self._clear_buffer()
+        while True:
+            levels = [segment['level'] for segment in self.manifest['segments'][-MERGE_FACTOR:]]
+            if len(levels) < MERGE_FACTOR or len(set(levels)) > 1:
+                break
+            self._merge_last(MERGE_FACTOR)
+        self._save_manifest()
+        self._open_segments()
+        # segments no longer in the manifest: merged ones, or ones left by an interrupted run
+        names = set(segment['name'] for segment in self.manifest['segments'])
+        for path in glob.glob(os.path.join(self.index_dir, 'seg-*')):
+            if os.path.basename(path) not in names:
+                shutil.rmtree(path)
+
+    def search(self, query, authors=None, date_from=None, date_until=None, limit=10):
+        """
+        Papers matching a query, best BM25 score first.
+
+        Inputs:
+            - query: string, words and "quoted phrases". Papers need at least one of the words and every phrase.
+              An empty query matches every paper that passes the filters, latest first
+            - authors: list, optional. Author names every paper must have
+            - date_from, date_until: string, optional. First and last listing day, e.g. "day_2018_03_13"
+            - limit: int, maximum number of results
+
+        Outputs:
+            - results: list, one dict per paper with keys arxiv_id, date, title and score
+        """
+        terms, phrases = parse_query(query)
+        scores = np.zeros(self.num_docs)
+        avg_length = max(self.doc_length.mean(), 1.) if self.num_docs > 0 else 1.
+        for term in sorted(set(terms + [term for phrase in phrases for term in phrase])):
+            postings = [segment.docs(term) for segment in self.segments]
+            docs = np.concatenate([docs for docs, _ in postings]) if postings else np.zeros(0, dtype=np.int64)
+            tf = np.concatenate([tf for _, tf in postings]) if postings else np.zeros(0)
+            idf = np.log(1. + (self.num_docs - len(docs) + .5) / (len(docs) + .5))
+            norm = K1 * (1. - B + B * self.doc_length[docs] / avg_length)
+            scores[docs] += idf * tf * (K1 + 1.) / (tf + norm)
+
+        match = scores > 0 if len(terms) + len(phrases) > 0 else np.ones(self.num_docs, dtype=bool)
+        for phrase in phrases:
+            match &= self._phrase_mask(phrase)
+        for author in authors or []:
+            match &= self._term_mask(_AUTHOR_PREFIX + author_key(author))
+        if date_from is not None:
+            match &= self.day >= day_number(date_from)
+        if date_until is not None:
+            match &= self.day <= day_number(date_until)
+
+        docs = np.flatnonzero(match)
+        # latest first among equal scores
+        key = np.lexsort((-self.day[docs], -scores[docs]))[:limit]
+        return [self._result(doc, scores[doc]) for doc in docs[key]]
+
+    # helper methods
+    def _hash(self, term):
+        # term hashes are cached, as the vocabulary is much smaller than the text
+        h = self.hashes.get(term)
+        if h is None:
+            h = self.hashes[term] = term_hash(term)
+        return h
+
+    def _clear_buffer(self):
+        self.buffer = dict((name, []) for name in ['hashes', 'docs', 'positions', 'doc_length', 'day', 'arxiv_ids',
+                                                   'titles'])
+
+    def _open_segments(self):
+        # segments already open are kept: a flush only opens the new one
+        opened = dict((segment.path, segment) for segment in self.segments)
+        self.segments = []
+        first_doc = 0
+        for entry in self.manifest['segments']:
+            path = os.path.join(self.index_dir, entry['name'])
+            self.segments.append(opened[path] if path in opened else Segment(path, first_doc))
+            first_doc += entry['num_docs']
+        self.doc_length = np.concatenate([np.zeros(0, dtype=np.int32)] + [s.doc_length for s in self.segments])
+        self.day = np.concatenate([np.zeros(0, dtype=np.int32)] + [s.day for s in self.segments])
+
+    def _save_manifest(self):
+        write_json(os.path.join(self.index_dir, 'index.json'), self.manifest)
+
+    def _merge_last(self, count):
+        # merge the last `count` segments (consecutive documents) into one of the next level
+        entries = self.manifest['segments'][-count:]
+        segments, first_doc = [], 0
+        for entry in entries:
+            segments.append(Segment(os.path.join(self.index_dir, entry['name']), first_doc))
+            first_doc += entry['num_docs']
+        hashes, docs, positions = [], [], []
+        for segment in segments:
+            # every occurrence of every term, with its document renumbered within the merged segment
+            counts = np.diff(segment.pos_start)
+            posting_hash = np.repeat(np.asarray(segment.term_hash), np.diff(segment.term_start))
+            hashes.append(np.repeat(posting_hash, counts))
+            docs.append(np.repeat(segment.first_doc + np.asarray(segment.doc, dtype=np.int64), counts))
+            positions.append(np.asarray(segment.positions, dtype=np.int64))
+        name = 'seg-%06d' % self.manifest['next_segment']
+        Segment.write(os.path.join(self.index_dir, name), np.concatenate(hashes), np.concatenate(docs),
+                      np.concatenate(positions), np.concatenate([s.doc_length for s in segments]),
+                      np.concatenate([s.day for s in segments]),
+                      [arxiv_id for s in segments for arxiv_id in s.arxiv_ids.to_list()],
+                      [title for s in segments for title in s.titles.to_list()])
+        self.manifest['segments'][-count:] = [{'name': name, 'level': entries[0]['level'] + 1,
+                                               'num_docs': first_doc}]
+        self.manifest['next_segment'] += 1
+
+    def _term_mask(self, term):
+        mask = np.zeros(self.num_docs, dtype=bool)
+        for segment in self.segments:
+            mask[segment.docs(term)[0]] = True
+        return mask
+
+    def _phrase_mask(self, phrase):
+        # documents with the terms of a phrase at consecutive positions. The (document, position) keys of a term's
+        # occurrences are sorted, so the candidate starts, taken from the rarest term, are checked against every
+        # other term by binary search
+        mask = np.zeros(self.num_docs, dtype=bool)
+        for segment in self.segments:
+            keys = []
+            for term in phrase:
+                docs, positions = segment.occurrences(term)
+                keys.append((docs << 32) | positions)
+            rarest = int(np.argmin([len(k) for k in keys]))
+            starts = keys[rarest][(keys[rarest] & _LOW_BITS) >= rarest] - rarest
+            for offset, term_keys in enumerate(keys):
+                if offset == rarest or len(starts) == 0:
+                    continue
+                wanted = starts + offset
+                found = np.searchsorted(term_keys, wanted)
+                found[found == len(term_keys)] = 0
+                starts = starts[term_keys[found] == wanted] if len(term_keys) > 0 else starts[:0]
+            mask[starts >> 32] = True
+        return mask
+
+    def _result(self, doc, score):
+        i = np.searchsorted([s.first_doc for s in self.segments], doc, side='right') - 1
+        segment = self.segments[i]
+        local = doc - segment.first_doc
+        return {'arxiv_id': segment.arxiv_ids[local],
+                'date': datetime.date.fromordinal(int(self.day[doc])).strftime('day_%Y_%m_%d'),
+                'title': segment.titles[local],
+                'score': float(score)}
+
+
+# helper functions
+def _save_strings(path, name, column):
+    np.save(os.path.join(path, name + '.data.npy'), column.data)
+    np.save(os.path.join(path, name + '.offsets.npy'), column.offsets)
+
+
+def _load_strings(path, name):
+    return StringColumn(np.load(os.path.join(path, name + '.data.npy'), mmap_mode='r'),
+                        np.load(os.path.join(path, name + '.offsets.npy'), mmap_mode='r'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search of scraped Arxiv titles and abstracts.')
+    parser.add_argument('index_dir')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='index the day files saved by the scrapers (save_by_day, json)')
+    add.add_argument('save_dir')
+    query = commands.add_parser('query', help='search the index')
+    query.add_argument('query', help='words and "quoted phrases"')
+    query.add_argument('--author', action='append', help='author every paper must have, can be repeated')
+    query.add_argument('--date-from', help='first listing day, e.g. day_2018_03_13')
+    query.add_argument('--date-until', help='last listing day')
+    query.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index_dir)
+    if args.command == 'add':
+        num_added = 0
+        for path in sorted(glob.glob(os.path.join(args.save_dir, '*_arxiv.json'))):
+            with open(path, 'r') as f:
+                num_added += index.add_day(json.load(f))
+        index.flush()
+        print('Indexed %d papers, %d in total.' % (num_added, index.num_docs))
+        return
+    for result in index.search(args.query, args.author, args.date_from, args.date_until, args.limit):
+        print('%8.3f  %s  %-16s %s' % (result['score'], result['date'], result['arxiv_id'], result['title']))
+
+
+if __name__ == '__main__':
+    # usage: python -m scrapers.search <index_dir> add <save_dir>
+    #        python -m scrapers.search <index_dir> query "<words and phrases>" [--author NAME] [--date-from DAY] ...
+    main()
@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import glob
+import uuid
+import shutil
+import numpy as np
+
+
+class StringColumn:
+    """
+    Column of strings stored as one utf-8 byte buffer and an offsets array, both memory-mappable.
+
+    Inputs:
+        - data: array of uint8, concatenated utf-8 bytes of all the strings
+        - offsets: array of int64, start of every string in data, followed by the end of the last one
+        - null: array of bool, optional. Rows that are None. Default: no None
+
+    """
+    def __init__(self, data, offsets, null=None):
+        self.data = data
+        self.offsets = offsets
+        self.null = null
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self.null is not None and self.null[i]:
+            return None
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def to_list(self):
+        buffer = bytes(self.data)
+        offsets = self.offsets.tolist()
+        strings = [buffer[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return _with_nulls(strings, self.null)
+
+    @classmethod
+    def from_list(cls, strings):
+        # None items are stored as empty strings and flagged in the null mask
+        null = np.array([s is None for s in strings], dtype=bool)
+        encoded = [s.encode('utf-8') if s is not None else b'' for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets, null if null.any() else None)
+
+
+class StringListColumn:
+    """
+    Column of string lists (e.g. authors): a StringColumn of all the items and an offsets array per row.
+
+    Inputs:
+        - items: StringColumn, every item of every row
+        - offsets: array of int64, start of every row in items, followed by the end of the last one
+        - null: array of bool, optional. Rows that are None. Default: no None
+
+    """
+    def __init__(self, items, offsets, null=None):
+        self.items = items
+        self.offsets = offsets
+        self.null = null
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self.null is not None and self.null[i]:
+            return None
+        return [self.items[j] for j in range(self.offsets[i], self.offsets[i + 1])]
+
+    def to_list(self):
+        items = self.items.to_list()
+        offsets = self.offsets.tolist()
+        return _with_nulls([items[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)], self.null)
+
+    @classmethod
+    def from_list(cls, lists):
+        # None rows are stored as empty lists and flagged in the null mask
+        null = np.array([items is None for items in lists], dtype=bool)
+        lists = [items if items is not None else [] for items in lists]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(items) for items in lists])
+        return cls(StringColumn.from_list([item for items in lists for item in items]), offsets,
+                   null if null.any() else None)
+
+
+def _with_nulls(values, null):
+    # values with None at the rows of a null mask
+    if null is None:
+        return values
+    return [None if n else value for value, n in zip(values, null.tolist())]
+
+
+class ColumnStore:
+    """
+    Append-only columnar store of scraped papers, partitioned by source, archive and date.
+
+    Every append writes one immutable part under <store_dir>/<source>/<archive>/<date>/, with a unique name, so that
+    concurrent appenders (e.g. the workers of a Scheduler) never write the same part. Numeric columns are .npy
+    arrays, string columns a utf-8 buffer plus offsets, and author lists a string column plus row offsets, so every
+    column is read back with `np.load(mmap_mode='r')` without copying or parsing json. Column types are inferred from
+    the values of all the records: int, float, bool, string and list of strings. None values and fields missing from
+    some records are stored with a validity mask, and read back as None: numeric columns with nulls are masked arrays.
+    Date filters prune partitions before any file is opened.
+
+    Inputs:
+        - store_dir: string, root directory of the store. Created when missing
+
+    """
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+    def append(self, source, archive, date, records):
+        # write the records of one day as a new part of the (source, archive, date) partition
+        if len(records) == 0:
+            return
+        schema = self._infer_schema(records)
+        partition = os.path.join(self.store_dir, source, archive, date)
+        os.makedirs(partition, exist_ok=True)
+        # parts sort in the order they were appended. The random suffix keeps two appenders that see the same
+        # number of parts apart
+        part = os.path.join(partition, 'part-%05d-%s' % (len(self._parts(partition)), uuid.uuid4().hex))
+
+        # write into a temporary directory first, so readers never see a partial part
+        tmp = part + '.tmp'
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        nullable = []
+        for name, kind in schema.items():
+            values = [record.get(name) for record in records]
+            null = np.array([value is None for value in values], dtype=bool)
+            if kind == 'str':
+                self._save_strings(tmp, name, StringColumn.from_list(values))
+            elif kind == 'list':
+                column = StringListColumn.from_list(values)
+                self._save_strings(tmp, name, column.items)
+                np.save(os.path.join(tmp, name + '.rows.npy'), column.offsets)
+            else:
+                np.save(os.path.join(tmp, name + '.npy'),
+                        np.array([value if value is not None else 0 for value in values], dtype=kind))
+            if null.any():
+                np.save(os.path.join(tmp, name + '.null.npy'), null)
+                nullable.append(name)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'num_rows': len(records), 'schema': schema, 'nullable': nullable}, f)
+        os.rename(tmp, part)
+
+    def dates(self, source, archive):
+        # dates that have at least one part, in order
+        root = os.path.join(self.store_dir, source, archive)
+        if not os.path.isdir(root):
+            return []
+        return sorted(date for date in os.listdir(root) if len(self._parts(os.path.join(root, date))) > 0)
+
+    def scan(self, source, archive, date_from=None, date_until=None, columns=None):
+        # yield (date, num_rows, columns) for each part within [date_from, date_until], with memory-mapped columns
+        for date in self.dates(source, archive):
+            if (date_from is not None and date < date_from) or (date_until is not None and date > date_until):
+                continue
+            partition = os.path.join(self.store_dir, source, archive, date)
+            for part in self._parts(partition):
+                num_rows, table = self._read_part(os.path.join(partition, part), columns)
+                yield date, num_rows, table
+
+    def load(self, source, archive, date_from=None, date_until=None, columns=None):
+        # all the parts within the date range as one dict of columns. Numeric columns are concatenated arrays,
+        # string columns lists, and the partition date is added as the "date" column. Columns missing from older
+        # parts are nulls, like None values: numeric columns with nulls are masked arrays, other columns have None
+        parts = list(self.scan(source, archive, date_from, date_until, columns))
+        table = {'date': [date for date, num_rows, _ in parts for _ in range(num_rows)]}
+        names = []
+        for _, _, part in parts:
+            names += [name for name in part if name not in names]
+
+        for name in names:
+            kind = [part[name] for _, _, part in parts if name in part][0]
+            if isinstance(kind, np.ndarray):
+                arrays = [part[name] if name in part else np.ma.masked_all(num_rows, kind.dtype)
+                          for _, num_rows, part in parts]
+                masked = any(isinstance(array, np.ma.MaskedArray) for array in arrays)
+                table[name] = np.ma.concatenate(arrays) if masked else np.concatenate(arrays)
+            else:
+                table[name] = [item for _, num_rows, part in parts
+                               for item in (part[name].to_list() if name in part else [None] * num_rows)]
+        return table
+
+    def records(self, source, archive, date_from=None, date_until=None):
+        # yield {'date', 'papers'} per part in the same layout as the json files of save_by_day
+        for date, _, part in self.scan(source, archive, date_from, date_until):
+            names = list(part)
+            values = [part[name].tolist() if isinstance(part[name], np.ndarray) else part[name].to_list()
+                      for name in names]
+            yield {'date': date, 'papers': [dict(zip(names, row)) for row in zip(*values)]}
+
+    # helper methods
+    def _parts(self, partition):
+        if not os.path.isdir(partition):
+            return []
+        return sorted(name for name in os.listdir(partition) if name.startswith('part-') and
+                      not name.endswith('.tmp'))
+
+    def _infer_schema(self, records):
+        # type of every field of any record, from all its values that are not None. Fields without any value are
+        # strings
+        names = []
+        for record in records:
+            names += [name for name in record if name not in names]
+        schema = {}
+        for name in names:
+            values = [record[name] for record in records if record.get(name) is not None]
+            if all(isinstance(value, bool) for value in values) and len(values) > 0:
+                schema[name] = 'bool'
+            elif all(isinstance(value, int) and not isinstance(value, bool) for value in values) and len(values) > 0:
+                schema[name] = 'int64'
+            elif all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values) and \
+                    len(values) > 0:
+                schema[name] = 'float64'
+            elif all(isinstance(value, str) for value in values):
+                schema[name] = 'str'
+            elif all(isinstance(value, (list, tuple)) and all(isinstance(item, str) for item in value)
+                     for value in values):
+                schema[name] = 'list'
+            else:
+                raise ValueError('Field "%s" mixes types that cannot be stored in one column' % name)
+        return schema
+
+    def _save_strings(self, part, name, column):
+        np.save(os.path.join(part, name + '.data.npy'), column.data)
+        np.save(os.path.join(part, name + '.offsets.npy'), column.offsets)
+
+    def _load_strings(self, part, name, null=None):
+        return StringColumn(np.load(os.path.join(part, name + '.data.npy'), mmap_mode='r'),
+                            np.load(os.path.join(part, name + '.offsets.npy'), mmap_mode='r'), null)
+
+    def _read_part(self, part, columns):
+        with open(os.path.join(part, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        schema = meta['schema']
+        # parts written before null masks have none
+        nullable = meta.get('nullable', [])
+        table = {}
+        for name, kind in schema.items():
+            if columns is not None and name not in columns:
+                continue
+            null = np.load(os.path.join(part, name + '.null.npy')) if name in nullable else None
+            if kind == 'str':
+                table[name] = self._load_strings(part, name, null)
+            elif kind == 'list':
+                # the items of a list column never have nulls of their own
+                table[name] = StringListColumn(self._load_strings(part, name),
+                                               np.load(os.path.join(part, name + '.rows.npy'), mmap_mode='r'), null)
+            else:
+                values = np.load(os.path.join(part, name + '.npy'), mmap_mode='r')
+                table[name] = np.ma.masked_array(values, null) if null is not None else values
+        return meta['num_rows'], table
+
+
+def import_json(store, source, archive, json_dir):
+    # copy the day files written by save_by_day (<date>_<source>.json) into a column store
+    num_days = 0
+    for path in sorted(glob.glob(os.path.join(json_dir, '*_%s.json' % source))):
+        with open(path, 'r') as f:
+            res = json.load(f)
+        store.append(source, archive, res['date'], res['papers'])
+        num_days += 1
+    return num_days
+
+
+if __name__ == '__main__':
+    # usage: python -m scrapers.store <json_dir> <source> <archive> <store_dir>
+    json_dir, source, archive, store_dir = sys.argv[1:5]
+    print('Imported %d days.' % import_json(ColumnStore(store_dir), source, archive, json_dir))
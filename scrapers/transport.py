@@ -0,0 +1,221 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from .cache import ResponseCache
+from .metrics import url_type
+
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class Transport:
+    """
+    HTTP transport shared by the scrapers.
+
+    It keeps one `requests.Session` with a keep-alive connection pool, retries failed requests (connection errors,
+    timeouts, 429 and 5xx responses) with exponential backoff and jitter, honors Retry-After headers and counts
+    requests, retries, errors, bytes, time and cache hits per host. With a cache, fresh entries are served from disk
+    without any request and stale entries are revalidated with If-None-Match / If-Modified-Since.
+
+    Inputs:
+        - timeout: float, seconds to wait for a connection or a response before giving up on an attempt
+        - max_retries: int, number of retries after the first attempt
+        - backoff_base: float, delay in seconds before the first retry. It doubles on every retry
+        - backoff_max: float, upper bound of the backoff delay and of an honored Retry-After value
+        - pool_size: int, number of keep-alive connections kept per host
+        - cache: ResponseCache, optional on-disk cache of successful responses
+        - rate_limiter: SharedRateLimiter, optional per-host limiter acquired before every request sent, e.g.
+          shared by the workers of a Scheduler
+        - metrics: Metrics, optional. Also records requests, bytes, retries, errors, cache hits and a latency
+          histogram per url type (see metrics.url_type). Scrapers attach their own for the duration of a run
+
+    """
+    def __init__(self, timeout=30., max_retries=3, backoff_base=1., backoff_max=60., pool_size=10, cache=None,
+                 rate_limiter=None, metrics=None):
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._session = self._make_session()
+
+    @classmethod
+    def from_params(cls, params, rate_limiter=None, metrics=None):
+        # build a transport from the optional keys of a scraper's params
+        cache = None
+        if params.get('cache_dir'):
+            cache = ResponseCache(params['cache_dir'],
+                                  ttl=params.get('cache_ttl'),
+                                  max_size=params.get('cache_max_size'),
+                                  compress=params.get('cache_compress', False))
+        return cls(timeout=params.get('timeout', 30.),
+                   max_retries=params.get('max_retries', 3),
+                   backoff_base=params.get('backoff_base', 1.),
+                   backoff_max=params.get('backoff_max', 60.),
+                   pool_size=max(10, params.get('concurrency', 8)),
+                   cache=cache,
+                   rate_limiter=rate_limiter,
+                   metrics=metrics)
+
+    def get(self, url, revalidate=False):
+        # send a GET request, retrying transient failures, and return the response. With revalidate, a cached entry
+        # is only served after the server confirmed it is unchanged, even when it is still fresh
+        host = urlparse(url).netloc
+
+        headers = {}
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None:
+            if cached['fresh'] and not revalidate:
+                self._count_cache_hit(host, url)
+                return self._cached_response(url, cached['body'])
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        response = self._get_with_retries(url, host, headers)
+        if self.cache is not None:
+            if response.status_code == 304 and cached is not None:
+                self.cache.touch(url)
+                self._count_cache_hit(host, url)
+                return self._cached_response(url, cached['body'])
+            if response.status_code == 200:
+                self.cache.put(url, response.content,
+                               etag=response.headers.get('ETag'),
+                               last_modified=response.headers.get('Last-Modified'))
+        return response
+
+    def get_text(self, url, revalidate=False):
+        return self.get(url, revalidate).text
+
+    def stats(self):
+        # per-host counters: requests, retries, errors, bytes, seconds spent in requests and cache hits
+        with self._lock:
+            return dict((host, dict(counters)) for host, counters in self._stats.items())
+
+    def close(self):
+        self._session.close()
+
+    # helper methods
+    def _get_with_retries(self, url, host, headers):
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                t0 = time.perf_counter()
+                self.rate_limiter.acquire(host)
+                if self.metrics is not None:
+                    self.metrics.count('stage_seconds', time.perf_counter() - t0, stage='rate_limit_wait')
+            t0 = time.perf_counter()
+            try:
+                response = self._session.get(url, timeout=self.timeout, headers=headers)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count(host, url, time.perf_counter() - t0, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                self._count_retry(host, url)
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            failed = response.status_code in RETRY_STATUS
+            self._count(host, url, time.perf_counter() - t0, nbytes=len(response.content), error=failed)
+            if not failed:
+                return response
+            if attempt >= self.max_retries:
+                response.raise_for_status()
+
+            self._count_retry(host, url)
+            delay = self._retry_after(response)
+            time.sleep(delay if delay is not None else self._backoff(attempt))
+            attempt += 1
+
+    def _cached_response(self, url, body):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = 'utf-8'
+        response._content = body
+        return response
+
+    def _make_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _backoff(self, attempt):
+        # exponential backoff with jitter, so that workers retrying together do not hit the server at once
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _retry_after(self, response):
+        # Retry-After is either a number of seconds or an http date
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(self.backoff_max, max(0., delay))
+
+    def _counters(self, host):
+        if host not in self._stats:
+            self._stats[host] = {'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.,
+                                 'cache_hits': 0}
+        return self._stats[host]
+
+    def _count(self, host, url, seconds, nbytes=0, error=False):
+        with self._lock:
+            counters = self._counters(host)
+            counters['requests'] += 1
+            counters['bytes'] += nbytes
+            counters['seconds'] += seconds
+            if error:
+                counters['errors'] += 1
+        if self.metrics is not None:
+            kind = url_type(url)
+            self.metrics.count('requests', url_type=kind)
+            self.metrics.count('bytes', nbytes, url_type=kind)
+            self.metrics.observe('request_seconds', seconds, url_type=kind)
+            if error:
+                self.metrics.count('errors', url_type=kind)
+
+    def _count_retry(self, host, url):
+        with self._lock:
+            self._counters(host)['retries'] += 1
+        if self.metrics is not None:
+            self.metrics.count('retries', url_type=url_type(url))
+
+    def _count_cache_hit(self, host, url):
+        with self._lock:
+            self._counters(host)['cache_hits'] += 1
+        if self.metrics is not None:
+            self.metrics.count('cache_hits', url_type=url_type(url))
+
+    # sessions and locks cannot be pickled - a copy sent to another process opens its own connections
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        del state['_session']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._session = self._make_session()
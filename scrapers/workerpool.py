@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WorkerPool:
+    """
+    Persistent thread pool shared by every task of a scraping run.
+
+    Unlike a new joblib `Parallel` per day, the threads are started once and reused, tasks are passed by reference
+    instead of being pickled into other processes, and all workers draw from the same rate limiter.
+
+    Inputs:
+        - num_workers: int, number of worker threads
+        - rate_limiter: TokenBucket, shared rate limiter taken once per task. None means no limit
+
+    """
+    def __init__(self, num_workers=8, rate_limiter=None):
+        self.num_workers = num_workers
+        self.rate_limiter = rate_limiter
+        self._executor = ThreadPoolExecutor(max_workers=num_workers)
+
+    def map(self, func, items):
+        # apply func to every item on the pool and return the results in order
+        return list(self._executor.map(self._run, [func] * len(items), items))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _run(self, func, item):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        return func(item)
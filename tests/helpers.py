@@ -0,0 +1,17 @@
+START = {'year': 2018, 'month': 3, 'day': 1}
+
+
+def arxiv_params(server, **params):
+    # ArxivScraper params of a run over every day of the mock server's listing, collected in memory
+    end = server.arxiv.days[-1][0]
+    defaults = {'start': START,
+                'end': {'year': end.year, 'month': end.month, 'day': end.day},
+                'archive': 'quant-ph',
+                'abstract': True,
+                'parallel': False,
+                'save_by_day': False,
+                'save_dir': '',
+                'rate_limit': None,
+                'url_header': server.url}
+    return dict(defaults, **params)
+
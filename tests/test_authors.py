@@ -0,0 +1,47 @@
+import numpy as np
+from scrapers.authors import AuthorIndex, author_key
+from scrapers.common import MERGE_FACTOR
+
+
+def days(num_days):
+    rng = np.random.RandomState(0)
+    names = ['J. Smith', 'A. Jones', 'B. Lee', 'C. Wu', 'D. Roy', 'E. Kim']
+    return [{'date': 'day_2018_%02d_%02d' % (3 + d // 28, d % 28 + 1),
+             'papers': [{'arxiv_id': '18%02d.%05d' % (d, i), 'order': i,
+                         'authors': list(rng.choice(names, size=rng.randint(1, 4), replace=False))}
+                        for i in range(5)]}
+            for d in range(num_days)]
+
+
+def test_index_matches_a_scan_of_the_records(tmp_path):
+    listing = days(3 * MERGE_FACTOR)
+    index = AuthorIndex()
+    index.add_days(listing)
+    papers = [paper for res in listing for paper in res['papers']]
+    for name in ['J. Smith', 'B. Lee']:
+        rows = [row for row, paper in enumerate(papers) if name in paper['authors']]
+        assert index.papers_of(name).tolist() == rows
+        shared = {}
+        for row in rows:
+            for other in papers[row]['authors']:
+                if other != name:
+                    shared[index.ids[author_key(other)]] = shared.get(index.ids[author_key(other)], 0) + 1
+        coauthors, counts = index.coauthors_of(name)
+        assert dict(zip(coauthors.tolist(), counts.tolist())) == shared
+        assert counts.tolist() == sorted(counts.tolist(), reverse=True)
+
+    path = str(tmp_path / 'authors.npz')
+    index.save(path)
+    loaded = AuthorIndex.load(path)
+    assert loaded.papers_of('J. Smith').tolist() == index.papers_of('J. Smith').tolist()
+    assert [a.tolist() for a in loaded.coauthorship_matrix()] == [a.tolist() for a in index.coauthorship_matrix()]
+
+    # an index saved with each structure as one sorted array
+    with np.load(path) as data:
+        arrays = dict((name, data[name]) for name in data.files if '_run_' not in name)
+    pairs, pair_counts = index.pairs.merged()
+    arrays.update(author_papers=index.author_papers.merged()[0], pairs=pairs, pair_counts=pair_counts)
+    np.savez(str(tmp_path / 'old.npz'), **arrays)
+    old = AuthorIndex.load(str(tmp_path / 'old.npz'))
+    old.add_day(listing[0])
+    assert [a.tolist() for a in old.coauthorship_matrix()] == [a.tolist() for a in index.coauthorship_matrix()]
@@ -0,0 +1,50 @@
+import copy
+import numpy as np
+from scrapers.common import MERGE_FACTOR, SortedRuns
+from scrapers.dedup import DedupIndex
+
+
+def test_sorted_runs_match_one_sorted_array():
+    rng = np.random.RandomState(0)
+    runs = SortedRuns(np.int64, np.int32, combine=True)
+    keys = rng.randint(0, 500, size=(3 * MERGE_FACTOR ** 2, 20))
+    for day in keys:
+        runs.add(day, np.ones(len(day)))
+    # merged level by level, not one run per add
+    assert len(runs.runs) < MERGE_FACTOR * 3
+    unique, counts = np.unique(keys, return_counts=True)
+    assert [a.tolist() for a in runs.merged()] == [unique.tolist(), counts.tolist()]
+    between = runs.between(100, 200)
+    assert between[0].tolist() == unique[(unique >= 100) & (unique < 200)].tolist()
+    assert [v.sum() for v in runs.values_of([unique[0], 1000])] == [counts[0], 0]
+
+
+def paper(arxiv_id, title, authors):
+    return {'arxiv_id': arxiv_id, 'title': title, 'abstract': 'We study %s in detail.' % title.lower(),
+            'authors': authors, 'num_versions': 1}
+
+
+def test_saved_index_finds_the_same_duplicates(tmp_path):
+    index = DedupIndex()
+    for d in range(2 * MERGE_FACTOR):
+        index.check_day({'date': 'day_2018_03_%02d' % (d + 1),
+                         'papers': [paper('1803.%05d' % d, 'Topological phases number %d of matter' % d, ['A. B'])]},
+                        'quant-ph')
+    later = {'date': 'day_2018_04_01', 'papers': [paper('1804.00001', 'Topological phases number 3 of matter',
+                                                        ['A. B']),
+                                                  paper('1803.00005', 'Topological phases number 5 of matter',
+                                                        ['A. B'])]}
+    expected = copy.deepcopy(index).check_day(later, 'quant-ph')
+    assert [check['status'] for check in expected] == ['near_duplicate', 'repeat']
+
+    path = str(tmp_path / 'dedup.npz')
+    index.save(path)
+    assert DedupIndex.load(path).check_day(later, 'quant-ph') == expected
+
+    # an index saved with its band keys as one sorted array
+    with np.load(path) as data:
+        arrays = dict((name, data[name]) for name in data.files if '_run_' not in name)
+    keys, rows = index.band_index.merged()
+    arrays.update(band_keys=keys, band_rows=rows)
+    np.savez(str(tmp_path / 'old.npz'), **arrays)
+    assert DedupIndex.load(str(tmp_path / 'old.npz')).check_day(later, 'quant-ph') == expected
@@ -0,0 +1,13 @@
+from analysis.features import parse_sizes, parse_times
+from scrapers.records import encode_sizes
+
+
+def test_sizes_match_the_record_encoding():
+    sizes = ['123kb', '2mb', '1gb', '0012kb', 'none', '', 'kb', '5xb', '1kbx']
+    assert parse_sizes(sizes).tolist() == encode_sizes(sizes)[0].tolist()
+
+
+def test_long_values_are_invalid_not_truncated():
+    # a fixed width would cut these down to a valid-looking prefix
+    assert parse_sizes(['1234567890123456kb', '123456789012kb']).tolist() == [-1, -1]
+    assert parse_times(['12:34:56', '12:34:56 UTC', 'none']).tolist() == [45296, -1, -1]
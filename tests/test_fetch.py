@@ -0,0 +1,73 @@
+import time
+import threading
+import pytest
+from scrapers.arxivscraper import ArxivScraper
+from scrapers.asyncfetch import AsyncFetcher
+from scrapers.ratelimit import TokenBucket
+from benchmarks.mockserver import MockArxiv, MockServer
+from .helpers import START, arxiv_params
+
+
+@pytest.fixture(scope='module')
+def server():
+    with MockServer(MockArxiv(START, num_days=2, papers_per_day=12), latency=0.01) as server:
+        yield server
+
+
+def scrape(server, **params):
+    return ArxivScraper(arxiv_params(server, **params)).start_scraping()
+
+
+@pytest.mark.parametrize('mode', ['async', 'threads'])
+def test_fetch_modes_match_sequential(server, mode):
+    reference = scrape(server, fetch_mode='sequential')
+    assert scrape(server, fetch_mode=mode, concurrency=4) == reference
+
+
+def test_records_match_listing(server):
+    results = scrape(server, fetch_mode='async', concurrency=4)
+    for res, (_, arxiv_ids) in zip(results, server.arxiv.days):
+        assert [paper['arxiv_id'] for paper in res['papers']] == arxiv_ids
+        for paper in res['papers']:
+            listed = server.arxiv.papers[paper['arxiv_id']]
+            assert paper['title'] == listed['title']
+            assert paper['abstract'] == listed['abstract']
+
+
+def test_fetcher_threads_stop_after_run(server):
+    scraper = ArxivScraper(arxiv_params(server, fetch_mode='async', concurrency=4))
+    first = scraper.start_scraping()
+    assert scraper.async_fetcher._executor is None
+    # the fetcher starts its thread pool again for the next run
+    assert scraper.start_scraping() == first
+
+
+def test_async_fetcher_bounds_requests_in_flight():
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def fetch(url):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return url.upper()
+
+    fetcher = AsyncFetcher(concurrency=3, fetch=fetch)
+    try:
+        urls = ['u%d' % i for i in range(20)]
+        assert fetcher.fetch_all(urls) == [url.upper() for url in urls]
+    finally:
+        fetcher.close()
+    assert in_flight[1] == 3
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=50.)
+    t0 = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    # the first token is free, the next ten take 1/50 s each
+    assert time.perf_counter() - t0 >= 0.18
@@ -0,0 +1,17 @@
+from benchmarks.mockserver import MockArxiv, MockServer
+from benchmarks.bench_memory import traced_run
+from .helpers import START, arxiv_params
+
+
+def test_low_memory_peak_is_flat_over_1000_pages():
+    # the peak traced memory of every window of 100 abstract pages stays within 25% of the first window's, and
+    # nothing accumulates between windows
+    with MockServer(MockArxiv(START, num_days=20, papers_per_day=50)) as server:
+        params = arxiv_params(server, fetch_mode='threads', concurrency=16, rate_limit=0, parser='soup',
+                              low_memory=True)
+        rows = traced_run(params, 100)
+    assert rows[-1][0] == 1000
+    peaks = [peak for _, _, peak in rows]
+    currents = [current for _, current, _ in rows]
+    assert max(peaks) <= 1.25 * peaks[0]
+    assert currents[-1] <= 1.25 * currents[0]
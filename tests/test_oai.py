@@ -0,0 +1,44 @@
+import pytest
+from scrapers.arxivscraper import ArxivScraper
+from benchmarks.mockserver import MockArxiv, MockServer
+from benchmarks.bench_metadata import FIELDS
+from .helpers import START, arxiv_params
+
+
+class PartialArxiv(MockArxiv):
+    # a listing whose OAI harvest misses every third paper, and whose abstract pages wrap the abstract over lines
+    def _oai_record(self, arxiv_id):
+        if int(arxiv_id.split('.')[1]) % 3 == 0:
+            return ''
+        return MockArxiv._oai_record(self, arxiv_id)
+
+    def abstract_page(self, arxiv_id):
+        html = MockArxiv.abstract_page(self, arxiv_id)
+        abstract = self.papers[arxiv_id]['abstract']
+        words = abstract.split()
+        wrapped = '\n'.join(' '.join(words[i:i + 12]) for i in range(0, len(words), 12))
+        return html.replace(abstract, wrapped)
+
+
+def scrape(server, metadata):
+    before = server.num_requests
+    results = ArxivScraper(arxiv_params(server, fetch_mode='threads', metadata=metadata,
+                                        oai_url=server.url + '/oai2')).start_scraping()
+    records = [[tuple(paper[k] for k in FIELDS) for paper in res['papers']] for res in results]
+    return records, server.num_requests - before
+
+
+@pytest.mark.parametrize('arxiv_class', [MockArxiv, PartialArxiv])
+def test_oai_records_match_abstract_pages(arxiv_class):
+    arxiv = arxiv_class(START, num_days=3, papers_per_day=20)
+    with MockServer(arxiv) as server:
+        pages, page_requests = scrape(server, 'abstract_page')
+        oai, oai_requests = scrape(server, 'oai')
+    assert oai == pages
+    abstracts = [record[FIELDS.index('abstract')] for day in oai for record in day]
+    assert abstracts == [arxiv.papers[arxiv_id]['abstract'] for _, ids in arxiv.days for arxiv_id in ids]
+    # one catchup page and one harvest page instead of one abstract page per paper, plus the fallbacks
+    num_missing = sum(1 for _, ids in arxiv.days for arxiv_id in ids
+                      if arxiv_class is PartialArxiv and int(arxiv_id.split('.')[1]) % 3 == 0)
+    assert page_requests == 1 + len(arxiv.papers)
+    assert oai_requests == 2 + num_missing
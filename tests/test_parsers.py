@@ -0,0 +1,75 @@
+import pytest
+from scrapers.parsers import PARSERS, get_parser, clean_abstract, listed_again
+from benchmarks.mockserver import MockArxiv, MockScirate
+from benchmarks.recorded import FixtureSet
+from benchmarks.bench_parse import extract
+from benchmarks.bench_offline import FIXTURES, PAGE_KINDS
+from .helpers import START
+
+
+def recorded_pages():
+    return [(PAGE_KINDS[kind], html) for kind, html in FixtureSet(FIXTURES).kinds() if kind in PAGE_KINDS]
+
+
+@pytest.fixture(scope='module')
+def arxiv():
+    return MockArxiv(START, num_days=2, papers_per_day=30)
+
+
+@pytest.mark.parametrize('name', sorted(PARSERS))
+def test_recorded_pages_match_reference(name):
+    # golden output: every backend extracts exactly what the BeautifulSoup reference extracts
+    reference, backend = get_parser('soup'), get_parser(name)
+    pages = recorded_pages()
+    assert set(kind for kind, _ in pages) == {'catchup', 'abstract', 'scirate'}
+    for kind, html in pages:
+        assert extract(backend, kind, html) == extract(reference, kind, html)
+
+
+@pytest.mark.parametrize('name', sorted(PARSERS))
+def test_catchup_entries(arxiv, name):
+    parser = get_parser(name)
+    query = {'syear': ['2018'], 'smonth': ['3'], 'sday': ['1'], 'num': ['100']}
+    days, _ = extract(parser, 'catchup', arxiv.catchup_page(query))
+    assert len(days) == len(arxiv.days)
+    for (_, entries), (_, arxiv_ids) in zip(days, arxiv.days):
+        assert [entry['href'] for entry in entries] == ['/abs/%s' % arxiv_id for arxiv_id in arxiv_ids]
+        assert [entry['order'] for entry in entries] == list(range(len(arxiv_ids)))
+        for entry, arxiv_id in zip(entries, arxiv_ids):
+            assert entry['title'] == arxiv.papers[arxiv_id]['title']
+            assert entry['authors'] == arxiv.papers[arxiv_id]['authors']
+
+
+@pytest.mark.parametrize('name', sorted(PARSERS))
+def test_abstract_page(arxiv, name):
+    arxiv_id = arxiv.days[0][1][0]
+    paper = arxiv.papers[arxiv_id]
+    fields = get_parser(name).arxiv_abstract(arxiv.abstract_page(arxiv_id))
+    assert fields['abstract'] == paper['abstract']
+    assert fields['num_versions'] == len(paper['history'])
+    assert fields['latest_submit'].endswith('(%s)' % paper['history'][-1][2])
+    assert get_parser(name).arxiv_abstract(arxiv.abstract_page(arxiv_id), abstract=False)['abstract'] == ''
+
+
+@pytest.mark.parametrize('name', sorted(PARSERS))
+def test_scirate_papers(arxiv, name):
+    scirate = MockScirate(arxiv)
+    papers, next_href = extract(get_parser(name), 'scirate', scirate.day_page({'date': ['2018-03-01']}))
+    date, ranked = scirate.days[0]
+    assert [paper['arxiv_id'] for paper in papers] == ranked
+    assert [paper['rank'] for paper in papers] == list(range(len(ranked)))
+    assert [paper['scite_count'] for paper in papers] == [scirate.scites[arxiv_id] for arxiv_id in ranked]
+    assert [paper['authors'] for paper in papers] == [arxiv.papers[arxiv_id]['authors'] for arxiv_id in ranked]
+    assert next_href == '/arxiv/quant-ph?date=2018-03-02&range=1'
+
+
+def test_clean_abstract():
+    text = '\nAbstract: Out-of-time-order correlation functions\nprovide a  powerful\ntool.\n'
+    assert clean_abstract(text) == 'Out-of-time-order correlation functions provide a powerful tool.'
+    assert clean_abstract('  plain   text ') == 'plain text'
+
+
+def test_listed_again():
+    assert not listed_again('arXiv:1803.04567 [pdf, other]')
+    assert listed_again('arXiv:1803.04567 (replaced) [pdf]')
+    assert listed_again('arXiv:1803.04567 (cross-list from cs.IT) [pdf, other]')
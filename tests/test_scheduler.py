@@ -0,0 +1,25 @@
+from scrapers.scheduler import WorkQueue, unit_params
+
+
+UNIT = {'source': 'arxiv', 'archive': 'quant-ph', 'date_from': '2018-03-01', 'date_until': '2018-03-07'}
+
+
+def test_abandoned_unit_fails_after_max_attempts(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease=-1., max_attempts=2)
+    queue.add([tuple(UNIT.values())])
+    # the worker dies twice without reporting, and the expired lease makes the unit claimable again
+    assert queue.claim('a') is not None
+    assert queue.claim('b') is not None
+    assert queue.claim('c') is None
+    assert queue.counts() == {'failed': 1}
+    (failure,) = queue.failures()
+    assert failure['attempts'] == 2 and failure['error'] == 'lease expired'
+
+
+def test_workers_do_not_start_joblib_pools(tmp_path):
+    params = {'queue_path': str(tmp_path / 'queue.sqlite'),
+              'sources': {'arxiv': {'parallel': True, 'save_dir': str(tmp_path / '{archive}')}}}
+    source_params = unit_params(UNIT, params)
+    assert source_params['parallel'] is False and source_params['fetch_mode'] == 'threads'
+    params['sources']['arxiv'].update({'parallel': False, 'fetch_mode': 'sequential'})
+    assert unit_params(UNIT, params)['fetch_mode'] == 'sequential'
@@ -0,0 +1,25 @@
+import datetime
+from scrapers.sciratescraper import ScirateScraper
+from scrapers.scites import SciteLog, track
+from benchmarks.mockserver import MockArxiv, MockScirate, MockServer
+from .helpers import START
+
+
+def test_polls_see_new_counts_through_the_cache(tmp_path):
+    arxiv = MockArxiv(START, num_days=1, papers_per_day=5)
+    scirate = MockScirate(arxiv)
+    listed, ids = scirate.days[0]
+    with MockServer(arxiv, scirate) as server:
+        # cached pages never expire without a cache_ttl
+        params = {'start': START, 'end': START, 'archive': 'quant-ph', 'save_by_day': False, 'save_dir': '',
+                  'url_header': server.url, 'cache_dir': str(tmp_path / 'cache')}
+        scraper = ScirateScraper(params)
+        log = SciteLog(str(tmp_path / 'scites'))
+        assert track(scraper, log, listed + datetime.timedelta(days=1), polled_at=1.)['changes'] == len(ids)
+        for arxiv_id in ids:
+            scirate.scites[arxiv_id] += 3
+        assert track(scraper, log, listed + datetime.timedelta(days=2), polled_at=2.)['changes'] == len(ids)
+        # an unchanged page is confirmed by the server and served from the cache
+        assert track(scraper, log, listed + datetime.timedelta(days=4), polled_at=3.)['changes'] == 0
+    for arxiv_id in ids:
+        assert log.curve(arxiv_id)['counts'][-1] == scirate.scites[arxiv_id]
@@ -0,0 +1,22 @@
+import os
+from scrapers.search import SearchIndex
+
+
+def day(date, arxiv_id, title):
+    return {'date': date, 'papers': [{'arxiv_id': arxiv_id, 'title': title, 'abstract': 'Some abstract.',
+                                      'authors': ['A. Author']}]}
+
+
+def test_segment_left_by_an_interrupted_run(tmp_path):
+    index = SearchIndex(str(tmp_path))
+    index.add_day(day('day_2018_03_01', '1803.00001', 'Surface code decoders'))
+    index.flush()
+    # a run that wrote the next segment but was stopped before saving the manifest
+    os.makedirs(str(tmp_path / ('seg-%06d' % index.manifest['next_segment'])))
+    open(str(tmp_path / ('seg-%06d' % index.manifest['next_segment']) / 'day.npy'), 'w').close()
+
+    index = SearchIndex(str(tmp_path))
+    index.add_day(day('day_2018_03_02', '1803.00002', 'Quantum error correction'))
+    index.flush()
+    index = SearchIndex(str(tmp_path))
+    assert [res['arxiv_id'] for res in index.search('surface correction')] == ['1803.00002', '1803.00001']
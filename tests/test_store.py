@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from scrapers.store import ColumnStore
+
+
+def test_round_trip(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    papers = [{'title': 'A', 'authors': ['X', 'Y'], 'order': 0, 'num_versions': 2, 'score': 0.5, 'flag': True},
+              {'title': 'B', 'authors': [], 'order': 1, 'num_versions': 1, 'score': 1.5, 'flag': False}]
+    store.append('arxiv', 'quant-ph', 'day_2018_03_01', papers)
+    assert list(store.records('arxiv', 'quant-ph')) == [{'date': 'day_2018_03_01', 'papers': papers}]
+
+
+def test_nulls_and_missing_fields(tmp_path):
+    # types come from every record, not the first one: a None identifier stays a string column
+    store = ColumnStore(str(tmp_path))
+    papers = [{'title': 'A', 'rank': 0, 'scite_count': 3, 'arxiv_id': None, 'authors': ['X']},
+              {'title': 'B', 'rank': 1, 'scite_count': None, 'arxiv_id': '1803.00001', 'authors': None,
+               'extra': 1.5}]
+    store.append('scirate', 'quant-ph', 'day_2018_03_01', papers)
+    (res,) = store.records('scirate', 'quant-ph')
+    assert res['papers'] == [dict(papers[0], extra=None), papers[1]]
+
+    table = store.load('scirate', 'quant-ph')
+    assert table['arxiv_id'] == [None, '1803.00001']
+    assert table['authors'] == [['X'], None]
+    assert isinstance(table['scite_count'], np.ma.MaskedArray)
+    assert table['scite_count'].mask.tolist() == [False, True]
+    assert table['rank'].tolist() == [0, 1]
+
+
+def test_mixed_types_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnStore(str(tmp_path)).append('arxiv', 'quant-ph', 'day_2018_03_01', [{'a': 1}, {'a': 'x'}])
+
+
+def test_columns_missing_from_older_parts_are_null(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    store.append('scirate', 'quant-ph', 'day_2018_03_01', [{'title': 'A', 'rank': 0}])
+    store.append('scirate', 'quant-ph', 'day_2018_03_02', [{'title': 'B', 'rank': 0, 'arxiv_id': '1803.00002',
+                                                            'scite_count': 4, 'authors': ['X']}])
+    table = store.load('scirate', 'quant-ph')
+    assert table['arxiv_id'] == [None, '1803.00002']
+    assert table['authors'] == [None, ['X']]
+    assert table['scite_count'].mask.tolist() == [True, False]
+    assert table['scite_count'][1] == 4
+
+
+def test_appenders_that_see_the_same_parts_do_not_collide(tmp_path, monkeypatch):
+    store = ColumnStore(str(tmp_path))
+    # both appenders count the parts before either has written its own
+    monkeypatch.setattr(store, '_parts', lambda partition: [])
+    store.append('arxiv', 'quant-ph', 'day_2018_03_01', [{'title': 'A'}])
+    store.append('arxiv', 'quant-ph', 'day_2018_03_01', [{'title': 'B'}])
+    monkeypatch.undo()
+    assert sorted(store.load('arxiv', 'quant-ph')['title']) == ['A', 'B']
@@ -0,0 +1,63 @@
+import time
+import pytest
+import requests
+from scrapers.arxivscraper import ArxivScraper
+from scrapers.transport import Transport
+from benchmarks.mockserver import MockArxiv, MockServer
+from .helpers import START, arxiv_params
+
+
+@pytest.fixture(scope='module')
+def arxiv():
+    return MockArxiv(START, num_days=1, papers_per_day=10)
+
+
+def strip_links(results):
+    # paper links contain the port of the mock server, which differs between servers
+    return [[dict((k, v) for k, v in paper.items() if k != 'paper_link') for paper in res['papers']]
+            for res in results]
+
+
+def test_errors_are_retried_without_changing_records(arxiv):
+    with MockServer(arxiv) as server:
+        reference = ArxivScraper(arxiv_params(server, fetch_mode='threads'), Transport()).start_scraping()
+    with MockServer(arxiv, error_rate=0.3, retry_after=0.01) as server:
+        transport = Transport(max_retries=10, backoff_base=0.01)
+        results = ArxivScraper(arxiv_params(server, fetch_mode='threads'), transport).start_scraping()
+        stats = transport.stats()[server.url.split('//')[1]]
+    assert strip_links(results) == strip_links(reference)
+    assert server.num_errors > 0
+    assert stats['retries'] == server.num_errors
+    assert stats['errors'] == server.num_errors
+    assert stats['requests'] == server.num_requests
+
+
+def test_retries_are_bounded_and_honor_retry_after(arxiv):
+    with MockServer(arxiv, error_rate=1., retry_after=0.1) as server:
+        transport = Transport(max_retries=3, backoff_base=10.)
+        t0 = time.perf_counter()
+        with pytest.raises(requests.HTTPError):
+            transport.get(server.url + '/catchup')
+        elapsed = time.perf_counter() - t0
+    # one attempt and three retries, each after the server's Retry-After rather than the 10 s backoff
+    assert server.num_requests == 4
+    assert 0.3 <= elapsed < 5.
+
+
+def test_backoff_doubles_with_jitter_up_to_the_maximum():
+    transport = Transport(backoff_base=1., backoff_max=6.)
+    for attempt, delay in enumerate([1., 2., 4., 6., 6.]):
+        for _ in range(20):
+            assert delay / 2 <= transport._backoff(attempt) <= delay
+
+
+def test_connection_errors_are_retried():
+    # nothing listens on a closed server's port
+    with MockServer() as server:
+        url = server.url + '/catchup'
+    transport = Transport(max_retries=2, backoff_base=0.01, timeout=1.)
+    with pytest.raises(requests.ConnectionError):
+        transport.get(url)
+    stats = transport.stats()[url.split('//')[1].split('/')[0]]
+    assert stats['requests'] == 3
+    assert stats['retries'] == 2